@@ -0,0 +1,675 @@
+###
+# Copyright (2024) Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+import logging
+import time
+import typing as t
+import uuid
+
+from ml_metadata.errors import AlreadyExistsError, InvalidArgumentError
+from ml_metadata.metadata_store import ListOptions
+from ml_metadata.proto import metadata_store_pb2 as mlpb
+
+from cmflib.key_lock import KeyLock
+from cmflib.metadata_helper import (
+    EXECUTION_CONTEXT_ID,
+    EXECUTION_CONTEXT_NAME_PROPERTY_NAME,
+    EXECUTION_END_COMMIT,
+    EXECUTION_EXECUTION,
+    EXECUTION_EXECUTION_TYPE_NAME,
+    EXECUTION_PIPELINE_ID,
+    EXECUTION_PIPELINE_TYPE,
+    EXECUTION_REPO,
+    EXECUTION_START_COMMIT,
+    EXECUTION_TYPE_PROPERTIES,
+    EXECUTION_UNIQUE_ID,
+    PIPELINE_STAGE,
+    associate_child_to_parent_context,
+    get_or_create_artifact_type,
+    get_or_create_execution_type,
+    get_or_create_run_context,
+    merge_artifact_custom_properties,
+    merge_artifact_url,
+    value_to_mlmd_value,
+)
+
+__all__ = ["BulkMerger"]
+
+logger = logging.getLogger(__name__)
+
+INPUT = mlpb.Event.INPUT    # type: ignore  # Event type not recognized by mypy, using ignore to bypass
+OUTPUT = mlpb.Event.OUTPUT  # type: ignore  # Event type not recognized by mypy, using ignore to bypass
+
+# Number of values per "IN (...)" filter query.
+_CHUNK_SIZE = 500
+
+# Attempts to write a stage when a concurrent merge creates the same executions or artifacts.
+_ATTEMPTS = 3
+
+# Artifacts are looked up by uri, merges creating or updating artifacts with the same uri take turns.
+_ARTIFACT_URIS = KeyLock()
+# Executions with a name are read, updated and written back, merges of the same named execution take turns.
+_EXECUTION_NAMES = KeyLock()
+
+_GIT_PROPERTIES = {"git_repo": mlpb.STRING, "Commit": mlpb.STRING, "url": mlpb.STRING}  # type: ignore  # String type not recognized by mypy, using ignore to bypass
+
+# Property types of artifact types, the same as used by the Cmf.log_*_from_client methods.
+_ARTIFACT_TYPE_PROPERTIES = {
+    "Dataset": _GIT_PROPERTIES,
+    "Label": _GIT_PROPERTIES,
+    "Dataslice": _GIT_PROPERTIES,
+    "Environment": _GIT_PROPERTIES,
+    "Model": {
+        "model_framework": mlpb.STRING,     # type: ignore  # String type not recognized by mypy, using ignore to bypass
+        "model_type": mlpb.STRING,          # type: ignore  # String type not recognized by mypy, using ignore to bypass
+        "model_name": mlpb.STRING,          # type: ignore  # String type not recognized by mypy, using ignore to bypass
+        "Commit": mlpb.STRING,              # type: ignore  # String type not recognized by mypy, using ignore to bypass
+        "url": mlpb.STRING,                 # type: ignore  # String type not recognized by mypy, using ignore to bypass
+    },
+    "Metrics": {"metrics_name": mlpb.STRING},   # type: ignore  # String type not recognized by mypy, using ignore to bypass
+    "Step_Metrics": {"Commit": mlpb.STRING, "url": mlpb.STRING},    # type: ignore  # String type not recognized by mypy, using ignore to bypass
+}
+
+
+def _chunks(values: t.List[str]) -> t.Iterator[t.List[str]]:
+    for start in range(0, len(values), _CHUNK_SIZE):
+        yield values[start:start + _CHUNK_SIZE]
+
+
+def _quotable(value: str) -> bool:
+    """Whether `value` can be used as a string literal in a filter query."""
+    return "'" not in value and "\\" not in value
+
+
+def _in_filter(field: str, values: t.List[str]) -> str:
+    return "{} IN ({})".format(field, ", ".join("'" + value + "'" for value in values))
+
+
+class _PlannedArtifact:
+    """Copy of an existing or a new artifact and the event types linked to it by execution id.
+
+    `original` is the artifact as it was read from the store, None for new artifacts.
+    """
+
+    __slots__ = ("artifact", "original", "new", "dirty", "events")
+
+    def __init__(
+        self,
+        artifact: mlpb.Artifact,  # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
+        new: bool = False,
+        events: t.Optional[t.Dict] = None,
+        original: t.Optional[mlpb.Artifact] = None,  # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
+    ) -> None:
+        self.artifact = artifact
+        self.original = original
+        self.new = new
+        self.dirty = False
+        self.events: t.Dict[int, t.Set[int]] = {
+            execution_id: set(event_types) for execution_id, event_types in (events or {}).items()
+        }
+
+
+class _StagePlan:
+    """Artifacts, events and attributions one stage adds to the store, computed without writing.
+
+    Events are replayed in order against an in-memory view of the artifacts, so an artifact created by one event is
+    linked, not created again, by later events with the same uri, like the per-event merge does.
+
+    Args:
+        merger: Merger providing the artifact types.
+        context: Stage context.
+        existing: Artifacts in the store by uri (ordered by id) and their events.
+        taken: (type name, artifact name) pairs that already exist in the store with another uri.
+    """
+
+    def __init__(
+        self,
+        merger: "BulkMerger",
+        context: mlpb.Context,  # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+        existing: t.Dict[str, t.List[t.Tuple[mlpb.Artifact, t.Dict]]],  # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
+        taken: t.Set[t.Tuple[str, str]],
+    ) -> None:
+        self.merger = merger
+        self.context = context
+        self.taken = taken
+        self.by_uri: t.Dict[str, t.List[_PlannedArtifact]] = {}
+        for uri, artifacts in existing.items():
+            planned = []
+            for artifact, events in artifacts:
+                copy = mlpb.Artifact()  # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
+                copy.CopyFrom(artifact)
+                planned.append(_PlannedArtifact(copy, events=events, original=artifact))
+            self.by_uri[uri] = planned
+        self.new: t.List[_PlannedArtifact] = []
+        self.new_names: t.Dict[t.Tuple[str, str], _PlannedArtifact] = {}
+        self.events: t.List[t.Tuple[_PlannedArtifact, int, int, t.Optional[str], t.Optional[int]]] = []
+        self.errors: t.List[str] = []
+        # (uri, id, update time) of the existing artifacts the plan is based on.
+        self.versions: t.Set[t.Tuple[str, int, int]] = set()
+        self._handlers = {
+            "Dataset": self._dataset,
+            "Label": self._label,
+            "Model": self._model,
+            "Metrics": self._metrics,
+            "Step_Metrics": self._step_metrics,
+            "Dataslice": self._dataslice,
+            "Environment": self._environment,
+        }
+
+    @property
+    def dirty(self) -> t.List[_PlannedArtifact]:
+        """Existing artifacts whose properties changed."""
+        return [p for artifacts in self.by_uri.values() for p in artifacts if p.dirty and not p.new]
+
+    def add(self, execution: mlpb.Execution, event: t.Dict) -> None:    # type: ignore  # Execution type not recognized by mypy, using ignore to bypass
+        """Plan one event of `execution` from the pipeline JSON."""
+        handler = self._handlers.get(event["artifact"]["type"])
+        if handler is None:
+            # Skip unsupported artifact types without raising an error
+            return
+        try:
+            handler(execution, event)
+        except Exception as e:
+            self.errors.append(f"[merge_stage] Error in {event['artifact']['type']} {event['artifact'].get('name')}: {e}")
+
+    def _existing(self, uri: str) -> t.List[_PlannedArtifact]:
+        return self.by_uri.get(uri, [])
+
+    def _link(self, execution, uri: str, input_name: str, event_type: int) -> None:
+        """Same as `link_execution_to_artifact`, links the last artifact with `uri` once per execution."""
+        planned = self._existing(uri)[-1]
+        if execution.id in planned.events:
+            return
+        self._event(planned, execution, event_type, input_name, None)
+
+    def _link_input(self, execution, event: t.Dict, uri: str, input_name: str) -> None:
+        """Same as `link_execution_to_input_artifact`, which fails for an existing input event."""
+        planned = self._existing(uri)[-1]
+        if INPUT in planned.events.get(execution.id, ()):
+            self._already_exists(event)
+            return
+        self._event(planned, execution, INPUT, input_name, None)
+
+    def _event(self, planned: _PlannedArtifact, execution, event_type: int, input_name: t.Optional[str],
+               milliseconds_since_epoch: t.Optional[int]) -> None:
+        planned.events.setdefault(execution.id, set()).add(event_type)
+        self.events.append((planned, execution.id, event_type, input_name, milliseconds_since_epoch))
+
+    def _create(self, execution, event: t.Dict, type_name: str, uri: str, name: str, event_type: int,
+                properties: t.Dict, custom_properties: t.Optional[t.Dict] = None) -> None:
+        """Same as `create_new_artifact_event_and_attribution`."""
+        if (type_name, name) in self.taken or (type_name, name) in self.new_names:
+            # Artifact names are unique per type, the per-event merge fails with AlreadyExistsError here.
+            self._already_exists(event)
+            return
+        artifact = mlpb.Artifact(   # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
+            uri=uri,
+            name=name,
+            type_id=self.merger._artifact_type(type_name).id,
+            properties={key: value_to_mlmd_value(value) for key, value in properties.items()},
+            custom_properties={key: value_to_mlmd_value(value) for key, value in (custom_properties or {}).items()},
+        )
+        planned = _PlannedArtifact(artifact, new=True)
+        self.by_uri.setdefault(uri, []).append(planned)
+        self.new.append(planned)
+        self.new_names[(type_name, name)] = planned
+        self._event(planned, execution, event_type, None, int(time.time() * 1000))
+
+    def _already_exists(self, event: t.Dict) -> None:
+        """Same as the AlreadyExistsError handler of `handle_event`, update the first artifact with the uri."""
+        existing = self._existing(event["artifact"]["uri"])
+        if not existing:
+            self.errors.append(
+                f"[merge_stage] Artifact {event['artifact']['name']} already exists with another uri, skipping it."
+            )
+            return
+        merge_artifact_custom_properties(existing[0].artifact, event["artifact"]["custom_properties"])
+        existing[0].dirty = True
+
+    def _versioned(self, execution, event: t.Dict, type_name: str, event_type: int) -> None:
+        """Same as `log_dataset_with_version` and `log_label_with_version`."""
+        props = event["artifact"]["properties"]
+        custom_props = event["artifact"]["custom_properties"]
+        c_hash = event["artifact"]["uri"]
+        url = event["artifact"]["name"].split(":")[0] + ":" + c_hash
+        existing = self._existing(c_hash) if c_hash and c_hash.strip() else []
+        if existing:
+            merge_artifact_custom_properties(existing[0].artifact, custom_props)
+            merge_artifact_url(existing[0].artifact, props.get("url", ""))
+            existing[0].dirty = True
+            self._link(execution, c_hash, url, event_type)
+        else:
+            uri = c_hash if c_hash and c_hash.strip() else str(uuid.uuid1())
+            self._create(
+                execution, event, type_name, uri, url, event_type,
+                {"git_repo": str(props.get("git_repo", "")), "Commit": str(c_hash), "url": props.get("url", " ")},
+                custom_props,
+            )
+
+    def _dataset(self, execution, event: t.Dict) -> None:
+        self._versioned(execution, event, "Dataset", INPUT if event["type"] == INPUT else OUTPUT)
+
+    def _label(self, execution, event: t.Dict) -> None:
+        self._versioned(execution, event, "Label", INPUT)
+
+    def _model(self, execution, event: t.Dict) -> None:
+        """Same as `log_model_with_version`."""
+        props = event["artifact"]["properties"]
+        c_hash = event["artifact"]["uri"]
+        event_type = INPUT if event["type"] == INPUT else OUTPUT
+        model_uri = event["artifact"]["name"].split(":")[0] + ":" + c_hash
+        url = props.get("url", "")
+        if not (c_hash and c_hash.strip()):
+            raise RuntimeError("Model commit failed, Model uri empty")
+        uri = c_hash.strip()
+        existing = self._existing(uri)
+        if existing:
+            for planned in existing:
+                merge_artifact_url(planned.artifact, url)
+                planned.dirty = True
+            self._link(execution, uri, model_uri, event_type)
+        else:
+            self._create(
+                execution, event, "Model", uri, model_uri + ":" + str(execution.id), event_type,
+                {
+                    "model_framework": props.get("model_framework", ""),
+                    "model_type": props.get("model_type", ""),
+                    "model_name": props.get("model_name", ""),
+                    "Commit": props.get("Commit", ""),
+                    "url": str(url),
+                },
+                event["artifact"]["custom_properties"],
+            )
+
+    def _metrics(self, execution, event: t.Dict) -> None:
+        """Same as `log_execution_metrics_from_client`."""
+        metrics_name = event["artifact"]["name"]
+        name_tokens = metrics_name.split(":")
+        if len(name_tokens) <= 2:
+            self.errors.append(f"[merge_stage] Error : metrics name {metrics_name} is not in the correct format")
+            return
+        name, uri = name_tokens[0], name_tokens[1]
+        new_metrics_name = f"{name}:{uri}:{execution.id}"
+        existing = self._existing(uri)
+        if not existing or existing[0].artifact.name != new_metrics_name:
+            self._create(
+                execution, event, "Metrics", uri, new_metrics_name, OUTPUT,
+                {"metrics_name": metrics_name}, event["artifact"]["custom_properties"],
+            )
+
+    def _step_metrics(self, execution, event: t.Dict) -> None:
+        """Same as `log_step_metrics_from_client`."""
+        props = event["artifact"]["properties"]
+        metrics_name = event["artifact"]["name"]
+        uri = event["artifact"]["uri"]
+        c_hash = uri.strip()
+        if self._existing(c_hash):
+            self._link(execution, c_hash, metrics_name, OUTPUT)
+        else:
+            self._create(
+                execution, event, "Step_Metrics", uri, metrics_name, OUTPUT,
+                {"Commit": props.get("Commit", ""), "url": props.get("url", "")},
+                event["artifact"]["custom_properties"],
+            )
+
+    def _dataslice(self, execution, event: t.Dict) -> None:
+        """Same as `log_dataslice_from_client`."""
+        props = event["artifact"]["properties"]
+        name = event["artifact"]["name"]
+        c_hash = event["artifact"]["uri"].strip()
+        if c_hash and self._existing(c_hash):
+            self._link_input(execution, event, c_hash, name)
+        else:
+            self._create(
+                execution, event, "Dataslice", c_hash, name, OUTPUT,
+                {"git_repo": props.get("git_repo", ""), "Commit": props.get("Commit", ""), "url": props.get("url", " ")},
+                event["artifact"]["custom_properties"],
+            )
+
+    def _environment(self, execution, event: t.Dict) -> None:
+        """Same as `log_python_env_from_client`."""
+        props = event["artifact"]["properties"]
+        c_hash = event["artifact"]["uri"]
+        url = event["artifact"]["name"].split(":")[0] + ":" + c_hash
+        existing = self._existing(c_hash) if c_hash and c_hash.strip() else []
+        if existing:
+            merge_artifact_url(existing[0].artifact, props.get("url", ""))
+            existing[0].dirty = True
+            self._link(execution, c_hash, url, INPUT)
+        else:
+            uri = c_hash if c_hash and c_hash.strip() else str(uuid.uuid1())
+            self._create(
+                execution, event, "Environment", uri, url, INPUT,
+                {"git_repo": str(props.get("git_repo", "")), "Commit": str(props.get("Commit", "")),
+                 "url": props.get("url", "")},
+            )
+
+
+class BulkMerger:
+    """Merge pipeline JSON (as exported by `CmfQuery.dumptojson`) into a store with a few batched writes per stage.
+
+    Produces the same contexts, executions, artifacts, events, attributions and associations as merging every
+    execution and event with the `Cmf` logging methods (`parse_json_to_mlmd` with `bulk=False`). Instead of looking
+    up and writing every node on its own, the stage's artifacts are fetched by uri and diffed against the incoming
+    events in memory, and all new and updated nodes are written with one `put_*` call per node kind. Neo4j graph
+    updates are not supported.
+
+    Ids of existing artifacts whose properties were changed by the merged stages are collected in
+    `updated_artifact_ids`. Such artifacts can be shared with other pipelines, whose exports change too.
+
+    Args:
+        store: MLMD store to merge into.
+        parent_context: Pipeline context the stages belong to.
+    """
+
+    def __init__(self, store, parent_context: mlpb.Context) -> None:  # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+        self.store = store
+        self.parent_context = parent_context
+        self.updated_artifact_ids: t.Set[int] = set()
+        self._execution_types: t.Dict[str, mlpb.ExecutionType] = {}   # type: ignore  # ExecutionType not recognized by mypy, using ignore to bypass
+        self._artifact_types: t.Dict[str, mlpb.ArtifactType] = {}     # type: ignore  # ArtifactType not recognized by mypy, using ignore to bypass
+
+    def merge_stage(self, stage: t.Dict, executions: t.Optional[t.List[t.Dict]] = None) -> None:
+        """Merge `executions` (all executions of `stage` if None) and their events.
+
+        Args:
+            stage: Stage dictionary of the pipeline JSON.
+            executions: Executions of the stage to merge.
+        """
+        executions = stage["executions"] if executions is None else executions
+        if not executions:
+            return
+        context = self._merge_context(stage)
+        merged = self._merge_executions(context, executions)
+        self._merge_artifacts(context, merged)
+
+    def _execution_type(self, type_name: str) -> mlpb.ExecutionType:  # type: ignore  # ExecutionType not recognized by mypy, using ignore to bypass
+        if type_name not in self._execution_types:
+            try:
+                execution_type = get_or_create_execution_type(self.store, type_name, EXECUTION_TYPE_PROPERTIES)
+            except AlreadyExistsError:
+                # Created by a concurrent merge.
+                execution_type = get_or_create_execution_type(self.store, type_name, EXECUTION_TYPE_PROPERTIES)
+            self._execution_types[type_name] = execution_type
+        return self._execution_types[type_name]
+
+    def _artifact_type(self, type_name: str) -> mlpb.ArtifactType:  # type: ignore  # ArtifactType not recognized by mypy, using ignore to bypass
+        if type_name not in self._artifact_types:
+            properties = _ARTIFACT_TYPE_PROPERTIES[type_name]
+            try:
+                artifact_type = get_or_create_artifact_type(self.store, type_name, properties)
+            except AlreadyExistsError:
+                # Created by a concurrent merge.
+                artifact_type = get_or_create_artifact_type(self.store, type_name, properties)
+            self._artifact_types[type_name] = artifact_type
+        return self._artifact_types[type_name]
+
+    def _merge_context(self, stage: t.Dict) -> mlpb.Context:  # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+        try:
+            context = get_or_create_run_context(self.store, stage["name"], stage["custom_properties"])
+        except AlreadyExistsError:
+            # Created by a concurrent merge of the same pipeline.
+            context = self.store.get_context_by_type_and_name(PIPELINE_STAGE, stage["name"])
+        associate_child_to_parent_context(self.store, self.parent_context, context)
+        return context
+
+    def _plan_executions(
+        self, context: mlpb.Context, executions: t.List[t.Dict]  # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+    ) -> t.Tuple[t.List[mlpb.Execution], t.List[t.Tuple[mlpb.Execution, t.Dict]]]:  # type: ignore  # Execution type not recognized by mypy, using ignore to bypass
+        """New and updated executions, and the execution each entry of `executions` merges into.
+
+        Executions with a name are reused, like `merge_created_execution` does, all others are created.
+        """
+        to_put: t.List[mlpb.Execution] = []   # type: ignore  # Execution type not recognized by mypy, using ignore to bypass
+        merged = []
+        named: t.Dict[t.Tuple[str, str], mlpb.Execution] = {}    # type: ignore  # Execution type not recognized by mypy, using ignore to bypass
+        for execution in executions:
+            try:
+                properties = execution["properties"]
+                execution_type = properties["Context_Type"]
+                execution_cmd = properties["Execution"]
+                execution_uuids = properties["Execution_uuid"]
+            except KeyError as e:
+                logger.error(f"[merge_stage] Execution {execution.get('id')} is missing property {e}, skipping it.")
+                continue
+            execution_type_id = self._execution_type(execution_type).id
+            git_end_commit = properties.get("Git_End_Commit", "")
+            name = execution["name"]
+            exe = None
+            if name != "":
+                exe = named.get((execution_type, name))
+                if exe is None:
+                    exe = self.store.get_execution_by_type_and_name(execution_type, name)
+                    if exe is not None:
+                        to_put.append(exe)
+                        named[(execution_type, name)] = exe
+            if exe is None:
+                exe = mlpb.Execution(  # type: ignore  # Execution type not recognized by mypy, using ignore to bypass
+                    type_id=execution_type_id,
+                    properties={
+                        EXECUTION_CONTEXT_NAME_PROPERTY_NAME: mlpb.Value(string_value=execution_type), # type: ignore  # Value type not recognized by mypy, using ignore to bypass
+                        EXECUTION_CONTEXT_ID: mlpb.Value(int_value=context.id),    # type: ignore  # Value type not recognized by mypy, using ignore to bypass
+                        EXECUTION_EXECUTION: mlpb.Value(string_value=execution_cmd),   # type: ignore  # Value type not recognized by mypy, using ignore to bypass
+                        EXECUTION_EXECUTION_TYPE_NAME: mlpb.Value(string_value=execution_type),    # type: ignore  # Value type not recognized by mypy, using ignore to bypass
+                        EXECUTION_PIPELINE_TYPE: mlpb.Value(string_value=self.parent_context.name),    # type: ignore  # Value type not recognized by mypy, using ignore to bypass
+                        EXECUTION_PIPELINE_ID: mlpb.Value(int_value=self.parent_context.id),   # type: ignore  # Value type not recognized by mypy, using ignore to bypass
+                        EXECUTION_REPO: mlpb.Value(string_value=properties.get("Git_Repo", "")),   # type: ignore  # Value type not recognized by mypy, using ignore to bypass
+                        EXECUTION_START_COMMIT: mlpb.Value(string_value=properties.get("Git_Start_Commit", "")),   # type: ignore  # Value type not recognized by mypy, using ignore to bypass
+                    },
+                    custom_properties={
+                        key: value_to_mlmd_value(value) for key, value in execution["custom_properties"].items()
+                    },
+                )
+                if name != "":
+                    exe.name = name
+                    named[(execution_type, name)] = exe
+                to_put.append(exe)
+            # Reused executions collect the uuids of every push.
+            uuids = exe.properties[EXECUTION_UNIQUE_ID].string_value
+            if uuids:
+                uuids = ",".join(dict.fromkeys(uuids.split(",") + execution_uuids.split(",")))
+            exe.properties[EXECUTION_UNIQUE_ID].string_value = uuids or execution_uuids
+            exe.properties[EXECUTION_END_COMMIT].string_value = git_end_commit
+            merged.append((exe, execution))
+        return to_put, merged
+
+    def _merge_executions(
+        self, context: mlpb.Context, executions: t.List[t.Dict]  # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+    ) -> t.List[t.Tuple[mlpb.Execution, t.Dict]]:  # type: ignore  # Execution type not recognized by mypy, using ignore to bypass
+        names = {
+            (execution["properties"].get("Context_Type"), execution["name"])
+            for execution in executions if execution["name"] != ""
+        }
+        with _EXECUTION_NAMES.claim(names):
+            for attempt in range(_ATTEMPTS):
+                to_put, merged = self._plan_executions(context, executions)
+                try:
+                    execution_ids = self.store.put_executions(to_put)
+                    break
+                except AlreadyExistsError:
+                    # A merge in another process created an execution with the same name, reuse it.
+                    if attempt == _ATTEMPTS - 1:
+                        raise
+        for exe, execution_id in zip(to_put, execution_ids):
+            exe.id = execution_id
+        self.store.put_attributions_and_associations(
+            [],
+            [mlpb.Association(execution_id=exe.id, context_id=context.id) for exe in to_put],   # type: ignore  # Association type not recognized by mypy, using ignore to bypass
+        )
+        return merged
+
+    def _get_artifacts(self, uris: t.Set[str]) -> t.List[mlpb.Artifact]:  # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
+        """Artifacts with one of `uris`."""
+        artifacts: t.List[mlpb.Artifact] = []    # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
+        quotable = sorted(uri for uri in uris if _quotable(uri))
+        for chunk in _chunks(quotable):
+            artifacts.extend(self.store.get_artifacts(list_options=ListOptions(filter_query=_in_filter("uri", chunk))))
+        for uri in uris.difference(quotable):
+            artifacts.extend(self.store.get_artifacts_by_uri(uri))
+        return artifacts
+
+    def _fetch_artifacts(self, uris: t.Set[str]) -> t.Dict[str, t.List[t.Tuple[mlpb.Artifact, t.Dict]]]:  # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
+        """Artifacts with one of `uris`, ordered by id, and their event types by execution id."""
+        artifacts = self._get_artifacts(uris)
+        events: t.Dict[int, t.Dict[int, t.Set[int]]] = {artifact.id: {} for artifact in artifacts}
+        artifact_ids = list(events)
+        for start in range(0, len(artifact_ids), _CHUNK_SIZE):
+            for event in self.store.get_events_by_artifact_ids(artifact_ids[start:start + _CHUNK_SIZE]):
+                events[event.artifact_id].setdefault(event.execution_id, set()).add(event.type)
+        by_uri: t.Dict[str, t.List[t.Tuple[mlpb.Artifact, t.Dict]]] = {}   # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
+        for artifact in sorted(artifacts, key=lambda a: a.id):
+            by_uri.setdefault(artifact.uri, []).append((artifact, events[artifact.id]))
+        return by_uri
+
+    def _existing_names(self, names: t.Iterable[t.Tuple[str, str]]) -> t.Set[t.Tuple[str, str]]:
+        """The (type name, artifact name) pairs of `names` that exist in the store."""
+        by_type: t.Dict[str, t.List[str]] = {}
+        for type_name, name in names:
+            by_type.setdefault(type_name, []).append(name)
+        existing = set()
+        for type_name, type_names in by_type.items():
+            quotable = [name for name in type_names if _quotable(name)]
+            for chunk in _chunks(quotable):
+                filter_query = f"type = '{type_name}' AND {_in_filter('name', chunk)}"
+                for artifact in self.store.get_artifacts(list_options=ListOptions(filter_query=filter_query)):
+                    existing.add((type_name, artifact.name))
+            for name in type_names:
+                if not _quotable(name) and self.store.get_artifact_by_type_and_name(type_name, name) is not None:
+                    existing.add((type_name, name))
+        return existing
+
+    @staticmethod
+    def _event_uris(merged: t.List[t.Tuple[mlpb.Execution, t.Dict]]) -> t.Set[str]:   # type: ignore  # Execution type not recognized by mypy, using ignore to bypass
+        """Uris of the artifacts that the events of `merged` can link, create or update."""
+        uris = set()
+        for _, execution in merged:
+            for event in execution["events"]:
+                uri = event["artifact"]["uri"]
+                uris.update((uri, uri.strip()))
+                if event["artifact"]["type"] == "Metrics":
+                    uris.update(event["artifact"]["name"].split(":")[1:2])
+        return uris
+
+    def _plan_artifacts(
+        self, context: mlpb.Context, merged: t.List[t.Tuple[mlpb.Execution, t.Dict]]   # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+    ) -> _StagePlan:
+        existing = self._fetch_artifacts(self._event_uris(merged))
+        taken: t.Set[t.Tuple[str, str]] = set()
+        while True:
+            plan = _StagePlan(self, context, existing, taken)
+            for exe, execution in merged:
+                for event in execution["events"]:
+                    plan.add(exe, event)
+            # New artifacts whose name is used by an artifact with another uri cannot be created. Replan with them
+            # marked as taken, so that later events with the same uri behave as in the per-event merge.
+            conflicts = self._existing_names(plan.new_names)
+            if not conflicts:
+                plan.versions = {
+                    (uri, artifact.id, artifact.last_update_time_since_epoch)
+                    for uri, artifacts in existing.items() for artifact, _ in artifacts
+                }
+                return plan
+            taken |= conflicts
+
+    def _unchanged(self, plan: _StagePlan, uris: t.Set[str]) -> bool:
+        """Whether artifacts with one of `uris` are the same as when `plan` was made."""
+        versions = {(a.uri, a.id, a.last_update_time_since_epoch) for a in self._get_artifacts(uris)}
+        return versions == {version for version in plan.versions if version[0] in uris}
+
+    def _merge_artifacts(
+        self, context: mlpb.Context, merged: t.List[t.Tuple[mlpb.Execution, t.Dict]]   # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+    ) -> None:
+        for attempt in range(_ATTEMPTS):
+            if attempt == _ATTEMPTS - 1:
+                # Do not replan while other merges keep writing the same uris: claim every uri the stage can write
+                # before planning, so no merge in this process changes them between planning and writing.
+                with _ARTIFACT_URIS.claim(self._event_uris(merged)):
+                    plan = self._plan_artifacts(context, merged)
+                    # A merge in another process can still create one of the artifacts, the stage fails then.
+                    self._put_artifacts(plan.new + plan.dirty)
+                break
+            plan = self._plan_artifacts(context, merged)
+            to_put = plan.new + plan.dirty
+            uris = {planned.artifact.uri for planned in to_put}
+            try:
+                with _ARTIFACT_URIS.claim(uris):
+                    # Plan again if a merge in this process wrote one of the uris since the plan was made.
+                    if self._unchanged(plan, uris):
+                        self._put_artifacts(to_put)
+                        break
+            except AlreadyExistsError:
+                # A merge in another process created one of the artifacts, link to it instead.
+                pass
+        # The store does not change artifacts written without changes.
+        self.updated_artifact_ids.update(
+            planned.artifact.id for planned in plan.dirty if planned.artifact != planned.original
+        )
+        for error in plan.errors:
+            logger.error(error)
+        created = [planned for planned in plan.new if planned.artifact.HasField("id")]
+        if created:
+            self.store.put_attributions_and_associations(
+                [mlpb.Attribution(context_id=context.id, artifact_id=planned.artifact.id) for planned in created],    # type: ignore  # Attribution type not recognized by mypy, using ignore to bypass
+                [],
+            )
+        events = []
+        for planned, execution_id, event_type, input_name, milliseconds_since_epoch in plan.events:
+            if not planned.artifact.HasField("id"):
+                continue
+            event = mlpb.Event(  # type: ignore  # Event type not recognized by mypy, using ignore to bypass
+                execution_id=execution_id,
+                artifact_id=planned.artifact.id,
+                type=event_type,
+                milliseconds_since_epoch=milliseconds_since_epoch,
+            )
+            if input_name is not None:
+                event.path.steps.add(key=input_name)
+            events.append(event)
+        self._put_events(events)
+
+    def _put_artifacts(self, to_put: t.List[_PlannedArtifact]) -> None:
+        """Write `to_put` and set the ids of new artifacts, artifacts that fail validation are left without id."""
+        if not to_put:
+            return
+        try:
+            artifact_ids = self.store.put_artifacts([planned.artifact for planned in to_put])
+        except InvalidArgumentError:
+            # Find the invalid artifacts, the per-event merge skips only their events too.
+            artifact_ids = []
+            for planned in to_put:
+                try:
+                    artifact_ids.extend(self.store.put_artifacts([planned.artifact]))
+                except InvalidArgumentError as e:
+                    logger.error(f"[merge_stage] Error in {planned.artifact.name}: {e}")
+                    artifact_ids.append(None)
+        for planned, artifact_id in zip(to_put, artifact_ids):
+            if artifact_id is not None:
+                planned.artifact.id = artifact_id
+
+    def _put_events(self, events: t.List[mlpb.Event]) -> None:  # type: ignore  # Event type not recognized by mypy, using ignore to bypass
+        if not events:
+            return
+        try:
+            self.store.put_events(events)
+        except AlreadyExistsError:
+            # A concurrent merge added some of the events, add the others.
+            existing = {
+                (event.artifact_id, event.execution_id, event.type)
+                for event in self.store.get_events_by_artifact_ids(list({event.artifact_id for event in events}))
+            }
+            events = [e for e in events if (e.artifact_id, e.execution_id, e.type) not in existing]
+            if events:
+                self.store.put_events(events)
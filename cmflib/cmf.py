@@ -59,6 +59,8 @@ from cmflib.metadata_helper import (
     get_artifacts_by_id,
     put_artifact,
     link_execution_to_input_artifact,
+    merge_artifact_url,
+    merge_artifact_custom_properties,
 )
 from cmflib.utils.cmf_config import CmfConfig
 from cmflib.utils.helper_functions import get_python_env, change_dir, get_md5_hash, get_postgres_config, calculate_md5
@@ -897,21 +899,7 @@ class Cmf:
                Returns:
                   Updates artifact in mlmd, does not returns anything.
         """
-        for key, value in artifact.properties.items():
-            if key == "url":
-                old_url = value.string_value
-                # If the old URL is empty or only contains spaces, assign the new URL directly.
-                if not old_url.strip():
-                    new_url = updated_url
-
-                # If the updated URL is not already present, append it with a comma separator.
-                elif updated_url not in old_url:
-                    new_url = f"{old_url},{updated_url}"
-
-                # If the updated URL is already present, keep the old URL unchanged.
-                else:
-                    new_url = old_url
-                artifact.properties[key].string_value = new_url
+        merge_artifact_url(artifact, updated_url)
         put_artifact(self.store, artifact)
 
     def update_model_url(self, dup_artifact: list, updated_url: str):
@@ -928,23 +916,8 @@ class Cmf:
                Returns:
                   List of updated artifacts.
         """
-        for art in dup_artifact:
-            dup_art = art
-            for key, value in dup_art.properties.items():
-                if key == "url":
-                    old_url = value.string_value
-                    # If the old URL is empty or only contains spaces, assign the new URL directly.
-                    if not old_url.strip():
-                        new_url = updated_url
-
-                    # If the updated URL is not already present, append it with a comma separator.
-                    elif updated_url not in old_url:
-                        new_url = f"{old_url},{updated_url}"
-
-                    # If the updated URL is already present, keep the old URL unchanged.
-                    else:
-                        new_url = old_url
-                    dup_art.properties[key].string_value = new_url
+        for dup_art in dup_artifact:
+            merge_artifact_url(dup_art, updated_url)
             put_artifact(self.store, dup_art)
         return dup_artifact
 
@@ -1377,22 +1350,7 @@ class Cmf:
           Returns: 
              None 
        """
-        for key, value in custom_properties.items():
-            if isinstance(value, int):
-                artifact.custom_properties[key].int_value = value
-            else:
-                 if key in {"labels", "labels_uri", "dataset_uri"}:
-                     existing_value = artifact.custom_properties[key].string_value
-                     if existing_value:
-                         temp = existing_value + "," + str(value)
-                         unique_values = set(temp.split(","))
-                         # join the unique_values 
-                         comma_sep_values = ",".join(list(unique_values))
-                         artifact.custom_properties[key].string_value = str(comma_sep_values)
-                     else: 
-                        artifact.custom_properties[key].string_value = str(value)
-                 else:
-                     artifact.custom_properties[key].string_value = str(value)
+        merge_artifact_custom_properties(artifact, custom_properties)
         put_artifact(self.store, artifact)
 
 
@@ -2,9 +2,14 @@ import json
 import typing as t
 from cmflib.cmfquery import CmfQuery
 from cmflib.cmf_merger import parse_json_to_mlmd
+from cmflib.key_lock import KeyLock
+from cmflib.store.store_pool import StorePool
 
+# Merges of the same execution uuids take turns, so that concurrent pushes of one execution do not both add it.
+EXECUTION_UUIDS = KeyLock()
 
-def identify_existing_and_new_executions(query: CmfQuery, pipeline_data: dict, pipeline_name: str) -> t.Tuple[list, list, list, str]:
+
+def identify_existing_and_new_executions(query: CmfQuery, pipeline_data: dict, pipeline_name: str) -> t.Tuple[t.FrozenSet[str], t.Set[str], t.Set[str], str]:
     """
     Identifies and compares existing executions from a given MLMD store path with those in the MLMD payload.
     This method supports both push and pull operations by analyzing execution UUIDs and identifying overlap
@@ -17,24 +22,19 @@ def identify_existing_and_new_executions(query: CmfQuery, pipeline_data: dict, p
 
     Returns:
         tuple: A 4-element tuple containing:
-        - executions_from_path (list): All execution UUIDs found in the MLMD store at the given path.
-        - list_executions_exists (list): Intersection of execution UUIDs between store and request (already present).
-        - executions_from_req (list): Execution UUIDs present in the incoming MLMD payload.
+        - executions_from_path (frozenset): All execution UUIDs found in the MLMD store at the given path.
+        - list_executions_exists (set): Intersection of execution UUIDs between store and request (already present).
+        - executions_from_req (set): Execution UUIDs present in the incoming MLMD payload.
         - status (str): Returns "version_update" if the payload is malformed or missing execution UUIDs.
     """
-    executions_from_path = []  # Stores existing execution UUIDs from the path
-    list_executions_exists: list[str] = []  # Stores the intersection of existing and new executions
-    executions_from_req = []  # Extract execution UUIDs from the MLMD data payload
+    list_executions_exists: t.Set[str] = set()  # Stores the intersection of existing and new executions
+    executions_from_req: t.Set[str] = set()  # Extract execution UUIDs from the MLMD data payload
     status = ""
 
     # For metadata push → path is the server MLMD store path
     # For metadata pull → path is the client MLMD store path
-    executions = query.get_all_executions_in_pipeline(pipeline_name)
-
-    # Collect all execution UUIDs from the queried data
-    for i in executions.index:
-        for uuid in executions['Execution_uuid'][i].split(","):
-            executions_from_path.append(uuid)
+    # The uuids come from an index of the store, which is only updated with executions changed since the last call.
+    executions_from_path = query.get_execution_uuids(pipeline_name)
 
     # For metadata push → mlmd_data comes from client MLMD file
     # For metadata pull → mlmd_data comes from server MLMD file
@@ -44,8 +44,7 @@ def identify_existing_and_new_executions(query: CmfQuery, pipeline_data: dict, p
                 continue                # which needs to be merged in irrespective of whether already
                                         # present or not so that new artifacts associated with it gets in.
             if 'Execution_uuid' in execution['properties']:
-                for uuid in execution['properties']['Execution_uuid'].split(","):
-                    executions_from_req.append(uuid)
+                executions_from_req.update(execution['properties']['Execution_uuid'].split(","))
             else:
                 # mlmd push is failed here
                 status = "version_update"
@@ -54,22 +53,103 @@ def identify_existing_and_new_executions(query: CmfQuery, pipeline_data: dict, p
     # Intersection check:
     # For metadata push → ensures only new executions get pushed
     # For metadata pull → ensures only missing executions get pull
-    if executions_from_path != []:
-        list_executions_exists = list(set(executions_from_path).intersection(set(executions_from_req)))
+    # Set lookups of the request uuids, the size of the store does not matter.
+    list_executions_exists = {uuid for uuid in executions_from_req if uuid in executions_from_path}
     return executions_from_path, list_executions_exists, executions_from_req, status
 
 
-def update_mlmd(query: CmfQuery, req_info: str, pipeline_name: str, cmd: str, exe_uuid: str) -> str:
+def merge_pipeline(
+    query: CmfQuery,
+    pipeline: dict,
+    pipeline_name: str,
+    cmd: str,
+    exe_uuid: str,
+    workers: int = 1,
+    store_pool: t.Optional[StorePool] = None,
+    updated_artifacts: t.Optional[t.Set[int]] = None,
+) -> str:
+    """
+    Merges the executions of one pipeline of the MLMD payload that do not exist in the store yet.
+
+    The execution uuids of the payload are claimed while the existing executions are identified and the new ones are
+    merged, so concurrent merges of other executions of the same pipeline are not blocked.
+
+    Args:
+        query (CmfQuery): The CmfQuery object.
+        pipeline (dict): Pipeline of the MLMD payload.
+        pipeline_name (str): The name of the pipeline.
+        cmd (str): The command being executed, either "push" or "pull."
+        exe_uuid (str, optional): User-provided execution UUID.
+        workers (int): Number of threads merging independent stages.
+        store_pool (StorePool, optional): Connections of the merge threads, see `parse_json_to_mlmd`.
+        updated_artifacts (Set[int], optional): Collects ids of existing artifacts the merge updated, see
+            `parse_json_to_mlmd`.
+
+    Returns: "exists", "success", "version_update" or "merge_failed", see `update_mlmd`.
+    """
+    uuids = {
+        uuid
+        for stage in pipeline['stages']
+        for execution in stage['executions']
+        for uuid in execution['properties'].get('Execution_uuid', '').split(',') if uuid
+    }
+    with EXECUTION_UUIDS.claim(uuids):
+        _, list_executions_exists, _, status = identify_existing_and_new_executions(
+            query, pipeline, pipeline_name
+        )
+        if status == "version_update":
+            return status
+
+        for stage in pipeline['stages']:
+            # Remove executions that already exist
+            stage['executions'] = [
+                cmf_exec for cmf_exec in stage['executions']
+                if list_executions_exists.isdisjoint(cmf_exec["properties"]["Execution_uuid"].split(","))
+            ]
+
+        # remove empty stages (those without remaining executions)
+        pipeline['stages'] = [stage for stage in pipeline['stages'] if stage['executions'] != []]
+
+        # determine if data remains to push/pull
+        if len(pipeline['stages']) == 0:
+            return "exists"
+        # metadata push → merge client data into server path
+        # metadata pull → merge server data into client path
+        path_to_store = query.filepath if cmd == "pull" else ""
+        status = parse_json_to_mlmd(
+            json.dumps(pipeline), path_to_store, cmd, exe_uuid, workers=workers, store_pool=store_pool,
+            updated_artifacts=updated_artifacts,
+        )
+        # parse_json_to_mlmd logs the stages that failed
+        return "success" if status == "success" else "merge_failed"
+
+
+def update_mlmd(
+    query: CmfQuery,
+    req_info: str,
+    pipeline_name: str,
+    cmd: str,
+    exe_uuid: str,
+    workers: int = 1,
+    store_pool: t.Optional[StorePool] = None,
+    updated_artifacts: t.Optional[t.Set[int]] = None,
+) -> str:
     """
     Updates metadata for a given pipeline by filtering out executions that already exist
     on the server and then pushing or pulling the remaining data.
-    
+
+    Concurrent calls only wait for each other when they merge the same execution uuids.
+
     Args:
         query (CmfQuery): The CmfQuery object.
         req_info (str): Contains MLMD data — client-side for push, server-side for pull.  
         pipeline_name (str): The name of the pipeline to update.
         cmd (str): The command being executed, either "push" or "pull."  
         exe_uuid (str, optional): User-provided execution UUID (default: None).  
+        workers (int): Number of threads merging stages that share no artifacts (default: 1).
+        store_pool (StorePool, optional): Connections of the merge threads, see `parse_json_to_mlmd`.
+        updated_artifacts (Set[int], optional): Collects ids of existing artifacts the merge updated, see
+            `parse_json_to_mlmd`.
     
     Returns: A status message indicating the result of the operation:
         - "pipeline_not_exist": Pipeline does not exists inside CMF server.
@@ -77,6 +157,7 @@ def update_mlmd(query: CmfQuery, req_info: str, pipeline_name: str, cmd: str, ex
         - "success": Execution successfully pushed to the CMF server.
         - "invalid_json_payload": If the JSON payload is invalid or incorrectly formatted.
         - "version_update": Mlmd push failed due to version update. 
+        - "merge_failed": Some of the executions could not be merged, others may have been merged.
     """
     # load the mlmd_data from the request info
     # in create executions we get full mlmd data
@@ -88,7 +169,6 @@ def update_mlmd(query: CmfQuery, req_info: str, pipeline_name: str, cmd: str, ex
     if not pipelines:
         return "invalid_json_payload"  # No pipelines found in payload
   
-    len_pipelines = len(pipelines)
     if pipeline_name:
         # in case of push check pipeline name exists inside mlmd_data
         pipeline = [pipeline for pipeline in pipelines if pipeline.get("name") == pipeline_name]
@@ -96,82 +176,108 @@ def update_mlmd(query: CmfQuery, req_info: str, pipeline_name: str, cmd: str, ex
             return "pipeline_not_exist"
 
         pipeline = pipeline[0]  # Extract the first matching pipeline    
+        return merge_pipeline(query, pipeline, pipeline_name, cmd, exe_uuid, workers, store_pool, updated_artifacts)
+    else:
+            status = ""
+            for pipeline in pipelines:
+                status = merge_pipeline(
+                    query, pipeline, pipeline.get("name"), cmd, exe_uuid, workers, store_pool, updated_artifacts
+                )
+                if status in ("version_update", "merge_failed"):
+                    return status
+            # we are passing this success in a very wrong way
+            return status
 
-        _, list_executions_exists, _, status = identify_existing_and_new_executions(
-            query, pipeline, pipeline_name
-        ) 
 
-        if status == "version_update":
-            return status
-        
-        # remove already existing executions from the data
-        for stage in pipeline['stages']:
-            # Create a new filtered list to avoid modifying while iterating
-            filtered_executions = []
-            # Iterate through executions and remove the ones that already exist
-            for cmf_exec in stage['executions']:
-                uuids = cmf_exec["properties"]["Execution_uuid"].split(",")
-                for uuid in uuids:
-                    if not any(uuid in list_executions_exists for uuid in uuids):
-                        filtered_executions.append(cmf_exec)
-            stage['executions'] = filtered_executions
+def iter_ndjson_pipelines(lines: t.Iterable[t.Union[str, bytes]], batch_size: int = 500) -> t.Iterator[dict]:
+    """
+    Rebuilds pipelines from the newline delimited JSON records of `CmfQuery.iter_ndjson`, in batches.
 
-        # remove empty stages (those without remaining executions)
-        pipeline['stages'] = [stage for stage in pipeline['stages'] if stage['executions'] != []]
+    Every yielded pipeline has the attributes of the pipeline and the stages (with their executions) of at most
+    `batch_size` executions, so it can be merged on its own. Only one batch is held in memory at a time.
 
-        # determine if data remains to push/pull
-        if len(pipeline['stages']) == 0 :
-            status="exists"
-        else:
-            # metadata push → merge client data into server path
-            # metadata pull → merge server data into client path
-            if cmd == "pull":
-                parse_json_to_mlmd(
-                    json.dumps(pipeline), query.filepath, cmd, exe_uuid
-                )
-            else:
-                parse_json_to_mlmd(
-                    json.dumps(pipeline), "", cmd, exe_uuid
-                )
-            status = "success"
-        return status
-    else:
-            for pipeline in pipelines:
-                pipeline_name = pipeline.get("name")
+    Args:
+        lines (Iterable[str | bytes]): Records, one per line. Empty lines are ignored.
+        batch_size (int): Maximum number of executions per yielded pipeline.
 
-                _, list_executions_exists, _, status = identify_existing_and_new_executions(
-                    query, pipeline, pipeline_name
-                )  
-                if status == "version_update":
-                    return status
+    Yields:
+        dict: Pipeline in the format of the `dumptojson` output.
+    """
+    if batch_size < 1:
+        raise ValueError(f"Batch size must be positive (batch_size={batch_size}).")
+    pipeline: t.Optional[dict] = None
+    stage: t.Optional[dict] = None
+    stages: t.List[dict] = []
+    size, batches = 0, 0
 
-                for stage in pipeline['stages']:
-                    # Iterate through executions and remove the ones that already exist
-                    for cmf_exec in stage['executions'][:]:
-                        uuids = cmf_exec["properties"]["Execution_uuid"].split(",")
-                        for uuid in uuids:
-                            if uuid in list_executions_exists:
-                                stage['executions'].remove(cmf_exec)
-
-                # remove empty stages (those without remaining executions)
-                pipeline['stages'] = [stage for stage in pipeline['stages'] if stage['executions'] != []]
-
-                # determine if data remains to push/pull
-                if len(pipeline['stages']) == 0 :
-                    status="exists"
-                else:
-                    # metadata push → merge client data into server path
-                    # metadata pull → merge server data into client path
-                    if cmd == "pull":
-                        parse_json_to_mlmd(
-                            json.dumps(pipeline), query.filepath, cmd, exe_uuid
-                        )
-                    else:
-                        parse_json_to_mlmd(
-                            json.dumps(pipeline), "", cmd, exe_uuid
-                        )
-                    # we are passing this success in a very wrong way
-                    status = "success"
+    def _batch() -> dict:
+        return dict(pipeline, stages=stages)
+
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if "pipeline" in record:
+            if pipeline is not None and (stages or batches == 0):
+                yield _batch()
+            pipeline, stage, stages, size, batches = record["pipeline"], None, [], 0, 0
+        elif "stage" in record:
+            if pipeline is None:
+                raise ValueError("Stage record without a preceding pipeline record.")
+            stage = dict(record["stage"], executions=[])
+            stages.append(stage)
+        elif "execution" in record:
+            if stage is None:
+                raise ValueError("Execution record without a preceding stage record.")
+            if not stages or stages[-1] is not stage:
+                # The stage continues from the previous batch.
+                stage = dict(stage, executions=[])
+                stages.append(stage)
+            stage["executions"].append(record["execution"])
+            size += 1
+            if size == batch_size:
+                yield _batch()
+                stages, size, batches = [], 0, batches + 1
+    if pipeline is not None and (stages or batches == 0):
+        yield _batch()
 
-            return status
 
+def update_mlmd_stream(
+    query: CmfQuery,
+    lines: t.Iterable[t.Union[str, bytes]],
+    pipeline_name: t.Optional[str],
+    cmd: str,
+    exe_uuid: t.Optional[str],
+    workers: int = 1,
+    batch_size: int = 500,
+    store_pool: t.Optional[StorePool] = None,
+) -> str:
+    """
+    Merges the newline delimited JSON records of `CmfQuery.iter_ndjson` as they arrive, `batch_size` executions at a
+    time, so memory use does not grow with the size of the pipelines.
+
+    Args:
+        query (CmfQuery): The CmfQuery object.
+        lines (Iterable[str | bytes]): Records, e.g. the lines of a streamed response.
+        pipeline_name (str, optional): Only merge this pipeline, None to merge all pipelines.
+        cmd (str): The command being executed, either "push" or "pull."
+        exe_uuid (str, optional): User-provided execution UUID.
+        workers (int): Number of threads merging stages that share no artifacts (default: 1).
+        batch_size (int): Maximum number of executions per merge.
+        store_pool (StorePool, optional): Connections of the merge threads, see `parse_json_to_mlmd`.
+
+    Returns: Status as in `update_mlmd`, "success" if any batch added metadata.
+    """
+    statuses: t.Set[str] = set()
+    found = False
+    for pipeline in iter_ndjson_pipelines(lines, batch_size):
+        if pipeline_name and pipeline.get("name") != pipeline_name:
+            continue
+        found = True
+        status = merge_pipeline(query, pipeline, pipeline.get("name"), cmd, exe_uuid, workers, store_pool)
+        if status in ("version_update", "merge_failed"):
+            return status
+        statuses.add(status)
+    if not found:
+        return "pipeline_not_exist" if pipeline_name else "invalid_json_payload"
+    return "success" if "success" in statuses else "exists"
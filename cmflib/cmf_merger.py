@@ -18,12 +18,15 @@ import json
 import os
 import logging
 import traceback
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 
 from cmflib.cmf import Cmf
+from cmflib.bulk_merger import BulkMerger
+from cmflib.store.store_pool import PooledStore, StorePool
 from ml_metadata.errors import AlreadyExistsError
 from ml_metadata.metadata_store import metadata_store
 from ml_metadata.proto import metadata_store_pb2 as mlpb
-from typing import Union
+from typing import List, Optional, Set, Union
 
 logger = logging.getLogger(__name__)
 
@@ -156,6 +159,81 @@ def process_execution(cmf_class, store, stage, execution):
         except Exception as e:
             logger.error(f"[process_execution] Error in event processing: {e}")
 
+def select_executions(stage, exec_uuid):
+    """
+    Returns the executions of a stage to merge.
+
+    Args:
+        stage: Stage dictionary containing execution and event data.
+        exec_uuid: Optional execution UUID to filter executions.
+    """
+    if exec_uuid is None:   #if exec_uuid is None we pass all the executions.
+        return stage["executions"]
+    # we pass executions for that specific uuid.
+    return [
+        execution for execution in stage["executions"]
+        if exec_uuid in execution['properties'].get("Execution_uuid", "").split(",")
+    ]
+
+def stage_keys(stage, executions) -> Set[str]:
+    """
+    Returns the stage name and the names and uris of artifacts the executions of a stage refer to.
+
+    Stages with disjoint keys do not read or write the same contexts and artifacts, so they can be merged in any order.
+    """
+    keys = {stage["name"]}
+    for execution in executions:
+        for event in execution["events"]:
+            keys.add(event["artifact"]["uri"])
+            keys.add(event["artifact"]["name"])
+    return keys
+
+def merge_stage_after(merger, stage, executions, dependencies: List[Future]) -> None:
+    """
+    Merges a stage once the merges of stages it shares artifacts with have finished.
+
+    The connection of the thread is taken from the pool before the stage claims any artifacts and returned once the
+    stage was merged, so threads of concurrent merges share the connections of the pool.
+    """
+    wait(dependencies)
+    try:
+        merger.store.pool.get()
+        merger.merge_stage(stage, executions)
+    except Exception as e:
+        logger.error(f"[process_stage] Error in stage processing: {e}")
+        raise
+    finally:
+        merger.store.pool.release()
+
+def merge_stages_in_parallel(merger, stages, exec_uuid, workers: int) -> List[str]:
+    """
+    Merges stages with the bulk merger in `workers` threads.
+
+    A stage sharing artifacts with earlier stages of the pipeline is merged after them, like in the sequential merge,
+    other stages are merged concurrently. A failed stage does not stop the merge of the other stages.
+
+    Args:
+        merger: BulkMerger with a `PooledStore`, which gives every thread its own connection.
+        stages: Stage dictionaries in pipeline order.
+        exec_uuid: Optional execution UUID to filter executions.
+        workers: Number of threads.
+    Returns:
+        Names of the stages that could not be merged.
+    """
+    futures: List[Future] = []
+    keys: List[Set[str]] = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for stage in stages:
+            executions = select_executions(stage, exec_uuid)
+            keys_of_stage = stage_keys(stage, executions)
+            # Tasks start in submission order, so a task only waits for tasks that already run.
+            dependencies = [
+                future for future, keys_of_earlier in zip(futures, keys) if not keys_of_earlier.isdisjoint(keys_of_stage)
+            ]
+            futures.append(pool.submit(merge_stage_after, merger, stage, executions, dependencies))
+            keys.append(keys_of_stage)
+    return [stage["name"] for stage, future in zip(stages, futures) if future.exception() is not None]
+
 def process_stage(cmf_class, stage, exec_uuid):
     """
     Processes a single stage including its executions and events.
@@ -169,16 +247,7 @@ def process_stage(cmf_class, stage, exec_uuid):
         cmd (str): The command to execute. If "push", the original_time_since_epoch is added to the custom_properties.
     """
 
-    # Filter executions based on execution UUID (if provided)
-    if exec_uuid is None:   #if exec_uuid is None we pass all the executions.
-        list_executions = stage["executions"]
-    elif exec_uuid is not None:  # elif exec_uuid is not None, we pass executions for that specific uuid.
-        list_executions = [
-            execution for execution in stage["executions"]
-            if exec_uuid in execution['properties'].get("Execution_uuid", "").split(",")
-        ]
-    else:
-        return "Invalid execution uuid given."
+    list_executions = select_executions(stage, exec_uuid)
 
     # Process each execution sequentially within the stage
     for execution in list_executions:
@@ -187,7 +256,16 @@ def process_stage(cmf_class, stage, exec_uuid):
         except Exception as e:
             logger.error(f"[process_stage] Error in execution processing: {e}")
 
-def parse_json_to_mlmd(mlmd_json, path_to_store: str, cmd: str, exec_uuid: Union[str, str]) -> Union[str, None]:
+def parse_json_to_mlmd(
+    mlmd_json,
+    path_to_store: str,
+    cmd: str,
+    exec_uuid: Union[str, str],
+    bulk: bool = True,
+    workers: int = 1,
+    store_pool: Optional[StorePool] = None,
+    updated_artifacts: Optional[Set[int]] = None,
+) -> Union[str, None]:
     """
     Parses a JSON string representing ML Metadata (MLMD) and stores it in a specified path.
     Args:
@@ -195,8 +273,12 @@ def parse_json_to_mlmd(mlmd_json, path_to_store: str, cmd: str, exec_uuid: Union
         path_to_store (str): The file path where the MLMD data should be stored.
         cmd (str): The command to execute. If "push", the original_time_since_epoch is added to the custom_properties.
         exec_uuid (Union[str, str]): The execution UUID. If None, all executions are processed. If a specific UUID is provided, only executions with that UUID are processed.
+        bulk (bool): Merge every stage with a few batched writes (BulkMerger) instead of one Cmf logging call per execution and event. Ignored when the graph is enabled.
+        workers (int): Number of threads merging stages that share no artifacts concurrently. Only used by the bulk merge with a `store_pool`.
+        store_pool (StorePool, optional): Connections to the store at `path_to_store` used by the merge threads. The pool is shared by all merges of the process and bounds the number of their connections.
+        updated_artifacts (Set[int], optional): Ids of existing artifacts the merge updated are added to this set (see `BulkMerger.updated_artifact_ids`). Without the bulk merge, ids of all existing artifacts the merged events refer to are added.
     Returns:
-        Union[str, None]: Returns a string message if an invalid execution UUID is given, "success" if parsing is successful, otherwise an error message.
+        Union[str, None]: Returns a string message if an invalid execution UUID is given, "success" if parsing is successful, otherwise an error message, also if only some stages could not be merged.
     Raises:
         Exception: If any error occurs during the parsing or storing process, an exception is raised and the error message is printed.
     Notes:
@@ -233,13 +315,39 @@ def parse_json_to_mlmd(mlmd_json, path_to_store: str, cmd: str, exec_uuid: Union
             cmf_class = Cmf(filepath=path_to_store, pipeline_name=pipeline_name,  #intializing cmf
                             graph=graph, is_server=True)
 
-        # Process each stage sequentially
-        for stage in data["stages"]:
-            try:
-                process_stage(cmf_class, stage, exec_uuid)
-            except Exception as e:
-                logger.error(f"[process_stage] Error in stage processing: {e}")
+        # The bulk merger does not update the neo4j graph
+        merger = BulkMerger(cmf_class.store, cmf_class.parent_context) if bulk and not graph else None
+
+        if merger is not None and workers > 1 and store_pool is not None:
+            # MLMD connections must not be shared by threads.
+            merger = BulkMerger(PooledStore(store_pool), cmf_class.parent_context)
+            failed = merge_stages_in_parallel(merger, data["stages"], exec_uuid, workers)
+        else:
+            # Process each stage sequentially
+            failed = []
+            for stage in data["stages"]:
+                try:
+                    if merger is not None:
+                        merger.merge_stage(stage, select_executions(stage, exec_uuid))
+                    else:
+                        if updated_artifacts is not None:
+                            # The Cmf logging methods do not tell which artifacts they update.
+                            uris = {
+                                event["artifact"]["uri"]
+                                for execution in select_executions(stage, exec_uuid) for event in execution["events"]
+                            }
+                            for uri in uris:
+                                updated_artifacts.update(a.id for a in cmf_class.store.get_artifacts_by_uri(uri))
+                        process_stage(cmf_class, stage, exec_uuid)
+                except Exception as e:
+                    logger.error(f"[process_stage] Error in stage processing: {e}")
+                    failed.append(stage["name"])
+        if merger is not None and updated_artifacts is not None:
+            updated_artifacts |= merger.updated_artifact_ids
 
+        # A failed stage does not stop the merge of the other stages, but the merge is not successful.
+        if failed:
+            return f"Failed to merge stages: {', '.join(failed)}"
         return "success"
 
     except Exception as e:
@@ -17,18 +17,38 @@ import abc
 import time
 import json
 import logging
+import threading
 import typing as t
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from google.protobuf.json_format import MessageToDict
 from itertools import chain
+from ml_metadata.metadata_store import ListOptions, OrderByField
 from ml_metadata.proto import metadata_store_pb2 as mlpb
 from cmflib.mlmd_objects import CONTEXT_LIST
+from cmflib.metadata_helper import PARENT_CONTEXT_TYPE_NAME, PIPELINE_STAGE
 from cmflib.cmf_merger import parse_json_to_mlmd
+from cmflib.lineage_graph import LineageGraph
+from cmflib.metrics_summary import AGGREGATIONS, summarize_parquet
+from cmflib.query_cache import QueryCache, cached
+from cmflib.query_results import RESULT_FORMATS, convert_result, rows_to_result
+from cmflib.sql_catalog import SqlCatalog
 from cmflib.store.postgres import PostgresStore
 from cmflib.store.sqllite_store import SqlliteStore
+from cmflib.store.sql_reader import SqlReader
+from cmflib.store.store_pool import PooledStore, StorePool
 from cmflib.utils.helper_functions import get_postgres_config
 
+# Sort orders supported by paginated iterators: ml-metadata order field and the filter query column.
+_ORDER_BY_FIELDS = {
+    "id": (OrderByField.ID, "id"),
+    "create_time": (OrderByField.CREATE_TIME, "create_time_since_epoch"),
+    "update_time": (OrderByField.UPDATE_TIME, "last_update_time_since_epoch"),
+}
+
 # Constants for filtering artifact and execution types in lineage visualizations
 EXCLUDED_ARTIFACT_TYPES = ["Environment", "Label"]
 
@@ -111,6 +131,162 @@ class _PrefixMapper(_KeyMapper):
         return self.prefix + key
 
 
+def _join_json(elements: t.Iterable[t.Iterator[str]]) -> t.Iterator[str]:
+    """Join JSON elements, each given as an iterator of chunks, with the separator used by `json.dumps`.
+
+    Elements that yield no chunks are skipped, which lets producers decide lazily whether to emit an element.
+    """
+    separator = ""
+    for element in elements:
+        for index, chunk in enumerate(element):
+            if index == 0:
+                chunk, separator = separator + chunk, ", "
+            yield chunk
+
+
+class _ContextIndex:
+    """Name to context maps of pipelines (parent contexts) and their stages (child contexts).
+
+    Contexts are never renamed or deleted, new ones are only added. The index is rebuilt when the most recently
+    updated context changes, or when a stage that was not linked to its pipeline at build time got linked since.
+    Unlinked stages are checked for `grace_ms` after they were created, a stage left unlinked longer (e.g., by a
+    crash between creating and linking it) is not checked again.
+
+    Args:
+        store: MLMD store.
+        grace_ms: Milliseconds after their creation that unlinked stages are checked on every refresh.
+    """
+
+    def __init__(self, store, grace_ms: int = 60000) -> None:
+        self.store = store
+        self.grace_ms = grace_ms
+        self.watermark: t.Optional[t.Tuple[int, int]] = None
+        # Creation times of stages that were not linked to a pipeline at build time, by id.
+        self.orphans: t.Dict[int, int] = {}
+        self.pipelines: t.List[mlpb.Context] = []   # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+        self.pipelines_by_name: t.Dict[str, t.List[mlpb.Context]] = {}   # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+        self.stages: t.Dict[int, t.List[mlpb.Context]] = {}   # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+        self.stages_by_name: t.Dict[str, t.List[mlpb.Context]] = {}   # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+        self._lock = threading.Lock()
+
+    def _store_watermark(self) -> t.Optional[t.Tuple[int, int]]:
+        """Id and update time of the most recently created or updated context."""
+        contexts = self.store.get_contexts(
+            list_options=ListOptions(limit=1, order_by=OrderByField.UPDATE_TIME, is_asc=False)
+        )
+        return (contexts[0].id, contexts[0].last_update_time_since_epoch) if contexts else None
+
+    def refresh(self, force: bool = False) -> "_ContextIndex":
+        """Rebuild the index if contexts changed since the last build, or unconditionally if `force` is True."""
+        with self._lock:
+            watermark = self._store_watermark()
+            if force or self.watermark is None or watermark != self.watermark or self._orphan_linked():
+                self._build(watermark)
+        return self
+
+    def _orphan_linked(self) -> bool:
+        """Whether one of the unlinked stages got linked to a pipeline, must be called with the lock held."""
+        now = int(time.time() * 1000)
+        for stage_id, created in list(self.orphans.items()):
+            if now - created > self.grace_ms:
+                del self.orphans[stage_id]
+            elif self.store.get_parent_contexts_by_context(stage_id):
+                return True
+        return False
+
+    def _build(self, watermark: t.Optional[t.Tuple[int, int]]) -> None:
+        contexts = self.store.get_contexts()
+        context_types = {ctx_type.id: ctx_type.name for ctx_type in self.store.get_context_types()}
+        pipeline_types = {type_id for type_id, name in context_types.items() if name == PARENT_CONTEXT_TYPE_NAME}
+        pipelines, pipelines_by_name, stages, stages_by_name = [], {}, {}, {}
+        linked = set()
+        for ctx in contexts:
+            if ctx.type_id in pipeline_types:
+                pipelines.append(ctx)
+                pipelines_by_name.setdefault(ctx.name, []).append(ctx)
+        for pipeline in pipelines:
+            stages[pipeline.id] = self.store.get_children_contexts_by_context(pipeline.id)
+            for stage in stages[pipeline.id]:
+                stages_by_name.setdefault(stage.name, []).append(stage)
+                linked.add(stage.id)
+        self.pipelines, self.pipelines_by_name, self.stages, self.stages_by_name = (
+            pipelines, pipelines_by_name, stages, stages_by_name
+        )
+        # A stage is linked to its pipeline right after it is created, which does not change the watermark.
+        now = int(time.time() * 1000)
+        self.orphans = {
+            ctx.id: ctx.create_time_since_epoch for ctx in contexts
+            if ctx.id not in linked and context_types.get(ctx.type_id) == PIPELINE_STAGE
+            and now - ctx.create_time_since_epoch <= self.grace_ms
+        }
+        self.watermark = watermark
+
+
+class _PipelineUuids:
+    """Execution uuids of one pipeline and the state needed to update them."""
+
+    __slots__ = ("stage_ids", "watermark", "uuids")
+
+    def __init__(self) -> None:
+        self.stage_ids: t.Set[int] = set()
+        self.watermark: t.Optional[int] = None
+        self.uuids: t.FrozenSet[str] = frozenset()
+
+
+class _ExecutionUuidIndex:
+    """Sets of `Execution_uuid` values of executions, per pipeline.
+
+    Executions are never deleted and their uuids are only added (a reused execution collects the uuids of every
+    push), so once the executions of a stage were read, only executions updated since the last refresh are read
+    again. The watermark trails the newest update time seen by `slack_ms`, so that executions written by
+    transactions that committed late are not missed.
+
+    Args:
+        store: MLMD store.
+        slack_ms: Milliseconds of updates before the watermark that are read again on every refresh.
+    """
+
+    def __init__(self, store, slack_ms: int = 10000) -> None:
+        self.store = store
+        self.slack_ms = slack_ms
+        self._pipelines: t.Dict[int, _PipelineUuids] = {}
+        self._lock = threading.Lock()
+
+    def get(self, pipeline_id: int, stage_ids: t.Iterable[int]) -> t.FrozenSet[str]:
+        """Return execution uuids of the given pipeline, whose stages are `stage_ids`."""
+        with self._lock:
+            entry = self._pipelines.setdefault(pipeline_id, _PipelineUuids())
+            stage_ids = set(stage_ids)
+            new_stages, known_stages = stage_ids - entry.stage_ids, stage_ids & entry.stage_ids
+            since = None if entry.watermark is None else entry.watermark - self.slack_ms
+            uuids: t.Set[str] = set()
+            if new_stages:
+                self._read(entry, new_stages, None, uuids)
+            if known_stages:
+                self._read(entry, known_stages, since, uuids)
+            entry.stage_ids |= new_stages
+            if not uuids <= entry.uuids:
+                entry.uuids = entry.uuids | uuids
+            return entry.uuids
+
+    def version(self, pipeline_id: int, stage_ids: t.Iterable[int]) -> t.Tuple[t.Optional[int], int]:
+        """Return the newest execution update time and the number of execution uuids of the given pipeline."""
+        uuids = self.get(pipeline_id, stage_ids)
+        with self._lock:
+            return self._pipelines[pipeline_id].watermark, len(uuids)
+
+    def _read(self, entry: _PipelineUuids, stage_ids: t.Set[int], since: t.Optional[int], uuids: t.Set[str]) -> None:
+        """Add uuids of executions of `stage_ids` updated at or after `since` to `uuids`."""
+        filter_query = f"contexts_a.id IN ({', '.join(str(stage_id) for stage_id in sorted(stage_ids))})"
+        if since is not None:
+            filter_query += f" AND last_update_time_since_epoch >= {since}"
+        for execution in self.store.get_executions(list_options=ListOptions(filter_query=filter_query)):
+            if "Execution_uuid" in execution.properties:
+                uuids.update(uuid for uuid in execution.properties["Execution_uuid"].string_value.split(",") if uuid)
+            if entry.watermark is None or execution.last_update_time_since_epoch > entry.watermark:
+                entry.watermark = execution.last_update_time_since_epoch
+
+
 class CmfQuery(object):
     """CMF Query communicates with the MLMD database and implements basic search and retrieval functionality.
 
@@ -122,9 +298,28 @@ class CmfQuery(object):
 
     Args:
         filepath: Path to the MLMD database file.
+        is_server: Connect to the PostgreSQL database configured for cmf-server instead of `filepath`.
+        read_backend: "mlmd" to read through the ml-metadata API, or "sql" to serve bulk reads (executions and
+            artifacts of a pipeline) with direct SQL against the MLMD schema. Writes always use ml-metadata.
+        result_format: Table type returned by bulk execution/artifact/event methods: "pandas" (default), "arrow"
+            (pyarrow.Table) or "polars" (requires polars). Arrow and polars results dictionary-encode repetitive
+            columns such as type, stage and pipeline names.
+        pool_size: If not None, every thread uses its own MLMD connection from a pool of at most this many
+            connections (see `StorePool`), so one CmfQuery can serve concurrent requests. By default one connection
+            is shared, and the object must not be used by several threads at the same time.
     """
 
-    def __init__(self, filepath: str = "mlmd", is_server=False) -> None:
+    def __init__(
+        self,
+        filepath: str = "mlmd",
+        is_server=False,
+        read_backend: str = "mlmd",
+        result_format: str = "pandas",
+        pool_size: t.Optional[int] = None,
+    ) -> None:
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unsupported result format '{result_format}', expected one of {RESULT_FORMATS}.")
+        self.result_format = result_format
         self.filepath = filepath
         temp_store: t.Union[PostgresStore, SqlliteStore]
         if is_server:
@@ -132,7 +327,49 @@ class CmfQuery(object):
             temp_store = PostgresStore(config_dict)
         else:
             temp_store = SqlliteStore({"filename": filepath})
-        self.store = temp_store.connect()
+        self.store: t.Any
+        self.store_pool: t.Optional[StorePool] = None
+        if pool_size is not None:
+            self.store_pool = StorePool(temp_store.connect, max_size=pool_size)
+            self.store = PooledStore(self.store_pool)
+        else:
+            self.store = temp_store.connect()
+        self.is_server = is_server
+        self.sql_reader: t.Optional[SqlReader] = None
+        if read_backend == "sql":
+            self.sql_reader = self._connect_sql_reader()
+        elif read_backend != "mlmd":
+            raise ValueError(f"Unsupported read backend '{read_backend}', expected 'mlmd' or 'sql'.")
+        self.cache: t.Optional[QueryCache] = None
+        self._lineage_graph: t.Optional[LineageGraph] = None
+        self._sql_catalog: t.Optional[SqlCatalog] = None
+        self._context_index = _ContextIndex(self.store)
+        self._execution_uuids = _ExecutionUuidIndex(self.store)
+
+    def _connect_sql_reader(self) -> SqlReader:
+        if self.is_server:
+            return SqlReader.from_postgres(get_postgres_config())
+        return SqlReader.from_sqlite(self.filepath)
+
+    def enable_cache(self, max_entries: int = 128, max_bytes: int = 256 * 1024 * 1024) -> QueryCache:
+        """Memoize results of bulk read methods until the store changes.
+
+        Cached methods are keyed by name and arguments. The cache is dropped whenever the store version stamp
+        (see `SqlReader.get_store_version`) changes, and callers receive copies of cached data frames.
+
+        Args:
+            max_entries: Maximum number of cached results.
+            max_bytes: Maximum approximate size of cached results in bytes.
+        Returns:
+            The cache, e.g., to inspect `hits` and `misses`.
+        """
+        reader = self.sql_reader or self._connect_sql_reader()
+        self.cache = QueryCache(reader.get_store_version, max_entries=max_entries, max_bytes=max_bytes)
+        return self.cache
+
+    def disable_cache(self) -> None:
+        """Stop memoizing results and drop the cached ones."""
+        self.cache = None
 
     @staticmethod
     def _copy(
@@ -181,6 +418,25 @@ class CmfQuery(object):
         Returns:
             Pandas data frame with one row containing data from `node`.
         """
+        return pd.DataFrame(
+            CmfQuery._transform_to_dict(node, d),
+            index=[
+                0,
+            ],
+        )
+
+    @staticmethod
+    def _transform_to_dict(
+        node: t.Union[mlpb.Execution, mlpb.Artifact], d: t.Optional[t.Dict] = None  # type: ignore  # Execution, Artifact type not recognized by mypy, using ignore to bypass
+    ) -> t.Dict:
+        """Transform MLMD entity `node` to one row of a result table.
+
+        Args:
+            node: MLMD entity to transform.
+            d: Pre-populated dictionary of KV-pairs to associate  with `node` (will become columns in output table).
+        Returns:
+            Dictionary with properties and prefixed custom properties of `node` added to `d`.
+        """
         if d is None:
             d = {}
 
@@ -194,13 +450,24 @@ class CmfQuery(object):
             target=d, # renaming custom_properties with prefix custom_properties has impact in server GUI 
             key_mapper=_PrefixMapper("custom_properties_", on_collision=_KeyMapper.OnCollision.RESOLVE),
         )
+        return d
 
-        return pd.DataFrame(
-            d,
-            index=[
-                0,
-            ],
-        )
+    def _as_result(self, rows: t.List[t.Dict], columns: t.Optional[t.List[str]] = None) -> t.Any:
+        """Build the result table of a bulk method in `self.result_format` from row dictionaries.
+
+        Args:
+            rows: One dictionary per row, see `_transform_to_dict`.
+            columns: Fixed column names and order, if None columns are sorted by name (same as `_as_pandas_df`).
+        Returns:
+            pandas data frame, pyarrow table or polars data frame.
+        """
+        return rows_to_result(rows, self.result_format, columns)
+
+    def _from_sql_reader(self, method: t.Callable, *args) -> t.Any:
+        """Call a `SqlReader` method and return its result in `self.result_format`."""
+        if self.result_format == "pandas":
+            return method(*args)
+        return convert_result(method(*args, result_format="arrow"), self.result_format)
 
     @staticmethod
     def _as_pandas_df(elements: t.Iterable, transform_fn: t.Callable[[t.Any], pd.DataFrame]) -> pd.DataFrame:
@@ -226,10 +493,10 @@ class CmfQuery(object):
         Returns:
             List of objects associated with pipelines.
         """
-        pipelines: t.List[mlpb.Context] = self.store.get_contexts_by_type("Parent_Context") # type: ignore  # Context type not recognized by mypy, using ignore to bypass
-        if name is not None:
-            pipelines = [pipeline for pipeline in pipelines if pipeline.name == name]
-        return pipelines
+        index = self._context_index.refresh()
+        if name is None:
+            return list(index.pipelines)
+        return list(index.pipelines_by_name.get(name, []))
 
     def _get_pipeline(self, name: str) -> t.Optional[mlpb.Context]: # type: ignore  # Context type not recognized by mypy, using ignore to bypass
         """Return a pipeline with the given name or None if one does not exist.
@@ -254,8 +521,25 @@ class CmfQuery(object):
         Returns:
             List of associated pipeline stages.
         """
+        index = self._context_index.refresh()
+        if pipeline_id in index.stages:
+            return list(index.stages[pipeline_id])
         return self.store.get_children_contexts_by_context(pipeline_id)
 
+    def _get_stages_by_name(self, stage_name: str) -> t.List[mlpb.Context]:  # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+        """Return stages with the given name, looked up in the context index.
+
+        Args:
+            stage_name: Stage name.
+        Returns:
+            List of stages, in the order of their pipelines.
+        """
+        stages = self._context_index.refresh().stages_by_name.get(stage_name)
+        if stages is None:
+            # The stage may have been linked to its pipeline after the index was built.
+            stages = self._context_index.refresh(force=True).stages_by_name.get(stage_name, [])
+        return list(stages)
+
     def _get_executions(self, stage_id: int, execution_id: t.Optional[int] = None) -> t.List[mlpb.Execution]:   # type: ignore  # Execution type not recognized by mypy, using ignore to bypass
         """Return executions of the given stage.
 
@@ -371,6 +655,7 @@ class CmfQuery(object):
         )
         return list(artifact_ids)
 
+    @cached
     def get_pipeline_names(self) -> t.List[str]:
         """Return names of all pipelines.
 
@@ -379,6 +664,7 @@ class CmfQuery(object):
         """
         return [ctx.name for ctx in self._get_pipelines()]
 
+    @cached
     def get_pipeline_id(self, pipeline_name: str) -> int:
         """Return pipeline identifier for the pipeline names `pipeline_name`.
 
@@ -391,6 +677,7 @@ class CmfQuery(object):
         pipeline: t.Optional[mlpb.Context] = self._get_pipeline(pipeline_name)  # type: ignore  # Context type not recognized by mypy, using ignore to bypass
         return -1 if not pipeline else pipeline.id
 
+    @cached
     def get_pipeline_stages(self, pipeline_name: str) -> t.List[str]:
         """Return list of pipeline stages for the pipeline with the given name.
 
@@ -416,10 +703,8 @@ class CmfQuery(object):
         Returns:
             List of executions for the given stage.
         """
-        for pipeline in self._get_pipelines():
-            for stage in self._get_stages(pipeline.id):
-                if stage.name == stage_name:
-                    return self.store.get_executions_by_context(stage.id)
+        for stage in self._get_stages_by_name(stage_name):
+            return self.store.get_executions_by_context(stage.id)
         return []
 
     def get_all_executions_by_ids_list(self, exe_ids: t.List[int]) -> pd.DataFrame:
@@ -432,13 +717,10 @@ class CmfQuery(object):
             Data frame with all executions for the list of given execution identifiers.
         """
 
-        df = pd.DataFrame()
         executions = self.store.get_executions_by_id(exe_ids)
-        for exe in executions:
-            d1 = self._transform_to_dataframe(exe)
-            df = pd.concat([df, d1], sort=True, ignore_index=True)
-        return df
+        return self._as_result([self._transform_to_dict(exe) for exe in executions])
 
+    @cached
     def get_all_artifacts_by_context(self, pipeline_name: str) -> pd.DataFrame:
         """Return artifacts for given pipeline name as a pandas data frame.
 
@@ -448,7 +730,10 @@ class CmfQuery(object):
         Returns:
             Data frame with all artifacts associated with given pipeline name.
         """
-        df = pd.DataFrame()
+        if self.sql_reader is not None:
+            return self._from_sql_reader(self.sql_reader.get_all_artifacts_by_context, pipeline_name)
+        rows: t.List[t.Dict] = []
+        type_names: t.Dict[int, str] = {}
         contexts = self.store.get_contexts_by_type("Parent_Context")
         context_id = self.get_pipeline_id(pipeline_name)
         for ctx in contexts:
@@ -456,10 +741,8 @@ class CmfQuery(object):
                 child_contexts = self.store.get_children_contexts_by_context(ctx.id)
                 for cc in child_contexts:
                     artifacts = self.store.get_artifacts_by_context(cc.id)
-                    for art in artifacts:
-                        d1 = self.get_artifact_df(art)
-                        df = pd.concat([df, d1], sort=True, ignore_index=True)
-        return df
+                    rows.extend(self._artifact_to_dict(art, type_names=type_names) for art in artifacts)
+        return self._as_result(rows)
 
     def get_all_artifacts_by_ids_list(self, artifact_ids: t.List[int]) -> pd.DataFrame:
         """Return all artifacts for the given artifact ids list.
@@ -470,13 +753,11 @@ class CmfQuery(object):
         Returns:
             Data frame with all artifacts for the given artifact ids list.
         """
-        df = pd.DataFrame()
         artifacts = self.store.get_artifacts_by_id(artifact_ids)
-        for art in artifacts:
-            d1 = self.get_artifact_df(art)
-            df = pd.concat([df, d1], sort=True, ignore_index=True)
-        return df
+        type_names: t.Dict[int, str] = {}
+        return self._as_result([self._artifact_to_dict(art, type_names=type_names) for art in artifacts])
 
+    @cached
     def get_all_executions_in_stage(self, stage_name: str) -> pd.DataFrame:
         """Return executions of the given stage as pandas data frame.
         
@@ -486,16 +767,56 @@ class CmfQuery(object):
         Returns:
             Data frame with all executions associated with the given stage.
         """
-        df = pd.DataFrame()
-        for pipeline in self._get_pipelines():
-            for stage in self._get_stages(pipeline.id):
-                if stage.name == stage_name:
-                    for execution in self._get_executions(stage.id):
-                        ex_as_df: pd.DataFrame = self._transform_to_dataframe(
-                            execution, {"id": execution.id, "name": execution.name}
-                        )
-                        df = pd.concat([df, ex_as_df], sort=True, ignore_index=True)
-        return df
+        rows: t.List[t.Dict] = []
+        for stage in self._get_stages_by_name(stage_name):
+            for execution in self._get_executions(stage.id):
+                rows.append(self._transform_to_dict(execution, {"id": execution.id, "name": execution.name}))
+        return self._as_result(rows)
+
+    def get_all_executions_in_stages(
+        self, pipeline_name: str, stage_names: t.Optional[t.List[str]] = None
+    ) -> t.Dict[str, t.Any]:
+        """Return executions of all (or selected) stages of the given pipeline.
+
+        Executions of all stages are fetched with one store call and split by their stage (`Context_ID`).
+
+        Args:
+            pipeline_name: Name of the pipeline.
+            stage_names: Names of stages to return executions for, all stages of the pipeline if None.
+        Returns:
+            Dictionary mapping stage names, in pipeline order, to data frames with the same content as
+            `get_all_executions_in_stage` returns for the respective stage.
+        """
+        stages = [stage for pipeline in self._get_pipelines(pipeline_name) for stage in self._get_stages(pipeline.id)]
+        if stage_names is not None:
+            selected = set(stage_names)
+            stages = [stage for stage in stages if stage.name in selected]
+        executions_by_stage: t.Dict[int, t.List[mlpb.Execution]] = {stage.id: [] for stage in stages}   # type: ignore  # Execution type not recognized by mypy, using ignore to bypass
+        if stages:
+            # Same order as `get_executions_by_context`: newest first.
+            executions = self.store.get_executions(
+                list_options=ListOptions(
+                    order_by=OrderByField.CREATE_TIME,
+                    is_asc=False,
+                    filter_query=f"contexts_a.id IN ({', '.join(str(stage_id) for stage_id in executions_by_stage)})",
+                )
+            )
+            for execution in executions:
+                if "Context_ID" in execution.properties:
+                    stage_ids = [execution.properties["Context_ID"].int_value]
+                else:
+                    stage_ids = [ctx.id for ctx in self.store.get_contexts_by_execution(execution.id)]
+                for stage_id in stage_ids:
+                    if stage_id in executions_by_stage:
+                        executions_by_stage[stage_id].append(execution)
+
+        rows: t.Dict[str, t.List[t.Dict]] = {}
+        for stage in stages:
+            rows.setdefault(stage.name, []).extend(
+                self._transform_to_dict(execution, {"id": execution.id, "name": execution.name})
+                for execution in executions_by_stage[stage.id]
+            )
+        return {stage_name: self._as_result(stage_rows) for stage_name, stage_rows in rows.items()}
 
     def get_artifact_df(self, artifact: mlpb.Artifact, d: t.Optional[t.Dict] = None) -> pd.DataFrame:   # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
         """Return artifact's data frame representation.
@@ -507,19 +828,43 @@ class CmfQuery(object):
         Returns:
             A data frame with the single row containing attributes of this artifact.
         """
+        return pd.DataFrame(
+            self._artifact_to_dict(artifact, d),
+            index=[
+                0,
+            ],
+        )
+
+    def _artifact_to_dict(
+        self, artifact: mlpb.Artifact, d: t.Optional[t.Dict] = None, type_names: t.Optional[t.Dict[int, str]] = None  # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
+    ) -> t.Dict:
+        """Return artifact's row representation, see `get_artifact_df`.
+
+        Args:
+            artifact: MLMD entity representing artifact.
+            d: Optional initial content for the row.
+            type_names: Optional cache of artifact type names by type id, updated in place.
+
+        Returns:
+            Dictionary with attributes and properties of this artifact.
+        """
+        if type_names is None:
+            type_names = {}
+        if artifact.type_id not in type_names:
+            type_names[artifact.type_id] = self.store.get_artifact_types_by_id([artifact.type_id])[0].name
         if d is None:
             d = {}
         d.update(
             {
                 "id": artifact.id,
-                "type": self.store.get_artifact_types_by_id([artifact.type_id])[0].name,
+                "type": type_names[artifact.type_id],
                 "uri": artifact.uri,
                 "name": artifact.name,
                 "create_time_since_epoch": artifact.create_time_since_epoch,
                 "last_update_time_since_epoch": artifact.last_update_time_since_epoch,
             }
         )
-        return self._transform_to_dataframe(artifact, d)
+        return self._transform_to_dict(artifact, d)
 
     def get_all_artifacts(self) -> t.List[str]:
         """Return names of all artifacts.
@@ -554,14 +899,13 @@ class CmfQuery(object):
         Returns:
             Data frame containing input and output artifacts for the given execution, one artifact per row.
         """
-        df = pd.DataFrame()
+        rows: t.List[t.Dict] = []
+        type_names: t.Dict[int, str] = {}
         for event in self.store.get_events_by_execution_ids([execution_id]):
             event_type = "INPUT" if event.type == mlpb.Event.Type.INPUT else "OUTPUT"   # type: ignore  # Event type not recognized by mypy, using ignore to bypass
             for artifact in self.store.get_artifacts_by_id([event.artifact_id]):
-                df = pd.concat(
-                    [df, self.get_artifact_df(artifact, {"event": event_type})], sort=True, ignore_index=True
-                )
-        return df
+                rows.append(self._artifact_to_dict(artifact, {"event": event_type}, type_names))
+        return self._as_result(rows)
 
     def get_all_artifact_types(self) -> t.List[str]:
         """Return names of all artifact types.
@@ -582,30 +926,56 @@ class CmfQuery(object):
         Returns:
             Pandas data frame containing stage executions, one execution per row.
         """
-        df = pd.DataFrame()
-
         artifact: t.Optional[mlpb.Artifact] = self._get_artifact(artifact_name) # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
         if not artifact:
-            return df
-
-        for event in self.store.get_events_by_artifact_ids([artifact.id]):
-            stage_ctx = self.store.get_contexts_by_execution(event.execution_id)[0]
-            linked_execution = {
-                "Type": "INPUT" if event.type == mlpb.Event.Type.INPUT else "OUTPUT",   # type: ignore  # Event type not recognized by mypy, using ignore to bypass
-                "execution_id": event.execution_id,
-                "execution_name": self.store.get_executions_by_id([event.execution_id])[0].name,
-                "execution_type_name":self.store.get_executions_by_id([event.execution_id])[0].properties['Execution_type_name'],
-                "stage": stage_ctx.name,
-                "pipeline": self.store.get_parent_contexts_by_context(stage_ctx.id)[0].name,
-            }
-            d1 = pd.DataFrame(
-                linked_execution,
-                index=[
-                    0,
-                ],
-            )
-            df = pd.concat([df, d1], sort=True, ignore_index=True)
-        return df
+            return self._as_result([])
+
+        return self._get_executions_for_artifact_result([artifact.id], with_artifact_id=False)
+
+    def get_lineage_graph(self, refresh: bool = True) -> LineageGraph:
+        """Return in-memory lineage graph of the whole store.
+
+        The graph is built on first call and reused afterwards, so lineage traversals can run on arrays instead of
+        issuing store queries per node.
+
+        Args:
+            refresh: Merge executions, artifacts and events updated since the previous call.
+        Returns:
+            LineageGraph instance associated with this query object.
+        """
+        if self._lineage_graph is None:
+            self._lineage_graph = LineageGraph.build(self.store)
+        elif refresh:
+            self._lineage_graph.refresh()
+        return self._lineage_graph
+
+    def sql(self, query: str, params: t.Optional[t.Sequence] = None, refresh: bool = True) -> t.Any:
+        """Run an SQL query over MLMD metadata, step metrics and dataslices with DuckDB.
+
+        The catalog exposes the tables `pipelines`, `stages`, `executions`, `artifacts` and `events`, and the views
+        `step_metrics` and `dataslices` over the registered Parquet files, see `SqlCatalog`. Metadata tables are
+        built on first call and the Parquet files are scanned by DuckDB as needed, e.g.:
+
+        ```python
+        query.sql(
+            "SELECT e.execution_type, max(m.accuracy) FROM executions e JOIN step_metrics m USING (execution_id) "
+            "GROUP BY ALL"
+        )
+        ```
+
+        Args:
+            query: SQL statement (DuckDB dialect).
+            params: Values for `?` placeholders in `query`.
+            refresh: Rebuild the catalog when the store changed since the previous call.
+        Returns:
+            Query result in `result_format`.
+        """
+        if self._sql_catalog is None:
+            self._sql_catalog = SqlCatalog(self)
+            self._sql_catalog.refresh()
+        elif refresh:
+            self._sql_catalog.refresh()
+        return convert_result(self._sql_catalog.sql(query, params), self.result_format)
 
     def get_one_hop_child_artifacts(self, artifact_name: str, pipeline_id: t.Optional[int] = None) -> pd.DataFrame:
         """Get artifacts produced by executions that consume given artifact.
@@ -874,22 +1244,122 @@ class CmfQuery(object):
 
     get_producer_execution = find_producer_execution
 
-    def get_metrics(self, metrics_name: str) -> t.Optional[pd.DataFrame]:
+    def get_metrics(
+        self,
+        metrics_name: str,
+        columns: t.Optional[t.List[str]] = None,
+        step_range: t.Optional[t.Tuple[t.Optional[int], t.Optional[int]]] = None,
+        filters: t.Optional[t.List] = None,
+    ) -> t.Any:
         """Return metric data frame.
 
+        The artifact is looked up by (type, name), which is a unique index in MLMD, and only the requested columns
+        are read from the Parquet file. Step range and filters are passed down to the Parquet reader, so row groups
+        whose statistics do not match are skipped without being decoded.
+
         Args:
             metrics_name: Metrics name.
-        
+            columns: Metric columns to read, all columns if None. The `SequenceNumber` index is always included.
+            step_range: Inclusive (first, last) step numbers, either bound may be None.
+            filters: Additional row filters in pyarrow format, e.g. [("loss", "<", 0.5)] or a list of such lists
+                (disjunction of conjunctions).
+
         Returns:
-            Data frame containing all metrics.
+            Data frame (or table in `result_format`) containing the metrics, None if metrics do not exist.
         """
-        for metric in self.store.get_artifacts_by_type("Step_Metrics"):
-            if metric.name == metrics_name:
-                name: t.Optional[str] = metric.custom_properties.get("Name", None)
-                if name:
-                    return pd.read_parquet(name)
-                break
-        return None
+        metric: t.Optional[mlpb.Artifact] = self.store.get_artifact_by_type_and_name(  # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
+            "Step_Metrics", metrics_name
+        )
+        if metric is None:
+            return None
+        path = self._get_artifact_path(metric)
+
+        conditions = list(filters or [])
+        if step_range is not None:
+            first, last = step_range
+            step_conditions = []
+            if first is not None:
+                step_conditions.append(("SequenceNumber", ">=", first))
+            if last is not None:
+                step_conditions.append(("SequenceNumber", "<=", last))
+            if conditions and isinstance(conditions[0], list):
+                conditions = [list(conjunction) + step_conditions for conjunction in conditions]
+            else:
+                conditions.extend(step_conditions)
+
+        table = pq.read_table(
+            path,
+            columns=columns,
+            filters=conditions or None,
+            memory_map=True,
+            use_pandas_metadata=True,
+        )
+        return table.to_pandas() if self.result_format == "pandas" else convert_result(table, self.result_format)
+
+    @staticmethod
+    def _get_artifact_path(artifact: mlpb.Artifact) -> str:  # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
+        """Return path of the Parquet file of a Step_Metrics or Dataslice artifact."""
+        # Older versions of cmf stored the file name in the "Name" custom property, now it is the name prefix.
+        path = artifact.custom_properties["Name"].string_value if "Name" in artifact.custom_properties else ""
+        return path or artifact.name.split(":", 1)[0]
+
+    def summarize_metrics(
+        self,
+        pipeline_name: str,
+        metric_names: t.Optional[t.List[str]] = None,
+        agg: t.Sequence[t.Union[str, t.Callable]] = AGGREGATIONS,
+        max_workers: t.Optional[int] = None,
+    ) -> t.Any:
+        """Summarize step metrics of all runs of the given pipeline.
+
+        Minimum, maximum and count are taken from Parquet row group statistics and `last` reads the last row
+        group only, so metric files are not read in full. Files are processed in parallel. This is meant for
+        comparing runs of hyperparameter sweeps, e.g. trials logged by `CmfRayLogger`.
+
+        Args:
+            pipeline_name: Name of the pipeline.
+            metric_names: Metric columns to summarize, all numeric columns if None. Metrics logged as dictionaries
+                (e.g. `Output` of `CmfRayLogger`) are addressed with dotted paths, e.g. "Output.accuracy".
+            agg: Aggregations, any of "min", "max", "last", "count" (the builtins `min` and `max` are accepted too).
+            max_workers: Maximum number of files read in parallel, see `ThreadPoolExecutor`.
+        Returns:
+            Tidy data frame (or table in `result_format`) with one row per run and metric and columns
+            `metrics_name`, `execution_id`, `stage`, `metric` and one column per aggregation.
+        """
+        aggs = [getattr(name, "__name__", name) for name in agg]
+        unknown = sorted(set(aggs) - set(AGGREGATIONS))
+        if unknown:
+            raise ValueError(f"Unsupported aggregations {unknown}, supported are {AGGREGATIONS}.")
+
+        runs: t.List[t.Tuple[mlpb.Artifact, str]] = []  # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
+        pipeline_id = self.get_pipeline_id(pipeline_name)
+        metrics_type_ids = {a_type.id for a_type in self.store.get_artifact_types() if a_type.name == "Step_Metrics"}
+        if pipeline_id != -1 and metrics_type_ids:
+            for stage in self._get_stages(pipeline_id):
+                for artifact in self.store.get_artifacts_by_context(stage.id):
+                    if artifact.type_id in metrics_type_ids:
+                        runs.append((artifact, stage.name))
+        producers: t.Dict[int, int] = {
+            event.artifact_id: event.execution_id
+            for event in self.store.get_events_by_artifact_ids([artifact.id for artifact, _ in runs])
+            if event.type == mlpb.Event.OUTPUT
+        }
+
+        def _summarize(run: t.Tuple[mlpb.Artifact, str]) -> t.List[t.Dict[str, t.Any]]:  # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
+            artifact, stage = run
+            path = self._get_artifact_path(artifact)
+            try:
+                summary = summarize_parquet(path, metric_names, aggs)
+            except (OSError, pa.ArrowException) as err:
+                logger.warning("Cannot summarize metrics %s (path=%s): %s", artifact.name, path, err)
+                return []
+            info = {"metrics_name": artifact.name, "execution_id": producers.get(artifact.id), "stage": stage}
+            return [{**info, **row} for row in summary]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            rows = list(chain.from_iterable(executor.map(_summarize, runs)))
+        columns = ["metrics_name", "execution_id", "stage", "metric", *(a for a in AGGREGATIONS if a in aggs)]
+        return self._as_result(rows, columns)
 
     @staticmethod
     def read_dataslice(name: str) -> pd.DataFrame:
@@ -900,6 +1370,7 @@ class CmfQuery(object):
 
 
     # writing new functions to remove multiple calls to cmfquery functions or ml-metadata functions
+    @cached
     def get_all_executions_in_pipeline(self, pipeline_name: str) -> pd.DataFrame:
         """Return all executions of the given pipeline as pandas data frame.
         Args:
@@ -907,16 +1378,226 @@ class CmfQuery(object):
         Returns:
             Data frame with all executions associated with the given pipeline.
         """
-        df = pd.DataFrame()
+        if self.sql_reader is not None:
+            return self._from_sql_reader(self.sql_reader.get_all_executions_in_pipeline, pipeline_name)
+        rows: t.List[t.Dict] = []
         pipeline_id = self.get_pipeline_id(pipeline_name)
         for stage in self._get_stages(pipeline_id):
             for execution in self._get_executions(stage.id):
-               ex_as_df: pd.DataFrame = self._transform_to_dataframe(
-                   execution, {"id": execution.id, "name": execution.name}
-               )
-               df = pd.concat([df, ex_as_df], sort=True, ignore_index=True)
-        return df
+               rows.append(self._transform_to_dict(execution, {"id": execution.id, "name": execution.name}))
+        return self._as_result(rows)
 
+    def get_execution_uuids(self, pipeline_name: str) -> t.FrozenSet[str]:
+        """Return `Execution_uuid` values of all executions of the given pipeline.
+
+        The uuids are kept in an index that is updated with executions changed since the previous call, so repeated
+        calls (e.g., checking which executions of a metadata push already exist) do not read the whole pipeline.
+
+        Args:
+            pipeline_name: Name of the pipeline.
+        Returns:
+            Set of execution uuids, empty if the pipeline does not exist.
+        """
+        pipeline_id = self.get_pipeline_id(pipeline_name)
+        if pipeline_id == -1:
+            return frozenset()
+        return self._execution_uuids.get(pipeline_id, [stage.id for stage in self._get_stages(pipeline_id)])
+
+    def get_pipeline_version(self, pipeline_name: str) -> t.Optional[str]:
+        """Return a version stamp of the given pipeline, which changes when its stages or executions change.
+
+        The stamp is built from update times and counts of the pipeline, its stages and its executions, which are read
+        from the execution uuid index, so it is cheap enough to check on every request (e.g., to key cached exports).
+        Artifacts shared with other pipelines can be updated by merges into those pipelines without changing the stamp,
+        see `get_pipelines_of_artifacts`.
+
+        Args:
+            pipeline_name: Name of the pipeline.
+        Returns:
+            Version stamp, None if the pipeline does not exist.
+        """
+        pipeline = self._get_pipeline(pipeline_name)
+        if pipeline is None:
+            return None
+        stages = self._get_stages(pipeline.id)
+        watermark, num_uuids = self._execution_uuids.version(pipeline.id, [stage.id for stage in stages])
+        newest = max(
+            [pipeline.last_update_time_since_epoch, watermark or 0]
+            + [stage.last_update_time_since_epoch for stage in stages]
+        )
+        return f"{pipeline.id}-{newest}-{len(stages)}-{num_uuids}"
+
+    def get_pipelines_of_artifacts(self, artifact_ids: t.Iterable[int]) -> t.Set[str]:
+        """Return names of pipelines that use or produce the given artifacts.
+
+        Used to find the pipelines whose exports change when a merge updates artifacts shared with other pipelines,
+        e.g., the artifacts reported by `BulkMerger.updated_artifact_ids`.
+
+        Args:
+            artifact_ids: Artifact ids.
+        Returns:
+            Set of pipeline names.
+        """
+        artifact_ids = list(artifact_ids)
+        if not artifact_ids:
+            return set()
+        execution_ids = list({event.execution_id for event in self.store.get_events_by_artifact_ids(artifact_ids)})
+        pipeline_ids: t.Set[int] = set()
+        for execution in self.store.get_executions_by_id(execution_ids):
+            if "Pipeline_id" in execution.properties:
+                pipeline_ids.add(execution.properties["Pipeline_id"].int_value)
+            else:
+                for stage in self.store.get_contexts_by_execution(execution.id):
+                    pipeline_ids.update(ctx.id for ctx in self.store.get_parent_contexts_by_context(stage.id))
+        return {pipeline.name for pipeline in self._get_pipelines() if pipeline.id in pipeline_ids}
+
+    def get_execution_uuids_since(
+        self, pipeline_name: str, last_update_time: t.Optional[int] = None
+    ) -> t.Tuple[t.FrozenSet[str], t.Optional[int]]:
+        """Return `Execution_uuid` values of executions of the given pipeline updated at or after `last_update_time`.
+
+        Used with the returned watermark to find executions changed since an earlier call, e.g., the executions that
+        a metadata push needs to negotiate with the server. The filter is evaluated by the store.
+
+        Args:
+            pipeline_name: Name of the pipeline.
+            last_update_time: Milliseconds since epoch, or None for all executions.
+        Returns:
+            Tuple of the set of execution uuids and the newest update time of the selected executions (None if no
+            execution was selected), which is the `last_update_time` of the next call.
+        """
+        filter_query = self._stage_filter(pipeline_name)
+        if filter_query is None:
+            return frozenset(), None
+        if last_update_time is not None:
+            filter_query += f" AND last_update_time_since_epoch >= {int(last_update_time)}"
+        uuids: t.Set[str] = set()
+        watermark: t.Optional[int] = None
+        for page in self._iter_pages(self.store.get_executions, filter_query):
+            for execution in page:
+                if "Execution_uuid" in execution.properties:
+                    uuids.update(uuid for uuid in execution.properties["Execution_uuid"].string_value.split(",") if uuid)
+                if watermark is None or execution.last_update_time_since_epoch > watermark:
+                    watermark = execution.last_update_time_since_epoch
+        return frozenset(uuids), watermark
+
+    def _iter_pages(
+        self,
+        list_nodes: t.Callable,
+        filter_query: str,
+        page_size: int = 1000,
+        order_by: str = "id",
+        is_asc: bool = True,
+    ) -> t.Iterator[t.List]:
+        """Yield nodes matching `filter_query` page by page.
+
+        Pages are fetched with keyset pagination: each request continues after the (order_by value, id) of the last
+        node of the previous page, which ml-metadata also uses as sort key. Memory use is bounded by the page size.
+
+        Args:
+            list_nodes: Store method accepting `list_options`, e.g. `store.get_executions`.
+            filter_query: ml-metadata filter query selecting the nodes.
+            page_size: Maximum number of nodes per page.
+            order_by: One of "id", "create_time" or "update_time".
+            is_asc: Ascending (True) or descending (False) order.
+        Returns:
+            Iterator over lists of nodes.
+        """
+        if order_by not in _ORDER_BY_FIELDS:
+            raise ValueError(f"Unsupported order_by '{order_by}', expected one of {list(_ORDER_BY_FIELDS)}.")
+        field, column = _ORDER_BY_FIELDS[order_by]
+        op = ">" if is_asc else "<"
+        after: t.Optional[str] = None
+        while True:
+            conditions = [f"({condition})" for condition in (filter_query, after) if condition]
+            nodes = list_nodes(
+                list_options=ListOptions(
+                    limit=page_size, order_by=field, is_asc=is_asc, filter_query=" AND ".join(conditions)
+                )
+            )
+            if nodes:
+                yield nodes
+            if len(nodes) < page_size:
+                return
+            last = nodes[-1]
+            if column == "id":
+                after = f"id {op} {last.id}"
+            else:
+                value = getattr(last, column)
+                after = f"{column} {op} {value} OR ({column} = {value} AND id {op} {last.id})"
+
+    def _stage_filter(self, pipeline_name: str, stage_name: t.Optional[str] = None) -> t.Optional[str]:
+        """Filter query selecting nodes of the pipeline (or one of its stages), None if there are no such stages."""
+        stage_ids = [
+            stage.id
+            for stage in self._get_stages(self.get_pipeline_id(pipeline_name))
+            if stage_name is None or stage.name == stage_name
+        ]
+        if not stage_ids:
+            return None
+        return f"contexts_a.id IN ({', '.join(str(stage_id) for stage_id in stage_ids)})"
+
+    def iter_executions(
+        self,
+        pipeline_name: str,
+        stage_name: t.Optional[str] = None,
+        page_size: int = 1000,
+        order_by: str = "id",
+        is_asc: bool = True,
+    ) -> t.Iterator[t.Any]:
+        """Iterate over executions of the given pipeline page by page.
+
+        Unlike `get_all_executions_in_pipeline`, executions are fetched `page_size` at a time, so large pipelines can
+        be streamed with constant memory. Nodes updated while iterating by update time may be skipped or repeated.
+
+        Args:
+            pipeline_name: Name of the pipeline.
+            stage_name: If not None, only executions of this stage.
+            page_size: Maximum number of executions per page.
+            order_by: One of "id", "create_time" or "update_time".
+            is_asc: Ascending (True) or descending (False) order.
+        Returns:
+            Iterator over data frames (or tables in `result_format`) with the columns of
+            `get_all_executions_in_pipeline`, one per page.
+        """
+        filter_query = self._stage_filter(pipeline_name, stage_name)
+        if filter_query is None:
+            return
+        for executions in self._iter_pages(self.store.get_executions, filter_query, page_size, order_by, is_asc):
+            yield self._as_result(
+                [self._transform_to_dict(exe, {"id": exe.id, "name": exe.name}) for exe in executions]
+            )
+
+    def iter_artifacts(
+        self,
+        pipeline_name: str,
+        stage_name: t.Optional[str] = None,
+        page_size: int = 1000,
+        order_by: str = "id",
+        is_asc: bool = True,
+    ) -> t.Iterator[t.Any]:
+        """Iterate over artifacts of the given pipeline page by page.
+
+        Artifacts attributed to several stages are returned once, unlike in `get_all_artifacts_by_context`.
+
+        Args:
+            pipeline_name: Name of the pipeline.
+            stage_name: If not None, only artifacts of this stage.
+            page_size: Maximum number of artifacts per page.
+            order_by: One of "id", "create_time" or "update_time".
+            is_asc: Ascending (True) or descending (False) order.
+        Returns:
+            Iterator over data frames (or tables in `result_format`) with the columns of
+            `get_all_artifacts_by_context`, one per page.
+        """
+        filter_query = self._stage_filter(pipeline_name, stage_name)
+        if filter_query is None:
+            return
+        type_names: t.Dict[int, str] = {}
+        for artifacts in self._iter_pages(self.store.get_artifacts, filter_query, page_size, order_by, is_asc):
+            yield self._as_result([self._artifact_to_dict(art, type_names=type_names) for art in artifacts])
+
+    @cached
     def get_all_artifacts_for_executions(self, execution_ids: t.List[int]) -> pd.DataFrame:
         """Return all artifacts for the list of given executions.
 
@@ -925,18 +1606,14 @@ class CmfQuery(object):
         Return:
             Data frame containing artifacts for the list of given executions.
         """
-        df = pd.DataFrame()
         # set of artifact ids for list of given execution ids
         artifact_ids = set(
             event.artifact_id
             for event in self.store.get_events_by_execution_ids(set(execution_ids))
             )
         artifacts = self.store.get_artifacts_by_id(list(artifact_ids))
-        for artifact in artifacts:
-             df = pd.concat(
-                    [df, self.get_artifact_df(artifact)], sort=True, ignore_index=True
-             )
-        return df
+        type_names: t.Dict[int, str] = {}
+        return self._as_result([self._artifact_to_dict(artifact, type_names=type_names) for artifact in artifacts])
     
     def get_one_hop_parent_artifacts_with_id(self, artifact_id: int) -> pd.DataFrame:
         """Return input artifacts for the execution that produced the given artifact.
@@ -978,86 +1655,278 @@ class CmfQuery(object):
             )
         return _attrs
 
-    def _get_event_attributes(self, execution_id: int) -> t.List[t.Dict]:
+    def _get_event_attributes(self, execution_ids: t.List[int], type_names: t.Dict[int, str]) -> t.Dict[int, t.List[t.Dict]]:
         """
-        Extract event attributes for a given execution ID.
+        Extract event attributes for a batch of executions.
+
+        Events and their artifacts are fetched with one store call each, artifact type names are cached in
+        `type_names` across batches.
 
         Args:
-            execution_id (int): The ID of the execution for which event attributes are to be extracted.
+            execution_ids (List[int]): The IDs of the executions for which event attributes are to be extracted.
+            type_names (Dict[int, str]): Cache of artifact type names by type ID, updated in place.
 
         Returns:
-            List[Dict]: A list of dictionaries, each containing attributes of an event associated with the execution.
+            Dict[int, List[Dict]]: Execution ID to the list of dictionaries, each containing attributes of an event
+            associated with the execution.
         """
-        events = []
-        for event in self.store.get_events_by_execution_ids([execution_id]):
+        events_by_execution: t.Dict[int, t.List[t.Dict]] = {execution_id: [] for execution_id in execution_ids}
+        events = self.store.get_events_by_execution_ids(execution_ids)
+        artifacts = {
+            artifact.id: artifact
+            for artifact in self.store.get_artifacts_by_id(list(set(event.artifact_id for event in events)))
+        }
+        missing_type_ids = set(artifact.type_id for artifact in artifacts.values()) - type_names.keys()
+        if missing_type_ids:
+            for artifact_type in self.store.get_artifact_types_by_id(list(missing_type_ids)):
+                type_names[artifact_type.id] = artifact_type.name
+        for event in events:
             event_attrs = self._get_node_attributes(event, {})
-            artifacts = self.store.get_artifacts_by_id([event.artifact_id])
-            artifact_attrs = self._get_node_attributes(
-                artifacts[0], {"type": self.store.get_artifact_types_by_id([artifacts[0].type_id])[0].name}
-            )
-            event_attrs["artifact"] = artifact_attrs
-            events.append(event_attrs)
-        return events
-
-    def _get_execution_attributes(self, stage_id: int, exec_uuid: t.Optional[str] = None, last_sync_time: t.Optional[int] = None) -> t.List[t.Dict]:
+            artifact = artifacts[event.artifact_id]
+            event_attrs["artifact"] = self._get_node_attributes(artifact, {"type": type_names[artifact.type_id]})
+            events_by_execution[event.execution_id].append(event_attrs)
+        return events_by_execution
+
+    def _iter_execution_json(
+        self,
+        stage_id: int,
+        exec_uuid: t.Optional[str],
+        last_sync_time: t.Optional[int],
+        batch_size: int,
+        type_names: t.Dict[int, str],
+        exec_uuids: t.Optional[t.AbstractSet[str]] = None,
+    ) -> t.Iterator[str]:
         """
-        Extract execution attributes for a given stage ID.
+        Yield JSON strings of executions of the given stage, one execution per item.
+
+        Events of `batch_size` executions are fetched at a time, so memory use does not depend on the stage size.
 
         Args:
             stage_id (int): The ID of the stage for which execution attributes are to be extracted.
             exec_uuid (Optional[str]): An optional execution UUID to filter executions. If None, all executions are included.
+            last_sync_time (Optional[int]): If set, only executions updated after this time are included.
+            batch_size (int): Number of executions per events/artifacts query.
+            type_names (Dict[int, str]): Cache of artifact type names by type ID.
+            exec_uuids (Optional[AbstractSet[str]]): If set, only executions with one of these UUIDs are included.
 
-        Returns:
-            List[Dict]: A list of dictionaries, each containing attributes of an execution associated with the stage.
+        Yields:
+            str: JSON representation of an execution.
         """
-        executions = []
-        for execution in self.get_all_executions_by_stage(stage_id, execution_uuid=exec_uuid):
-            exec_attrs = self._get_node_attributes(
-                execution,
-                {
-                    "type": self.store.get_execution_types_by_id([execution.type_id])[0].name,
-                    "name": execution.name if execution.name != "" else "",
-                    "events": self._get_event_attributes(execution.id),
-                },
-            )
+        executions = self.get_all_executions_by_stage(stage_id, execution_uuid=exec_uuid, last_sync_time=last_sync_time)
+        if exec_uuids is not None:
+            executions = [
+                execution for execution in executions
+                if not exec_uuids.isdisjoint(execution.properties["Execution_uuid"].string_value.split(","))
+            ]
+        return self._executions_json(executions, batch_size, type_names)
+
+    def _executions_json(
+        self, executions: t.List[mlpb.Execution], batch_size: int, type_names: t.Dict[int, str]  # type: ignore  # Execution type not recognized by mypy, using ignore to bypass
+    ) -> t.Iterator[str]:
+        """Yield JSON strings of the given executions with their events, fetched for `batch_size` executions at a time."""
+        execution_type_names: t.Dict[int, str] = {}
+        for start in range(0, len(executions), batch_size):
+            batch = executions[start:start + batch_size]
+            events = self._get_event_attributes([execution.id for execution in batch], type_names)
+            for execution in batch:
+                if execution.type_id not in execution_type_names:
+                    execution_type_names[execution.type_id] = self.store.get_execution_types_by_id([execution.type_id])[0].name
+                exec_attrs = self._get_node_attributes(
+                    execution,
+                    {
+                        "type": execution_type_names[execution.type_id],
+                        "name": execution.name if execution.name != "" else "",
+                        "events": events[execution.id],
+                    },
+                )
+                yield json.dumps(exec_attrs)
 
-            # what is usual situtaion - 
-            #it does not matter if last sync time is given or not we have to add exec_attrs 
-            #however if last sync timr is given then we have to check if last_update_time_since_epoch > last_sync_time
-            # last_update_time_since epoch
+    def _iter_node_json(
+        self, node: mlpb.Context, key: str, children: t.Iterator[str], last_sync_time: t.Optional[int] = None  # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+    ) -> t.Iterator[str]:
+        """
+        Yield JSON representation of a context (pipeline or stage) with its children streamed under `key`.
 
-            if last_sync_time:
-                if exec_attrs["last_update_time_since_epoch"] > last_sync_time:
-                    executions.append(exec_attrs)
-            else:
-                executions.append(exec_attrs)
+        Output is identical to `json.dumps(self._get_node_attributes(node, {key: [...]}))`. When `last_sync_time` is
+        set, a context without children is skipped unless it was updated after `last_sync_time`.
 
-        return executions
+        Args:
+            node (mlpb.Context): The pipeline or stage context.
+            key (str): Name of the list holding the children, "stages" or "executions".
+            children (Iterator[str]): Chunks of the comma separated JSON representations of the children.
+            last_sync_time (Optional[int]): Last sync time used to skip unchanged contexts.
 
-    def _get_stage_attributes(self, pipeline_id: int, exec_uuid: t.Optional[str] = None, last_sync_time: t.Optional[int] = None) -> t.List[t.Dict]:
+        Yields:
+            str: Chunks of the JSON document.
+        """
+        attrs = self._get_node_attributes(node, {})
+        head = "{" + json.dumps(key) + ": ["
+        has_children = False
+        for child in children:
+            if not has_children:
+                has_children = True
+                yield head
+            yield child
+        if not has_children:
+            if last_sync_time and attrs["last_update_time_since_epoch"] <= last_sync_time:
+                return
+            yield head
+        yield "], " + json.dumps(attrs)[1:] if attrs else "]}"
+
+    def _get_updated_context_ids(self, last_sync_time: int) -> t.Set[int]:
         """
-        Extract stage attributes for a given pipeline ID.
+        Return IDs of stages and pipelines that changed after `last_sync_time`.
+
+        A context changed if it was updated itself or if one of its executions (or, for pipelines, one of its
+        stages) was updated. Updated nodes are selected by the store, so the cost depends on the number of
+        changes rather than on the size of the store.
 
         Args:
-            pipeline_id (int): The ID of the pipeline for which stage attributes are to be extracted.
-            exec_uuid (Optional[str]): An optional execution UUID to filter stages. If None, all stages are included.
+            last_sync_time (int): Watermark in milliseconds since epoch.
 
         Returns:
-            List[Dict]: A list of dictionaries, each containing attributes of a stage associated with the pipeline.
+            Set[int]: Context IDs of changed stages and pipelines.
         """
-        stages = []
-        for stage in self._get_stages(pipeline_id):
-            stage_attrs = self._get_node_attributes(stage, {"executions": self._get_execution_attributes(stage.id, exec_uuid, last_sync_time)})
-            if last_sync_time:
-                if len(stage_attrs['executions']) != 0:
-                    stages.append(stage_attrs)
-                else:
-                    if stage_attrs["last_update_time_since_epoch"] > last_sync_time:
-                        stages.append(stage_attrs)
+        updated = ListOptions(filter_query=f"last_update_time_since_epoch > {int(last_sync_time)}")
+        context_ids: t.Set[int] = set()
+        stage_ids: t.Set[int] = set()
+        for execution in self.store.get_executions(list_options=updated):
+            # CMF records the stage and the pipeline of every execution as properties.
+            if "Context_ID" in execution.properties and "Pipeline_id" in execution.properties:
+                context_ids.add(execution.properties["Context_ID"].int_value)
+                context_ids.add(execution.properties["Pipeline_id"].int_value)
             else:
-                stages.append(stage_attrs)
+                stage_ids.update(ctx.id for ctx in self.store.get_contexts_by_execution(execution.id))
+        for context in self.store.get_contexts(list_options=updated):
+            stage_ids.add(context.id)
+        for stage_id in stage_ids - context_ids:
+            context_ids.add(stage_id)
+            context_ids.update(ctx.id for ctx in self.store.get_parent_contexts_by_context(stage_id))
+        return context_ids
+
+    def iter_json(
+        self,
+        pipeline_name: t.Optional[str] = None,
+        exec_uuid: t.Optional[str] = None,
+        last_sync_time: t.Optional[int] = None,
+        batch_size: int = 100,
+    ) -> t.Iterator[str]:
+        """Yield the JSON document of `dumptojson`/`extract_to_json` in chunks.
+
+        Stages are streamed one at a time and events/artifacts are fetched per batch of executions, so the whole
+        document never needs to be held in memory.
 
-        return stages
+        Args:
+            pipeline_name: Name of an AI pipeline, or None for all pipelines.
+            exec_uuid: Optional stage execution_uuid - filter stages by this execution_uuid.
+            last_sync_time: If set, only pipelines, stages and executions updated after this time are included.
+            batch_size: Number of executions per events/artifacts query.
+
+        Yields:
+            Chunks of the JSON document, concatenated they form a JSON-parsable string.
+        """
+        type_names: t.Dict[int, str] = {}
+        # On incremental exports only contexts touched after last_sync_time are visited.
+        updated_context_ids = self._get_updated_context_ids(last_sync_time) if last_sync_time else None
+
+        def _stages(pipeline_id: int) -> t.Iterator[t.Iterator[str]]:
+            for stage in self._get_stages(pipeline_id):
+                if updated_context_ids is not None and stage.id not in updated_context_ids:
+                    continue
+                yield self._iter_node_json(
+                    stage,
+                    "executions",
+                    _join_json(
+                        iter([execution])
+                        for execution in self._iter_execution_json(stage.id, exec_uuid, last_sync_time, batch_size, type_names)
+                    ),
+                    last_sync_time,
+                )
+
+        yield '{"Pipeline": ['
+        yield from _join_json(
+            self._iter_node_json(pipeline, "stages", _join_json(_stages(pipeline.id)), last_sync_time)
+            for pipeline in self._get_pipelines(pipeline_name)
+            if updated_context_ids is None or pipeline.id in updated_context_ids
+        )
+        yield "]}"
+
+    def iter_ndjson(
+        self,
+        pipeline_name: t.Optional[str] = None,
+        exec_uuid: t.Optional[str] = None,
+        last_sync_time: t.Optional[int] = None,
+        batch_size: int = 100,
+    ) -> t.Iterator[str]:
+        """Yield the content of `iter_json` as newline delimited JSON, one record per pipeline, stage or execution.
+
+        Records are `{"pipeline": {...}}`, `{"stage": {...}}` and `{"execution": {...}}` with the attributes of the
+        node in the `dumptojson` format, without the list of children. A stage belongs to the preceding pipeline and
+        an execution to the preceding stage, so a receiver can merge the records in batches as they arrive (see
+        `cmf_federation.iter_ndjson_pipelines`). The same pipelines, stages and executions as in `iter_json` are
+        included.
+
+        Args:
+            pipeline_name: Name of an AI pipeline, or None for all pipelines.
+            exec_uuid: Optional stage execution_uuid - filter stages by this execution_uuid.
+            last_sync_time: If set, only pipelines, stages and executions updated after this time are included.
+            batch_size: Number of executions per events/artifacts query.
+
+        Yields:
+            Records, one JSON document per line, each terminated by a newline.
+        """
+        type_names: t.Dict[int, str] = {}
+        updated_context_ids = self._get_updated_context_ids(last_sync_time) if last_sync_time else None
+
+        def _record(kind: str, node: mlpb.Context) -> str:  # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+            return json.dumps({kind: self._get_node_attributes(node, {})}) + "\n"
+
+        def _updated(node: mlpb.Context) -> bool:  # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+            # Contexts without children are skipped on incremental exports unless they changed, as in `iter_json`.
+            return not last_sync_time or node.last_update_time_since_epoch > last_sync_time
+
+        for pipeline in self._get_pipelines(pipeline_name):
+            if updated_context_ids is not None and pipeline.id not in updated_context_ids:
+                continue
+            pending: t.List[str] = [_record("pipeline", pipeline)]
+            for stage in self._get_stages(pipeline.id):
+                if updated_context_ids is not None and stage.id not in updated_context_ids:
+                    continue
+                stage_record = _record("stage", stage)
+                has_executions = False
+                for execution in self._iter_execution_json(stage.id, exec_uuid, last_sync_time, batch_size, type_names):
+                    if not has_executions:
+                        has_executions = True
+                        yield from pending
+                        pending = []
+                        yield stage_record
+                    yield '{"execution": ' + execution + "}\n"
+                if not has_executions and _updated(stage):
+                    yield from pending
+                    pending = []
+                    yield stage_record
+            if pending and _updated(pipeline):
+                yield from pending
+
+    def dump_json(
+        self,
+        fp: t.IO[str],
+        pipeline_name: t.Optional[str] = None,
+        exec_uuid: t.Optional[str] = None,
+        last_sync_time: t.Optional[int] = None,
+        batch_size: int = 100,
+    ) -> None:
+        """Write the JSON document of the given pipeline(s) to `fp` incrementally.
+
+        Args:
+            fp: Text file-like object (file, `socket.makefile("w")`, ...) with a `write` method.
+            pipeline_name: Name of an AI pipeline, or None for all pipelines.
+            exec_uuid: Optional stage execution_uuid - filter stages by this execution_uuid.
+            last_sync_time: If set, only pipelines, stages and executions updated after this time are included.
+            batch_size: Number of executions per events/artifacts query.
+        """
+        for chunk in self.iter_json(pipeline_name, exec_uuid, last_sync_time, batch_size):
+            fp.write(chunk)
 
     def dumptojson(self, pipeline_name: str, exec_uuid: t.Optional[str] = None) -> t.Optional[str]:
         """Return JSON-parsable string containing details about the given pipeline.
@@ -1069,29 +1938,135 @@ class CmfQuery(object):
         Returns:
             Pipeline in JSON format.
         """
-        pipelines: t.List[t.Dict] = []
+        return "".join(self.iter_json(pipeline_name, exec_uuid))
+
+    def iter_json_batches(
+        self,
+        pipeline_name: str,
+        exec_uuid: t.Optional[str] = None,
+        batch_size: int = 500,
+        exec_uuids: t.Optional[t.AbstractSet[str]] = None,
+    ) -> t.Iterator[str]:
+        """Yield the `dumptojson` document of the given pipeline split into documents of at most `batch_size` executions.
+
+        Every document has the form of the `dumptojson` output, with the pipeline and only the stages (and stage
+        executions) of the batch, so each one can be merged on its own by `update_mlmd`. Executions are in the same
+        order as in `dumptojson`; a stage whose executions span several batches is repeated in each of them. Only
+        one batch is held in memory at a time. A pipeline without executions yields one document without stages.
+
+        Args:
+            pipeline_name: Name of an AI pipeline.
+            exec_uuid: Optional stage execution_uuid - filter executions by this execution_uuid.
+            batch_size: Maximum number of executions per document.
+            exec_uuids: Optional set of execution uuids - only executions with at least one of these uuids are included.
+
+        Yields:
+            JSON-parsable strings, one per batch.
+        """
+        if batch_size < 1:
+            raise ValueError(f"Batch size must be positive (batch_size={batch_size}).")
+        type_names: t.Dict[int, str] = {}
         for pipeline in self._get_pipelines(pipeline_name):
-            pipeline_attrs = self._get_node_attributes(pipeline, {"stages": self._get_stage_attributes(pipeline.id, exec_uuid)})
-            pipelines.append(pipeline_attrs)
+            batch: t.List[t.Tuple[mlpb.Context, t.List[str]]] = []   # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+            size, batches = 0, 0
+            for stage in self._get_stages(pipeline.id):
+                for execution in self._iter_execution_json(
+                    stage.id, exec_uuid, None, min(batch_size, 100), type_names, exec_uuids
+                ):
+                    if not batch or batch[-1][0].id != stage.id:
+                        batch.append((stage, []))
+                    batch[-1][1].append(execution)
+                    size += 1
+                    if size == batch_size:
+                        yield self._batch_json(pipeline, batch)
+                        batch, size, batches = [], 0, batches + 1
+            if batch or batches == 0:
+                yield self._batch_json(pipeline, batch)
+
+    def _batch_json(self, pipeline: mlpb.Context, batch: t.List[t.Tuple[mlpb.Context, t.List[str]]]) -> str:   # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+        """JSON document with `pipeline` and the given stages and execution JSON strings."""
+        stages = (
+            self._iter_node_json(stage, "executions", _join_json(iter([execution]) for execution in executions))
+            for stage, executions in batch
+        )
+        return "".join(chain(['{"Pipeline": ['], self._iter_node_json(pipeline, "stages", _join_json(stages)), ["]}"]))
 
-        return json.dumps({"Pipeline": pipelines})
+    def get_json_page(
+        self, after_time: t.Optional[int] = None, after_id: int = 0, limit: int = 500, batch_size: int = 100
+    ) -> str:
+        """Return a page of the executions of all pipelines, ordered by last update time and id, as a JSON document.
 
-    def extract_to_json(self, last_sync_time: int):
-        pipelines = []
-        if last_sync_time:
-            for pipeline in self._get_pipelines():
-                pipeline_attrs = self._get_node_attributes(pipeline, {"stages": self._get_stage_attributes(pipeline.id, None, last_sync_time)})
-                if len(pipeline_attrs['stages']) !=0:
-                    pipelines.append(pipeline_attrs)
-                else:
-                    if pipeline_attrs["last_update_time_since_epoch"] > last_sync_time:
-                        pipelines.append(pipeline_attrs)
-        else:
-            for pipeline in self._get_pipelines():
-                pipeline_attrs = self._get_node_attributes(pipeline, {"stages": self._get_stage_attributes(pipeline.id)})
-                pipelines.append(pipeline_attrs)
+        Pages are selected with a (last_update_time_since_epoch, id) cursor, so a receiver pages through all changes
+        of the store with bounded memory and resumes an interrupted sync from the last page it applied. Unlike update
+        times of contexts, the cursor is stable: a page never repeats executions of the previous page. An execution
+        whose transaction commits after a newer execution was paged can land behind the cursor, so receivers resume
+        from a cursor moved back by a slack window and skip the executions they already have.
+
+        The document has the form of the `dumptojson` output, with the stages and pipelines of the executions of the
+        page, and the keys `next` (cursor of the last execution of the page, `{"time": ..., "id": ...}`, null if the
+        page is empty) and `more` (whether the page is full, i.e., more executions may follow).
 
-        return json.dumps({"Pipeline": pipelines})
+        Args:
+            after_time: Last update time of the cursor, None to start with the oldest execution.
+            after_id: Execution id of the cursor.
+            limit: Maximum number of executions in the page.
+            batch_size: Number of executions per events/artifacts query.
+
+        Returns:
+            JSON-parsable string.
+        """
+        if limit < 1:
+            raise ValueError(f"Page size must be positive (limit={limit}).")
+        filter_query = ""
+        if after_time is not None:
+            after_time, after_id = int(after_time), int(after_id)
+            filter_query = (
+                f"last_update_time_since_epoch > {after_time} OR "
+                f"(last_update_time_since_epoch = {after_time} AND id > {after_id})"
+            )
+        executions = self.store.get_executions(
+            list_options=ListOptions(limit=limit, order_by=OrderByField.UPDATE_TIME, is_asc=True, filter_query=filter_query)
+        )
+
+        # CMF records the stage of every execution as a property, other executions fall back to the associations.
+        stage_executions: t.Dict[int, t.List[mlpb.Execution]] = {}  # type: ignore  # Execution type not recognized by mypy, using ignore to bypass
+        for execution in executions:
+            if "Context_ID" in execution.properties:
+                stage_ids = [execution.properties["Context_ID"].int_value]
+            else:
+                stage_ids = [ctx.id for ctx in self.store.get_contexts_by_execution(execution.id)][:1]
+            for stage_id in stage_ids:
+                stage_executions.setdefault(stage_id, []).append(execution)
+        stages = {stage.id: stage for stage in self.store.get_contexts_by_id(list(stage_executions))}
+        pipeline_stages: t.Dict[int, t.List[mlpb.Context]] = {}  # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+        pipelines: t.Dict[int, mlpb.Context] = {}  # type: ignore  # Context type not recognized by mypy, using ignore to bypass
+        for stage_id in stage_executions:
+            for pipeline in self.store.get_parent_contexts_by_context(stage_id)[:1]:
+                pipelines[pipeline.id] = pipeline
+                pipeline_stages.setdefault(pipeline.id, []).append(stages[stage_id])
+
+        type_names: t.Dict[int, str] = {}
+
+        def _stages(pipeline_id: int) -> t.Iterator[t.Iterator[str]]:
+            for stage in pipeline_stages[pipeline_id]:
+                executions_json = self._executions_json(stage_executions[stage.id], batch_size, type_names)
+                yield self._iter_node_json(stage, "executions", _join_json(iter([e]) for e in executions_json))
+
+        last = executions[-1] if executions else None
+        page = {
+            "next": {"time": last.last_update_time_since_epoch, "id": last.id} if last is not None else None,
+            "more": len(executions) == limit,
+        }
+        return "".join(chain(
+            ['{"Pipeline": ['],
+            _join_json(
+                self._iter_node_json(pipeline, "stages", _join_json(_stages(pipeline.id))) for pipeline in pipelines.values()
+            ),
+            ["], ", json.dumps(page)[1:]],
+        ))
+
+    def extract_to_json(self, last_sync_time: int):
+        return "".join(self.iter_json(None, None, last_sync_time))
     
     def get_all_executions_for_artifact_id(self, artifact_id: int) -> pd.DataFrame:
         """Return executions that consumed and produced given artifact.
@@ -1101,32 +2076,77 @@ class CmfQuery(object):
         Returns:
             Pandas data frame containing stage executions, one execution per row.
         """
-        df = pd.DataFrame()
-
         try:
-            for event in self.store.get_events_by_artifact_ids([artifact_id]):
-                stage_ctx = self.store.get_contexts_by_execution(event.execution_id)[0]
-                linked_execution = {
+            return self._get_executions_for_artifact_result([artifact_id], with_artifact_id=False)
+        except:
+            return pd.DataFrame()
+
+    def get_all_executions_for_artifact_ids(self, artifact_ids: t.List[int]) -> pd.DataFrame:
+        """Return executions that consumed and produced each of the given artifacts.
+
+        Executions, their stage contexts and the parent (pipeline) contexts of those stages are fetched with one
+        store call each and joined in memory, so the number of store round trips does not grow with the number
+        of events.
+
+        Args:
+            artifact_ids: List of artifact identifiers.
+        Returns:
+            Pandas data frame containing stage executions, one row per (artifact, execution) event. The
+            `artifact_id` column identifies the artifact each row belongs to.
+        """
+        return self._get_executions_for_artifact_result(artifact_ids, with_artifact_id=True)
+
+    def _get_executions_for_artifact_result(self, artifact_ids: t.List[int], with_artifact_id: bool) -> t.Any:
+        """Implementation of `get_all_executions_for_artifact_ids`, optionally without the `artifact_id` column."""
+        columns = ["Type", "artifact_id", "execution_id", "execution_name", "execution_type_name", "pipeline", "stage"]
+        if not with_artifact_id:
+            columns.remove("artifact_id")
+        events = self.store.get_events_by_artifact_ids(list(set(artifact_ids)))
+        if not events:
+            return self._as_result([])
+
+        executions = {
+            exe.id: exe for exe in self.store.get_executions_by_id(list(set(event.execution_id for event in events)))
+        }
+
+        # CMF records the stage (Context_ID) and pipeline (Pipeline_id) of every execution as properties, which lets
+        # us resolve both levels of contexts in bulk. Executions without these properties fall back to the
+        # association/parent-context lookups.
+        stage_ids: t.Dict[int, int] = {}
+        pipeline_ids: t.Dict[int, int] = {}
+        for exe in executions.values():
+            if "Context_ID" in exe.properties and "Pipeline_id" in exe.properties:
+                stage_ids[exe.id] = exe.properties["Context_ID"].int_value
+                pipeline_ids[exe.id] = exe.properties["Pipeline_id"].int_value
+            else:
+                stage_ctx = self.store.get_contexts_by_execution(exe.id)[0]
+                stage_ids[exe.id] = stage_ctx.id
+                pipeline_ids[exe.id] = self.store.get_parent_contexts_by_context(stage_ctx.id)[0].id
+
+        contexts = {
+            ctx.id: ctx.name
+            for ctx in self.store.get_contexts_by_id(list(set(stage_ids.values()) | set(pipeline_ids.values())))
+        }
+
+        rows = []
+        for event in events:
+            execution = executions[event.execution_id]
+            rows.append(
+                {
                     "Type": "INPUT" if event.type == mlpb.Event.Type.INPUT else "OUTPUT",   # type: ignore  # Event type not recognized by mypy, using ignore to bypass
+                    "artifact_id": event.artifact_id,
                     "execution_id": event.execution_id,
-                    "execution_name": self.store.get_executions_by_id([event.execution_id])[0].name,
-                    "execution_type_name":self.store.get_executions_by_id([event.execution_id])[0].properties['Execution_type_name'],
-                    "stage": stage_ctx.name,
-                    "pipeline": self.store.get_parent_contexts_by_context(stage_ctx.id)[0].name,
+                    "execution_name": execution.name,
+                    "execution_type_name": execution.properties["Execution_type_name"],
+                    "pipeline": contexts[pipeline_ids[execution.id]],
+                    "stage": contexts[stage_ids[execution.id]],
                 }
-                d1 = pd.DataFrame(
-                    linked_execution,
-                    index=[
-                        0,
-                    ],
-                )
-                df = pd.concat([df, d1], sort=True, ignore_index=True)
-
-        except:
-            return df
-        return df
+            )
+        return self._as_result(rows, columns)
 
-    def get_all_executions_by_stage(self, stage_id: int, execution_uuid: t.Optional[str] = None) -> t.List[mlpb.Execution]: # type: ignore  # Execution type not recognized by mypy, using ignore to bypass
+    def get_all_executions_by_stage(
+        self, stage_id: int, execution_uuid: t.Optional[str] = None, last_sync_time: t.Optional[int] = None
+    ) -> t.List[mlpb.Execution]: # type: ignore  # Execution type not recognized by mypy, using ignore to bypass
         """
         Return executions of the given stage.
 
@@ -1136,10 +2156,20 @@ class CmfQuery(object):
         Args:
             stage_id (int): Stage identifier.
             execution_uuid (Optional[str]): If not None, return execution with this UUID.
+            last_sync_time (Optional[int]): If set, return only executions updated after this time, the filter
+                is evaluated by the store.
         Returns:
             List[mlpb.Execution]: List of executions matching input parameters.
         """
-        executions: t.List[mlpb.Execution] = self.store.get_executions_by_context(stage_id) # type: ignore  # Execution type not recognized by mypy, using ignore to bypass
+        list_options = None
+        if last_sync_time:
+            # Keep the default order of the store (newest first) when filtering.
+            list_options = ListOptions(
+                order_by=OrderByField.CREATE_TIME,
+                is_asc=False,
+                filter_query=f"last_update_time_since_epoch > {int(last_sync_time)}",
+            )
+        executions: t.List[mlpb.Execution] = self.store.get_executions_by_context(stage_id, list_options=list_options) # type: ignore  # Execution type not recognized by mypy, using ignore to bypass
         if execution_uuid is None:
             return executions
         executions_with_uuid: t.List[mlpb.Execution] = []   # type: ignore  # Execution type not recognized by mypy, using ignore to bypass
@@ -133,9 +133,10 @@ class CmdArtifactPush(CmdBase):
         executions = []
         identifiers = []
 
+        # getting executions of all stages in one call
+        stage_executions = query.get_all_executions_in_stages(pipeline_name)
         for stage in stages:
-            # getting all executions for stages
-            executions = query.get_all_executions_in_stage(stage)
+            executions = stage_executions.get(stage, [])
             # check if stage has executions
             if len(executions) > 0:
                 # converting it to dictionary
@@ -16,6 +16,7 @@
 
 #!/usr/bin/env python3
 import os
+import json
 import argparse
 
 from cmflib import cmf_merger
@@ -35,8 +36,45 @@ from cmflib.cmf_exception_handling import (
     FileNameNotfound,
     ExecutionsAlreadyExists,
     UpdateCmfVersion,
+    MlmdFilePullFailure,
 )
-from cmflib.cmf_federation import update_mlmd
+from cmflib.cmf_federation import update_mlmd, update_mlmd_stream
+from cmflib.server_interface.wire_format import NDJSON_CONTENT_TYPE
+
+
+def pull_etag_file(mlmd_file_name):
+    """Return the path of the file with the ETags of the pipelines pulled into the given metadata file."""
+    directory, file_name = os.path.split(os.path.abspath(mlmd_file_name))
+    return os.path.join(directory, f".{file_name}.pull_etags.json")
+
+
+def load_pull_etag(mlmd_file_name, url, pipeline_name, exec_uuid):
+    """Return the ETag of the last pull of the pipeline from `url`, None if the metadata file changed since."""
+    try:
+        with open(pull_etag_file(mlmd_file_name)) as f:
+            entry = json.load(f).get(url, {}).get(json.dumps([pipeline_name, exec_uuid]))
+        stat = os.stat(mlmd_file_name)
+    except (OSError, ValueError):
+        return None
+    if not entry or entry["stat"] != [stat.st_size, stat.st_mtime_ns]:
+        return None
+    return entry["etag"]
+
+
+def save_pull_etag(mlmd_file_name, url, pipeline_name, exec_uuid, etag):
+    """Record the ETag of a pull together with the state of the metadata file after the pull."""
+    file_name = pull_etag_file(mlmd_file_name)
+    try:
+        with open(file_name) as f:
+            etags = json.load(f)
+    except (OSError, ValueError):
+        etags = {}
+    stat = os.stat(mlmd_file_name)
+    etags.setdefault(url, {})[json.dumps([pipeline_name, exec_uuid])] = {
+        "etag": etag, "stat": [stat.st_size, stat.st_mtime_ns]
+    }
+    with open(file_name, "w") as f:
+        json.dump(etags, f, indent=2)
 
 # This class pulls mlmd file from cmf-server
 class CmdMetadataPull(CmdBase):
@@ -86,28 +124,39 @@ class CmdMetadataPull(CmdBase):
             exec_uuid = self.args.execution_uuid[0]
 
         query = cmfquery.CmfQuery(full_path_to_dump)
+        # the server answers 304 if the pipeline did not change since the last pull into this (unchanged) file
+        etag = load_pull_etag(full_path_to_dump, url, self.args.pipeline_name[0], exec_uuid)
         output = server_interface.call_mlmd_pull(
-            url, self.args.pipeline_name[0], exec_uuid
+            url, self.args.pipeline_name[0], exec_uuid, etag
         )  # calls cmf-server api to get mlmd file data(Json format)
          
         status = output.status_code
         # Checks if given pipeline does not exist
         # or if the execution UUID not present inside the mlmd file
         # else pulls the mlmd file
-        if status == 404:
+        if status == 304:
+            return ExecutionsAlreadyExists()
+        elif status == 404:
             raise PipelineNotFound(self.args.pipeline_name[0])
+        elif output.headers.get("Content-Type", "").startswith(NDJSON_CONTENT_TYPE):
+            # servers that stream the metadata send one record per line, merged in batches as they arrive
+            response = update_mlmd_stream(query, output.iter_lines(), self.args.pipeline_name[0], "pull", exec_uuid)
         elif output.content.decode() == "no_exec_uuid":
             raise ExecutionUUIDNotFound(exec_uuid)
         else:
             response = update_mlmd(query, output.content, self.args.pipeline_name[0], "pull", exec_uuid)
-            if response =="success":
-                return MlmdFilePullSuccess(full_path_to_dump)
-            elif response == "exists":
-                return ExecutionsAlreadyExists()
-            elif response == "invalid_json_payload":
-                raise MlmdNotFoundOnServer
-            elif response == "version_update":
-                raise UpdateCmfVersion
+        if response in ("success", "exists") and output.headers.get("ETag"):
+            save_pull_etag(full_path_to_dump, url, self.args.pipeline_name[0], exec_uuid, output.headers["ETag"])
+        if response =="success":
+            return MlmdFilePullSuccess(full_path_to_dump)
+        elif response == "exists":
+            return ExecutionsAlreadyExists()
+        elif response == "invalid_json_payload":
+            raise MlmdNotFoundOnServer
+        elif response == "version_update":
+            raise UpdateCmfVersion
+        elif response == "merge_failed":
+            raise MlmdFilePullFailure
             
 def add_parser(subparsers, parent_parser):
     PULL_HELP = "Pulls metadata from cmf-server to users's machine."
@@ -17,7 +17,10 @@
 #!/usr/bin/env python3
 import os
 import json
+import time
+import hashlib
 import argparse
+import requests
 
 from cmflib import cmfquery
 from cmflib.cli.command import CmdBase
@@ -40,6 +43,59 @@ from cmflib.cmf_exception_handling import (
     DuplicateArgumentNotAllowed
 )
 
+# Default number of executions per chunk of a metadata push
+DEFAULT_CHUNK_SIZE = 500
+# Attempts to push a chunk when the server is unreachable or fails
+PUSH_CHUNK_ATTEMPTS = 3
+
+
+def chunked_push_id(mlmd_file_name, pipeline_name, exec_uuid, chunk_size, exec_uuids=None):
+    """Return the id of a chunked push, which stays the same for retries as long as the metadata file does not change."""
+    stat = os.stat(mlmd_file_name)
+    key = [
+        os.path.abspath(mlmd_file_name), stat.st_size, stat.st_mtime_ns, pipeline_name, exec_uuid, chunk_size,
+        None if exec_uuids is None else sorted(exec_uuids),
+    ]
+    return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+
+def push_watermark_file(mlmd_file_name):
+    """Return the path of the file with the push watermarks of the given metadata file."""
+    directory, file_name = os.path.split(os.path.abspath(mlmd_file_name))
+    return os.path.join(directory, f".{file_name}.push_watermarks.json")
+
+
+def load_push_watermark(mlmd_file_name, url, pipeline_name):
+    """Return the newest execution update time of the last successful push of the pipeline to `url`, or None."""
+    try:
+        with open(push_watermark_file(mlmd_file_name)) as f:
+            return json.load(f).get(url, {}).get(pipeline_name)
+    except (OSError, ValueError):
+        return None
+
+
+def save_push_watermark(mlmd_file_name, url, pipeline_name, watermark):
+    """Record `watermark` as the newest execution update time pushed to `url`."""
+    file_name = push_watermark_file(mlmd_file_name)
+    try:
+        with open(file_name) as f:
+            watermarks = json.load(f)
+    except (OSError, ValueError):
+        watermarks = {}
+    watermarks.setdefault(url, {})[pipeline_name] = watermark
+    with open(file_name, "w") as f:
+        json.dump(watermarks, f, indent=2)
+
+
+def response_status(response):
+    """Return the status of a metadata push response, or the error detail for failed requests."""
+    try:
+        body = response.json()
+    except ValueError:
+        return ""
+    return body.get("status", body.get("detail", "")) if isinstance(body, dict) else ""
+
+
 # This class pushes mlmd file to cmf-server
 class CmdMetadataPush(CmdBase):
 
@@ -55,6 +111,83 @@ class CmdMetadataPush(CmdBase):
                         found_files[file_name] = file_path
         return found_files
 
+    def missing_executions(self, query, url, pipeline_name, watermark):
+        """Negotiate with the server which executions to push.
+
+        Only uuids of executions updated since the `watermark` of the last successful push are sent to the server,
+        which returns the ones it does not have.
+
+        Returns:
+            Tuple of the set of execution uuids to push (None to push the whole pipeline) and the watermark of this push.
+        """
+        uuids, newest = query.get_execution_uuids_since(pipeline_name, watermark)
+        if watermark is None and not uuids:
+            # Nothing to negotiate, the pipeline has no executions.
+            return None, newest
+        response = server_interface.call_mlmd_push_missing(url, pipeline_name, sorted(uuids))
+        if response.status_code != 200:
+            # The server does not support the negotiation.
+            return None, newest
+        body = response.json()
+        if watermark is not None and body["known_uuids"] == 0:
+            # The server lost the pipeline (e.g., it was reset), executions pushed before the watermark are missing too.
+            return self.missing_executions(query, url, pipeline_name, None)
+        return set(body["missing"]), newest if newest is not None else watermark
+
+    def push_in_chunks(self, query, mlmd_file_name, url, pipeline_name, exec_uuid, chunk_size, exec_uuids=None):
+        """Push the pipeline in chunks of at most `chunk_size` executions.
+
+        Only executions with one of `exec_uuids` are pushed, unless it is None. Every chunk is merged and acknowledged by
+        the server on its own. Chunks of an earlier, interrupted push of the
+        same (unchanged) metadata file that the server acknowledged are skipped, so the push resumes after them.
+        Servers without chunked push receive the whole pipeline in one request.
+
+        Returns:
+            Tuple of the HTTP status code of the failed (or last) request and the push status: "success" if any
+            chunk added metadata, "exists" if the server had all executions, or the error detail.
+        """
+        push_id = chunked_push_id(mlmd_file_name, pipeline_name, exec_uuid, chunk_size, exec_uuids)
+        status_response = server_interface.call_mlmd_push_status(url, push_id)
+        if status_response.status_code in (404, 405):
+            response = server_interface.call_mlmd_push(query.dumptojson(pipeline_name, None), url, exec_uuid, pipeline_name)
+            return response.status_code, response_status(response)
+        # servers advertising the content codings they accept get the compressed pipeline document
+        encoding = server_interface.push_encoding(status_response)
+        acked = {}
+        if status_response.status_code == 200:
+            acked = {chunk["chunk_index"]: chunk for chunk in status_response.json()["chunks"]}
+
+        statuses = []
+        chunks = query.iter_json_batches(pipeline_name, exec_uuid, chunk_size, exec_uuids)
+        chunk = next(chunks)
+        chunk_index = 0
+        while chunk is not None:
+            # Read one chunk ahead to tell the server which chunk is the last one.
+            next_chunk = next(chunks, None)
+            ack = acked.get(chunk_index)
+            if ack is not None and next_chunk is not None and ack["chunk_key"] == server_interface.chunk_key(chunk):
+                # Acknowledged by an earlier attempt. The last chunk is always sent, it completes the push on the server.
+                statuses.append(ack["status"])
+            else:
+                for attempt in range(PUSH_CHUNK_ATTEMPTS):
+                    try:
+                        response = server_interface.call_mlmd_push_chunk(
+                            chunk, url, exec_uuid, pipeline_name, push_id, chunk_index, next_chunk is None, encoding
+                        )
+                    except requests.ConnectionError:
+                        if attempt == PUSH_CHUNK_ATTEMPTS - 1:
+                            raise
+                    else:
+                        if response.status_code < 500 or attempt == PUSH_CHUNK_ATTEMPTS - 1:
+                            break
+                    time.sleep(2 ** attempt)
+                if response.status_code != 200:
+                    return response.status_code, response_status(response)
+                statuses.append(response.json()["status"])
+                print(f"chunk {chunk_index + 1} pushed ({statuses[-1]}).")
+            chunk, chunk_index = next_chunk, chunk_index + 1
+        return 200, "success" if "success" in statuses else "exists"
+
     def run(self, live):
         current_directory = mlmd_directory = os.getcwd()
         mlmd_file_name = "./mlmd"
@@ -68,7 +201,8 @@ class CmdMetadataPush(CmdBase):
             "file_name": self.args.file_name,
             "pipeline_name": self.args.pipeline_name,
             "execution_uuid": self.args.execution_uuid,
-            "tensorboard_path": self.args.tensorboard_path
+            "tensorboard_path": self.args.tensorboard_path,
+            "chunk_size": getattr(self.args, "chunk_size", None),
         }  
         for arg_name, arg_value in cmd_args.items():
             if arg_value:
@@ -100,41 +234,36 @@ class CmdMetadataPush(CmdBase):
         if pipeline_name in query.get_pipeline_names():
             print("metadata push started")
             print("........................................")
-            # converts mlmd file to json format
-            json_payload = query.dumptojson(pipeline_name, None)
-
+            exec_uuid = None
             # checks if execution is given by user
-            if not self.args.execution_uuid:
-                exec_uuid = None
-                response = server_interface.call_mlmd_push(json_payload, url, exec_uuid, pipeline_name)
-            else:
-                execution_flag = 0
+            if self.args.execution_uuid:
                 exec_uuid = self.args.execution_uuid[0]
-                mlmd_data = json.loads(json_payload)["Pipeline"]
-                # checks if given execution present in mlmd
-                for i in mlmd_data[0]["stages"]:
-                    for j in i["executions"]:
-                        # created exec_uuid of list if multiple uuid present for single execution.
-                        # for eg: f9da581c-d16c-11ef-9809-9350156ed1ac,32f17f4a-d16d-11ef-9809-9350156ed1ac
-                        uuid_list = j['properties']['Execution_uuid'].split(",")
-                        # check if user specified exec_uuid exists inside local mlmd
-                        if exec_uuid in uuid_list: 
-                            execution_flag = 1
-                            # calling mlmd_push api to push mlmd_data = json.loads(json_payload)["Pipeline"]
-                # checks if given execution present in mlmdmlmd file to cmf-server
-                            response = server_interface.call_mlmd_push(
-                                json_payload, url, exec_uuid, pipeline_name
-                            )
-                            break
-                if execution_flag == 0:
+                # check if user specified exec_uuid exists inside local mlmd
+                if exec_uuid not in query.get_execution_uuids(pipeline_name):
                     raise ExecutionUUIDNotFound(exec_uuid)
-            status_code = response.status_code
+            chunk_size = int(self.args.chunk_size[0]) if getattr(self.args, "chunk_size", None) else DEFAULT_CHUNK_SIZE
+            if exec_uuid:
+                status_code, push_status = self.push_in_chunks(query, mlmd_file_name, url, pipeline_name, exec_uuid, chunk_size)
+            else:
+                # push only executions the server does not have
+                watermark = load_push_watermark(mlmd_file_name, url, pipeline_name)
+                exec_uuids, next_watermark = self.missing_executions(query, url, pipeline_name, watermark)
+                if exec_uuids is not None and not exec_uuids:
+                    status_code, push_status = 200, "exists"
+                else:
+                    status_code, push_status = self.push_in_chunks(
+                        query, mlmd_file_name, url, pipeline_name, None, chunk_size, exec_uuids
+                    )
+                if status_code == 200 and next_watermark is not None:
+                    save_push_watermark(mlmd_file_name, url, pipeline_name, next_watermark)
 
             # we need to push the python env files only after the mlmd push has succeded 
             # otherwise there is no use of those python env files on cmf-server
 
-            if status_code==422 and response.json()["status"]=="version_update":
+            if status_code==422 and push_status=="version_update":
                 raise UpdateCmfVersion
+            elif status_code == 422 and push_status == "merge_failed":
+                raise InternalServerError
             elif status_code == 400:
                 raise CmfServerNotAvailable
             elif status_code == 500:
@@ -181,10 +310,10 @@ class CmdMetadataPush(CmdBase):
 
                 output = ""
                 display_output = ""
-                if response.json()['status']=="success":
+                if push_status=="success":
                     display_output = "mlmd is successfully pushed."
                     output = MlmdFilePushSuccess(mlmd_file_name)
-                if response.json()["status"]=="exists":
+                if push_status=="exists":
                     display_output = "Executions already exists."
                     output = ExecutionsAlreadyExists()
                 if not self.args.tensorboard_path:
@@ -268,6 +397,15 @@ def add_parser(subparsers, parent_parser):
         metavar="<exec_uuid>",
     )
 
+    parser.add_argument(
+        "-c",
+        "--chunk_size",
+        action="append",
+        type=int,
+        help=f"Specify number of executions pushed per request (default: {DEFAULT_CHUNK_SIZE}).",
+        metavar="<chunk_size>",
+    )
+
     parser.add_argument(
         "-t",
         "--tensorboard_path",
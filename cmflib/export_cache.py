@@ -0,0 +1,188 @@
+###
+# Copyright (2024) Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import typing as t
+from collections import OrderedDict
+
+__all__ = ["ExportCache"]
+
+# (pipeline name, execution uuid or None, pipeline version, media type)
+ExportKey = t.Tuple[str, t.Optional[str], str, str]
+
+
+def _digest(*parts: t.Any) -> str:
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+class ExportCache:
+    """Size-bounded LRU cache of gzip-compressed pipeline exports, optionally backed by files on disk.
+
+    Entries are keyed by pipeline name, execution uuid, pipeline version (see `CmfQuery.get_pipeline_version`) and
+    media type, so a changed pipeline is never served from the cache. `invalidate` drops the entries of a pipeline
+    after a merge and changes its entity tags. Exports computed while the pipeline was invalidated are not stored:
+    callers take the `generation` of the pipeline before computing an export and pass it to `put`.
+
+    Args:
+        max_entries: Maximum number of exports held in memory.
+        max_bytes: Maximum size of the exports held in memory, larger exports are not cached.
+        directory: If set, exports are also written to this directory and survive restarts and memory evictions.
+            Only the newest export of a pipeline and execution uuid is kept on disk.
+    """
+
+    def __init__(
+        self, max_entries: int = 64, max_bytes: int = 256 * 1024 * 1024, directory: t.Optional[str] = None
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[ExportKey, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._generations: t.Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._instance = os.urandom(8).hex()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def etag(self, key: ExportKey) -> str:
+        """Strong entity tag of the export with the given key, which is known before the export is computed.
+
+        The tag also changes when the pipeline is invalidated, e.g., after artifacts it shares with other pipelines
+        were updated without changing its version, and tags of other cache instances (earlier processes) never match.
+        """
+        return '"' + _digest(*key, self.generation(key[0]), self._instance)[:32] + '"'
+
+    def generation(self, pipeline_name: str) -> int:
+        """Number of invalidations of the given pipeline."""
+        with self._lock:
+            return self._generations.get(pipeline_name, 0)
+
+    def get(self, key: ExportKey) -> t.Optional[bytes]:
+        """Return the gzip-compressed export with the given key, None if it is not cached."""
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return blob
+            generation = self._generations.get(key[0], 0)
+        blob = self._read(key)
+        if blob is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        self._store(key, generation, blob)
+        with self._lock:
+            self.hits += 1
+        return blob
+
+    def put(self, key: ExportKey, generation: int, blob: bytes) -> None:
+        """Cache the gzip-compressed export `blob`, unless the pipeline was invalidated after `generation`."""
+        if self._store(key, generation, blob):
+            self._write(key, blob)
+
+    def tee(self, key: ExportKey, generation: int, chunks: t.Iterable[bytes]) -> t.Iterator[bytes]:
+        """Yield `chunks` of a gzip-compressed export and cache the export once all chunks were consumed.
+
+        Exports larger than `max_bytes` and exports of streams that were not consumed to the end are not cached.
+        """
+        parts: t.Optional[t.List[bytes]] = []
+        size = 0
+        for chunk in chunks:
+            yield chunk
+            if parts is not None:
+                size += len(chunk)
+                if size > self.max_bytes:
+                    parts = None
+                else:
+                    parts.append(chunk)
+        if parts is not None:
+            self.put(key, generation, b"".join(parts))
+
+    def invalidate(self, pipeline_name: str) -> None:
+        """Drop all exports of the given pipeline, e.g., after metadata was merged into it."""
+        with self._lock:
+            self._generations[pipeline_name] = self._generations.get(pipeline_name, 0) + 1
+            for key in [key for key in self._entries if key[0] == pipeline_name]:
+                self._bytes -= len(self._entries.pop(key))
+        if self.directory is not None:
+            shutil.rmtree(os.path.join(self.directory, _digest(pipeline_name)[:32]), ignore_errors=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _store(self, key: ExportKey, generation: int, blob: bytes) -> bool:
+        """Add `blob` to the memory cache, return False if the pipeline was invalidated after `generation`."""
+        with self._lock:
+            if self._generations.get(key[0], 0) != generation:
+                return False
+            if len(blob) > self.max_bytes:
+                return True
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = blob
+            self._bytes += len(blob)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+            return True
+
+    def _path(self, key: ExportKey) -> t.Tuple[str, str]:
+        """Directory of the pipeline and file name prefix of the execution uuid and media type of `key`."""
+        pipeline_name, exec_uuid, version, media_type = key
+        directory = os.path.join(t.cast(str, self.directory), _digest(pipeline_name)[:32])
+        return directory, f"{_digest(exec_uuid, media_type)[:32]}-"
+
+    def _read(self, key: ExportKey) -> t.Optional[bytes]:
+        if self.directory is None:
+            return None
+        directory, prefix = self._path(key)
+        try:
+            with open(os.path.join(directory, prefix + _digest(key[2])[:16] + ".gz"), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write(self, key: ExportKey, blob: bytes) -> None:
+        if self.directory is None:
+            return
+        directory, prefix = self._path(key)
+        file_name = prefix + _digest(key[2])[:16] + ".gz"
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, os.path.join(directory, file_name))
+            # Older versions of the export are never read again.
+            for name in os.listdir(directory):
+                if name.startswith(prefix) and name != file_name:
+                    os.remove(os.path.join(directory, name))
+        except OSError:
+            # The disk cache is best effort, the export is served from memory or computed again.
+            pass
@@ -0,0 +1,59 @@
+###
+# Copyright (2024) Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+import contextlib
+import threading
+import typing as t
+
+__all__ = ["KeyLock"]
+
+
+class KeyLock:
+    """Lock on individual keys, e.g., execution uuids or artifact uris.
+
+    A thread claims all keys it needs at once and waits while any of them is claimed by another thread, so threads
+    with disjoint keys run concurrently. Claiming all keys at once means two threads can never wait for each other.
+    Claims are not reentrant and only coordinate threads of one process.
+    """
+
+    def __init__(self) -> None:
+        self._claimed: t.Set[t.Hashable] = set()
+        self._cond = threading.Condition()
+
+    @property
+    def claimed(self) -> t.FrozenSet[t.Hashable]:
+        """Keys claimed at the moment."""
+        with self._cond:
+            return frozenset(self._claimed)
+
+    @contextlib.contextmanager
+    def claim(self, keys: t.Iterable[t.Hashable]) -> t.Iterator[None]:
+        """Claim `keys` for the duration of the `with` block.
+
+        Args:
+            keys: Keys to claim, an empty iterable claims nothing and does not wait.
+        """
+        keys = frozenset(keys)
+        with self._cond:
+            while not self._claimed.isdisjoint(keys):
+                self._cond.wait()
+            self._claimed |= keys
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._claimed -= keys
+                self._cond.notify_all()
@@ -0,0 +1,328 @@
+###
+# Copyright (2024) Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+import logging
+import threading
+import typing as t
+
+import numpy as np
+from ml_metadata.metadata_store import ListOptions
+from ml_metadata.proto import metadata_store_pb2 as mlpb
+
+__all__ = ["LineageGraph"]
+
+logger = logging.getLogger(__name__)
+
+_INPUT = mlpb.Event.INPUT  # type: ignore  # Event type not recognized by mypy, using ignore to bypass
+_OUTPUT = mlpb.Event.OUTPUT  # type: ignore  # Event type not recognized by mypy, using ignore to bypass
+
+
+def _int_property(node: t.Union[mlpb.Execution, mlpb.Artifact], name: str) -> int:  # type: ignore  # Execution, Artifact type not recognized by mypy, using ignore to bypass
+    """Return integer value of property `name` or -1 if it is missing."""
+    if name not in node.properties:
+        return -1
+    value = node.properties[name]
+    if value.HasField("int_value"):
+        return value.int_value
+    try:
+        return int(value.string_value)
+    except ValueError:
+        return -1
+
+
+def _to_csr(rows: np.ndarray, cols: np.ndarray, n_rows: int) -> t.Tuple[np.ndarray, np.ndarray]:
+    """Build CSR (indptr, indices) arrays from row/column position arrays."""
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return indptr, cols[order].astype(np.int32)
+
+
+class LineageGraph:
+    """In-memory snapshot of the artifact/execution lineage graph of an MLMD store.
+
+    The graph is built from one pass over the store's executions, artifacts and events. Node attributes are kept in
+    id-sorted NumPy arrays and edges are kept as INPUT/OUTPUT event arrays, from which CSR adjacency is derived on
+    first use:
+        - artifact -> producer executions (OUTPUT events)
+        - artifact -> consumer executions (INPUT events)
+        - execution -> input artifacts
+        - execution -> output artifacts
+
+    Lineage queries then become array indexing instead of per-node store round trips. Calling `refresh` pulls only
+    executions and artifacts updated since the last seen `last_update_time_since_epoch` (the watermark) together
+    with their events. The watermark trails by `slack_ms`, so that nodes and events written by transactions that
+    committed late are read again. Events attached later than that to an execution and an artifact that were both
+    left untouched are only picked up by `rebuild`.
+
+    Args:
+        store: MLMD store (`ml_metadata.metadata_store.MetadataStore`).
+        slack_ms: Milliseconds of updates before the watermark that are read again on every refresh.
+    """
+
+    def __init__(self, store, slack_ms: int = 10000) -> None:
+        self.store = store
+        self.slack_ms = slack_ms
+        self.watermark = 0
+        self._lock = threading.RLock()
+        self._artifact_type_names: t.List[str] = []
+        self._artifact_type_codes: t.Dict[int, int] = {}
+        self._reset()
+
+    def _reset(self) -> None:
+        self.execution_ids = np.empty(0, dtype=np.int64)
+        self.execution_pipeline_ids = np.empty(0, dtype=np.int64)
+        self.execution_stage_ids = np.empty(0, dtype=np.int64)
+        self.artifact_ids = np.empty(0, dtype=np.int64)
+        self.artifact_type_codes = np.empty(0, dtype=np.int16)
+        self._event_artifact_ids = np.empty(0, dtype=np.int64)
+        self._event_execution_ids = np.empty(0, dtype=np.int64)
+        self._event_types = np.empty(0, dtype=np.int8)
+        self._adjacency: t.Optional[t.Dict[str, t.Tuple[np.ndarray, np.ndarray]]] = None
+        self.watermark = 0
+
+    @classmethod
+    def build(cls, store) -> "LineageGraph":
+        """Create a graph and load the whole store into it."""
+        graph = cls(store)
+        graph.rebuild()
+        return graph
+
+    def rebuild(self) -> "LineageGraph":
+        """Drop the current snapshot and load the whole store again."""
+        with self._lock:
+            self._reset()
+            executions = self.store.get_executions()
+            artifacts = self.store.get_artifacts()
+            events = self.store.get_events_by_execution_ids([exe.id for exe in executions]) if executions else []
+            self._merge(executions, artifacts, events)
+        return self
+
+    def refresh(self) -> "LineageGraph":
+        """Merge executions, artifacts and their events updated after the watermark minus `slack_ms`."""
+        with self._lock:
+            if self.watermark == 0:
+                return self.rebuild()
+            since = self.watermark - self.slack_ms
+            options = ListOptions(filter_query=f"last_update_time_since_epoch >= {since}")
+            executions = self.store.get_executions(list_options=options)
+            artifacts = self.store.get_artifacts(list_options=options)
+            if not executions and not artifacts:
+                return self
+            events = []
+            if executions:
+                events.extend(self.store.get_events_by_execution_ids([exe.id for exe in executions]))
+            if artifacts:
+                events.extend(self.store.get_events_by_artifact_ids([artifact.id for artifact in artifacts]))
+            self._merge(executions, artifacts, events)
+        return self
+
+    def _artifact_type_code(self, type_id: int) -> int:
+        if type_id not in self._artifact_type_codes:
+            for artifact_type in self.store.get_artifact_types():
+                if artifact_type.id not in self._artifact_type_codes:
+                    self._artifact_type_codes[artifact_type.id] = len(self._artifact_type_names)
+                    self._artifact_type_names.append(artifact_type.name)
+        return self._artifact_type_codes.get(type_id, -1)
+
+    @staticmethod
+    def _upsert(ids: np.ndarray, columns: t.List[np.ndarray], new_ids: np.ndarray, new_columns: t.List[np.ndarray]):
+        """Insert or overwrite rows keyed by id, keeping `ids` sorted."""
+        ids = np.concatenate([new_ids, ids])
+        columns = [np.concatenate([new, old]) for new, old in zip(new_columns, columns)]
+        # np.unique returns the first occurrence, i.e., the freshly fetched row wins.
+        ids, first = np.unique(ids, return_index=True)
+        return ids, [column[first] for column in columns]
+
+    def _merge(self, executions: t.List, artifacts: t.List, events: t.List) -> None:
+        # Nodes and events are only added, re-read ones (see `slack_ms`) leave the adjacency unchanged.
+        sizes = (len(self.execution_ids), len(self.artifact_ids), len(self._event_types))
+        if executions:
+            self.execution_ids, (self.execution_pipeline_ids, self.execution_stage_ids) = self._upsert(
+                self.execution_ids,
+                [self.execution_pipeline_ids, self.execution_stage_ids],
+                np.fromiter((exe.id for exe in executions), dtype=np.int64, count=len(executions)),
+                [
+                    np.array([_int_property(exe, "Pipeline_id") for exe in executions], dtype=np.int64),
+                    np.array([_int_property(exe, "Context_ID") for exe in executions], dtype=np.int64),
+                ],
+            )
+            self.watermark = max(self.watermark, max(exe.last_update_time_since_epoch for exe in executions))
+        if artifacts:
+            self.artifact_ids, (self.artifact_type_codes,) = self._upsert(
+                self.artifact_ids,
+                [self.artifact_type_codes],
+                np.fromiter((artifact.id for artifact in artifacts), dtype=np.int64, count=len(artifacts)),
+                [np.array([self._artifact_type_code(artifact.type_id) for artifact in artifacts], dtype=np.int16)],
+            )
+            self.watermark = max(self.watermark, max(artifact.last_update_time_since_epoch for artifact in artifacts))
+
+        events = [event for event in events if event.type in (_INPUT, _OUTPUT)]
+        if events:
+            edges = np.empty((len(self._event_types) + len(events), 3), dtype=np.int64)
+            edges[: len(self._event_types), 0] = self._event_artifact_ids
+            edges[: len(self._event_types), 1] = self._event_execution_ids
+            edges[: len(self._event_types), 2] = self._event_types
+            edges[len(self._event_types):] = [(event.artifact_id, event.execution_id, event.type) for event in events]
+            edges = np.unique(edges, axis=0)
+            self._event_artifact_ids = edges[:, 0].copy()
+            self._event_execution_ids = edges[:, 1].copy()
+            self._event_types = edges[:, 2].astype(np.int8)
+        if sizes != (len(self.execution_ids), len(self.artifact_ids), len(self._event_types)):
+            self._adjacency = None
+
+    def _get_adjacency(self) -> t.Dict[str, t.Tuple[np.ndarray, np.ndarray]]:
+        with self._lock:
+            if self._adjacency is None:
+                # Drop events whose endpoints are not loaded (e.g., created between the listing calls).
+                art_pos = np.searchsorted(self.artifact_ids, self._event_artifact_ids)
+                exe_pos = np.searchsorted(self.execution_ids, self._event_execution_ids)
+                known = (art_pos < len(self.artifact_ids)) & (exe_pos < len(self.execution_ids))
+                known[known] &= (self.artifact_ids[art_pos[known]] == self._event_artifact_ids[known]) & (
+                    self.execution_ids[exe_pos[known]] == self._event_execution_ids[known]
+                )
+                is_input = known & (self._event_types == _INPUT)
+                is_output = known & (self._event_types == _OUTPUT)
+                n_art, n_exe = len(self.artifact_ids), len(self.execution_ids)
+                self._adjacency = {
+                    "artifact_producers": _to_csr(art_pos[is_output], exe_pos[is_output], n_art),
+                    "artifact_consumers": _to_csr(art_pos[is_input], exe_pos[is_input], n_art),
+                    "execution_inputs": _to_csr(exe_pos[is_input], art_pos[is_input], n_exe),
+                    "execution_outputs": _to_csr(exe_pos[is_output], art_pos[is_output], n_exe),
+                }
+            return self._adjacency
+
+    @staticmethod
+    def _positions(ids: np.ndarray, values: t.Iterable[int]) -> np.ndarray:
+        values = np.asarray(list(values), dtype=np.int64)
+        pos = np.searchsorted(ids, values)
+        in_range = pos < len(ids)
+        pos, values = pos[in_range], values[in_range]
+        return pos[ids[pos] == values]
+
+    @staticmethod
+    def _neighbours(csr: t.Tuple[np.ndarray, np.ndarray], positions: np.ndarray) -> np.ndarray:
+        indptr, indices = csr
+        if len(positions) == 0:
+            return np.empty(0, dtype=np.int32)
+        return np.concatenate([indices[indptr[p]: indptr[p + 1]] for p in positions])
+
+    def _executions(self, positions: np.ndarray, pipeline_id: t.Optional[int]) -> t.List[int]:
+        positions = np.unique(positions)
+        if pipeline_id is not None:
+            positions = positions[self.execution_pipeline_ids[positions] == pipeline_id]
+        return self.execution_ids[positions].tolist()
+
+    def _artifacts(self, positions: np.ndarray, exclude_types: t.Iterable[str]) -> t.List[int]:
+        positions = np.unique(positions)
+        excluded = [self._artifact_type_names.index(name) for name in exclude_types if name in self._artifact_type_names]
+        if excluded:
+            positions = positions[~np.isin(self.artifact_type_codes[positions], excluded)]
+        return self.artifact_ids[positions].tolist()
+
+    def get_producer_executions(self, artifact_ids: t.List[int], pipeline_id: t.Optional[int] = None) -> t.List[int]:
+        """Return ids of executions that have any of the given artifacts as output.
+
+        Args:
+            artifact_ids: Artifact identifiers.
+            pipeline_id: If not None, keep only executions of this pipeline.
+        Returns:
+            Sorted list of unique execution ids.
+        """
+        with self._lock:
+            adjacency = self._get_adjacency()
+            positions = self._neighbours(adjacency["artifact_producers"], self._positions(self.artifact_ids, artifact_ids))
+            return self._executions(positions, pipeline_id)
+
+    def get_consumer_executions(self, artifact_ids: t.List[int], pipeline_id: t.Optional[int] = None) -> t.List[int]:
+        """Return ids of executions that have any of the given artifacts as input.
+
+        Args:
+            artifact_ids: Artifact identifiers.
+            pipeline_id: If not None, keep only executions of this pipeline.
+        Returns:
+            Sorted list of unique execution ids.
+        """
+        with self._lock:
+            adjacency = self._get_adjacency()
+            positions = self._neighbours(adjacency["artifact_consumers"], self._positions(self.artifact_ids, artifact_ids))
+            return self._executions(positions, pipeline_id)
+
+    def get_input_artifacts(self, execution_ids: t.List[int], exclude_types: t.Iterable[str] = ()) -> t.List[int]:
+        """Return ids of input artifacts of the given executions.
+
+        Args:
+            execution_ids: Execution identifiers.
+            exclude_types: Artifact type names to leave out.
+        Returns:
+            Sorted list of unique artifact ids.
+        """
+        with self._lock:
+            adjacency = self._get_adjacency()
+            positions = self._neighbours(adjacency["execution_inputs"], self._positions(self.execution_ids, execution_ids))
+            return self._artifacts(positions, exclude_types)
+
+    def get_output_artifacts(self, execution_ids: t.List[int], exclude_types: t.Iterable[str] = ()) -> t.List[int]:
+        """Return ids of output artifacts of the given executions.
+
+        Args:
+            execution_ids: Execution identifiers.
+            exclude_types: Artifact type names to leave out.
+        Returns:
+            Sorted list of unique artifact ids.
+        """
+        with self._lock:
+            adjacency = self._get_adjacency()
+            positions = self._neighbours(adjacency["execution_outputs"], self._positions(self.execution_ids, execution_ids))
+            return self._artifacts(positions, exclude_types)
+
+    def get_parent_executions(self, execution_id: int, pipeline_id: t.Optional[int] = None) -> t.List[int]:
+        """Return executions that produced inputs of the given execution.
+
+        Same result as `CmfQuery.get_one_hop_parent_execution_ids` without duplicates.
+        """
+        return self.get_producer_executions(self.get_input_artifacts([execution_id]), pipeline_id)
+
+    def get_parent_artifacts(self, artifact_id: int, exclude_types: t.Iterable[str] = ()) -> t.List[int]:
+        """Return input artifacts of the executions that produced the given artifact.
+
+        Same ids as `CmfQuery.get_one_hop_parent_artifacts_with_id` when `exclude_types` is EXCLUDED_ARTIFACT_TYPES.
+        """
+        return self.get_input_artifacts(self.get_producer_executions([artifact_id]), exclude_types)
+
+    def get_artifact_type(self, artifact_id: int) -> t.Optional[str]:
+        """Return type name of the given artifact or None if it is not in the graph."""
+        with self._lock:
+            positions = self._positions(self.artifact_ids, [artifact_id])
+            if len(positions) == 0 or self.artifact_type_codes[positions[0]] < 0:
+                return None
+            return self._artifact_type_names[self.artifact_type_codes[positions[0]]]
+
+    @property
+    def num_edges(self) -> int:
+        """Number of INPUT/OUTPUT events in the graph."""
+        return len(self._event_types)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the graph arrays in bytes."""
+        arrays = [
+            self.execution_ids, self.execution_pipeline_ids, self.execution_stage_ids, self.artifact_ids,
+            self.artifact_type_codes, self._event_artifact_ids, self._event_execution_ids, self._event_types,
+        ]
+        if self._adjacency is not None:
+            arrays.extend(array for csr in self._adjacency.values() for array in csr)
+        return sum(array.nbytes for array in arrays)
@@ -321,6 +321,21 @@ EXECUTION_PIPELINE_TYPE = "Pipeline_Type"
 EXECUTION_PIPELINE_ID = "Pipeline_id"
 EXECUTION_UNIQUE_ID = "Execution_uuid"
 
+# Property types of execution types created by CMF
+EXECUTION_TYPE_PROPERTIES = {
+    EXECUTION_UNIQUE_ID: metadata_store_pb2.STRING, # type: ignore  # String type not recognized by mypy, using ignore to bypass
+    EXECUTION_CONTEXT_NAME_PROPERTY_NAME: metadata_store_pb2.STRING,    # type: ignore  # String type not recognized by mypy, using ignore to bypass
+    EXECUTION_CONTEXT_ID: metadata_store_pb2.INT,   # type: ignore  # Int type not recognized by mypy, using ignore to bypass
+    EXECUTION_EXECUTION: metadata_store_pb2.STRING, # type: ignore  # String type not recognized by mypy, using ignore to bypass
+    EXECUTION_EXECUTION_TYPE_NAME: metadata_store_pb2.STRING,   # type: ignore  # String type not recognized by mypy, using ignore to bypass
+    EXECUTION_PIPELINE_TYPE: metadata_store_pb2.STRING, # type: ignore  # String type not recognized by mypy, using ignore to bypass
+    EXECUTION_PIPELINE_ID: metadata_store_pb2.INT,  # type: ignore  # Int type not recognized by mypy, using ignore to bypass
+    EXECUTION_REPO: metadata_store_pb2.STRING,  # type: ignore  # String type not recognized by mypy, using ignore to bypass
+    EXECUTION_START_COMMIT: metadata_store_pb2.STRING,  # type: ignore  # String type not recognized by mypy, using ignore to bypass
+    EXECUTION_END_COMMIT: metadata_store_pb2.STRING,    # type: ignore  # String type not recognized by mypy, using ignore to bypass
+}
+
+
 def get_or_create_parent_context(
         store,
         pipeline: str,
@@ -405,18 +420,7 @@ def create_new_execution_in_existing_run_context(
         execution_type_name=execution_type_name,
         execution_name=execution_name,
         context_id=context_id,
-        execution_type_properties={
-            EXECUTION_UNIQUE_ID: metadata_store_pb2.STRING, # type: ignore  # String type not recognized by mypy, using ignore to bypass
-            EXECUTION_CONTEXT_NAME_PROPERTY_NAME: metadata_store_pb2.STRING,    # type: ignore  # String type not recognized by mypy, using ignore to bypass
-            EXECUTION_CONTEXT_ID: metadata_store_pb2.INT,   # type: ignore  # Int type not recognized by mypy, using ignore to bypass
-            EXECUTION_EXECUTION: metadata_store_pb2.STRING, # type: ignore  # String type not recognized by mypy, using ignore to bypass
-            EXECUTION_EXECUTION_TYPE_NAME: metadata_store_pb2.STRING,   # type: ignore  # String type not recognized by mypy, using ignore to bypass
-            EXECUTION_PIPELINE_TYPE: metadata_store_pb2.STRING, # type: ignore  # String type not recognized by mypy, using ignore to bypass
-            EXECUTION_PIPELINE_ID: metadata_store_pb2.INT,  # type: ignore  # Int type not recognized by mypy, using ignore to bypass
-            EXECUTION_REPO: metadata_store_pb2.STRING,  # type: ignore  # String type not recognized by mypy, using ignore to bypass
-            EXECUTION_START_COMMIT: metadata_store_pb2.STRING,  # type: ignore  # String type not recognized by mypy, using ignore to bypass
-            EXECUTION_END_COMMIT: metadata_store_pb2.STRING,    # type: ignore  # String type not recognized by mypy, using ignore to bypass
-        },
+        execution_type_properties=EXECUTION_TYPE_PROPERTIES,
 
         properties={
 
@@ -563,6 +567,41 @@ def link_execution_to_artifact(
     return artifact
 
 
+def merge_artifact_url(artifact: metadata_store_pb2.Artifact, updated_url: str) -> None:  # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
+    """Add `updated_url` to the comma separated "url" property of `artifact` unless it is already there."""
+    if "url" not in artifact.properties:
+        return
+    old_url = artifact.properties["url"].string_value
+    # If the old URL is empty or only contains spaces, assign the new URL directly.
+    if not old_url.strip():
+        new_url = updated_url
+    # If the updated URL is not already present, append it with a comma separator.
+    elif updated_url not in old_url:
+        new_url = f"{old_url},{updated_url}"
+    # If the updated URL is already present, keep the old URL unchanged.
+    else:
+        new_url = old_url
+    artifact.properties["url"].string_value = new_url
+
+
+def merge_artifact_custom_properties(artifact: metadata_store_pb2.Artifact, custom_properties: dict) -> None:  # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
+    """Set `custom_properties` on `artifact`, label and dataset uri lists are merged with the existing values."""
+    for key, value in custom_properties.items():
+        if isinstance(value, int):
+            artifact.custom_properties[key].int_value = value
+        elif key in {"labels", "labels_uri", "dataset_uri"}:
+            existing_value = artifact.custom_properties[key].string_value
+            if existing_value:
+                temp = existing_value + "," + str(value)
+                unique_values = set(temp.split(","))
+                # join the unique_values
+                artifact.custom_properties[key].string_value = ",".join(list(unique_values))
+            else:
+                artifact.custom_properties[key].string_value = str(value)
+        else:
+            artifact.custom_properties[key].string_value = str(value)
+
+
 def isIPv6(ip: str) -> bool:
     try:
         return False if type(ip_address(ip)) is IPv4Address else True
@@ -0,0 +1,108 @@
+###
+# Copyright (2024) Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+import typing as t
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+__all__ = ["AGGREGATIONS", "summarize_parquet"]
+
+AGGREGATIONS = ("min", "max", "last", "count")
+
+# Index column written by `Cmf.commit_metrics`.
+_STEP_COLUMN = "SequenceNumber"
+
+_NUMERIC_TYPES = frozenset(["BOOLEAN", "INT32", "INT64", "FLOAT", "DOUBLE"])
+
+
+def _leaf(table: pa.Table, path: str) -> pa.ChunkedArray:
+    """Return the column at dotted `path`, e.g. "Output.accuracy" for metrics logged as dictionaries."""
+    parts = path.split(".")
+    column = table.column(parts[0])
+    for part in parts[1:]:
+        column = pc.struct_field(column, part)
+    return column
+
+
+def _metric_columns(schema: pq.ParquetSchema) -> t.List[str]:
+    """Dotted paths of all numeric leaf columns except the step index."""
+    return [
+        column.path
+        for column in (schema.column(i) for i in range(len(schema)))
+        if column.path != _STEP_COLUMN
+        and column.physical_type in _NUMERIC_TYPES
+        and column.logical_type.type in ("NONE", "INT")
+    ]
+
+
+def summarize_parquet(
+    path: str, metric_names: t.Optional[t.List[str]] = None, aggs: t.Sequence[str] = AGGREGATIONS
+) -> t.List[t.Dict[str, t.Any]]:
+    """Summarize metric columns of one step metrics Parquet file.
+
+    `min`, `max` and `count` come from row group statistics in the file footer. Row groups without statistics
+    (e.g. written with statistics disabled) are read for the requested column only. `last` is the value at the
+    last step with a non-null value, and reads row groups from the end, usually just the last one.
+
+    Args:
+        path: Parquet file written by `Cmf.commit_metrics`.
+        metric_names: Dotted column paths, all numeric columns if None. Columns missing in the file are skipped.
+        aggs: Subset of AGGREGATIONS.
+    Returns:
+        One dictionary per metric with `metric` and one key per aggregation.
+    """
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    metadata = parquet_file.metadata
+    column_index = {metadata.schema.column(i).path: i for i in range(metadata.num_columns)}
+    if metric_names is None:
+        metric_names = _metric_columns(metadata.schema)
+
+    rows = []
+    for name in metric_names:
+        if name not in column_index:
+            continue
+        row: t.Dict[str, t.Any] = {"metric": name}
+        if {"min", "max", "count"} & set(aggs):
+            minimum, maximum, count = None, None, 0
+            for rg in range(metadata.num_row_groups):
+                stats = metadata.row_group(rg).column(column_index[name]).statistics
+                if stats is not None and stats.has_min_max and stats.has_null_count:
+                    rg_min, rg_max = stats.min, stats.max
+                    rg_count = metadata.row_group(rg).num_rows - stats.null_count
+                elif stats is not None and stats.has_null_count and stats.null_count == metadata.row_group(rg).num_rows:
+                    # All values are null, there is nothing to aggregate.
+                    continue
+                else:
+                    values = _leaf(parquet_file.read_row_group(rg, columns=[name]), name)
+                    min_max = pc.min_max(values).as_py()
+                    rg_min, rg_max, rg_count = min_max["min"], min_max["max"], pc.count(values).as_py()
+                if rg_min is not None:
+                    minimum = rg_min if minimum is None else min(minimum, rg_min)
+                    maximum = rg_max if maximum is None else max(maximum, rg_max)
+                count += rg_count
+            row.update(min=minimum, max=maximum, count=count)
+        if "last" in aggs:
+            last = None
+            for rg in reversed(range(metadata.num_row_groups)):
+                values = _leaf(parquet_file.read_row_group(rg, columns=[name]), name).drop_null()
+                if len(values):
+                    last = values[-1].as_py()
+                    break
+            row["last"] = last
+        rows.append({key: row[key] for key in ["metric", *(agg for agg in AGGREGATIONS if agg in aggs)]})
+    return rows
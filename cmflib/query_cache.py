@@ -0,0 +1,145 @@
+###
+# Copyright (2024) Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+import functools
+import sys
+import threading
+import typing as t
+from collections import OrderedDict
+
+import pandas as pd
+
+__all__ = ["QueryCache", "cached"]
+
+# With copy-on-write (always on in pandas >= 3) a shallow copy is enough to protect cached frames from callers.
+_COPY_ON_WRITE = int(pd.__version__.split(".")[0]) >= 3
+
+
+def _freeze(value: t.Any) -> t.Hashable:
+    """Turn call arguments into a hashable cache key component."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(_freeze(item) for item in value))
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+def _copy(value: t.Any) -> t.Any:
+    """Return a copy of a cached value that callers can modify without changing the cache."""
+    if isinstance(value, pd.DataFrame):
+        return value.copy(deep=not _COPY_ON_WRITE)
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+def _size(value: t.Any) -> int:
+    """Approximate size of a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value)
+    if hasattr(value, "nbytes"):
+        # pyarrow.Table
+        return int(value.nbytes)
+    if hasattr(value, "estimated_size"):
+        # polars.DataFrame
+        return int(value.estimated_size())
+    return sys.getsizeof(value)
+
+
+class QueryCache:
+    """Size-bounded LRU cache of query results invalidated by a store version stamp.
+
+    Entries are keyed by method name and arguments. Before every lookup the version stamp is read, and when it
+    differs from the stamp the entries were computed with, the whole cache is dropped.
+
+    Args:
+        version_fn: Callable returning a cheap, hashable stamp that changes whenever the store changes.
+        max_entries: Maximum number of cached results.
+        max_bytes: Maximum approximate size of cached results in bytes.
+    """
+
+    def __init__(
+        self, version_fn: t.Callable[[], t.Hashable], max_entries: int = 128, max_bytes: int = 256 * 1024 * 1024
+    ) -> None:
+        self.version_fn = version_fn
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[t.Hashable, t.Tuple[t.Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._version: t.Optional[t.Hashable] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_or_compute(self, key: t.Hashable, compute: t.Callable[[], t.Any]) -> t.Any:
+        """Return a copy of the cached result for `key`, calling `compute` on a miss.
+
+        Args:
+            key: Cache key, see `cached`.
+            compute: Callable producing the result.
+        Returns:
+            Result of `compute`, possibly from the cache.
+        """
+        version = self.version_fn()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._bytes = 0
+                self._version = version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy(self._entries[key][0])
+            self.misses += 1
+
+        value = compute()
+        size = _size(value)
+        # Do not store results computed while the store was changing.
+        changed = self.version_fn() != version
+        with self._lock:
+            if not changed and size <= self.max_bytes and version == self._version and key not in self._entries:
+                self._entries[key] = (value, size)
+                self._bytes += size
+                while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self._bytes -= evicted_size
+        return _copy(value)
+
+
+def cached(method: t.Callable) -> t.Callable:
+    """Memoize a `CmfQuery` method in `self.cache` when a cache is enabled."""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache: t.Optional[QueryCache] = getattr(self, "cache", None)
+        if cache is None:
+            return method(self, *args, **kwargs)
+        key = (method.__name__, _freeze(args), _freeze(kwargs))
+        return cache.get_or_compute(key, lambda: method(self, *args, **kwargs))
+
+    return wrapper
@@ -0,0 +1,116 @@
+###
+# Copyright (2024) Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+import typing as t
+
+import pandas as pd
+import pyarrow as pa
+
+__all__ = ["RESULT_FORMATS", "DICTIONARY_COLUMNS", "rows_to_result", "convert_result"]
+
+RESULT_FORMATS = ("pandas", "arrow", "polars")
+
+# Columns with few distinct values (types, stage and pipeline names), stored dictionary-encoded in Arrow/Polars.
+DICTIONARY_COLUMNS = frozenset(
+    [
+        "type",
+        "Type",
+        "event",
+        "stage",
+        "pipeline",
+        "execution_type_name",
+        "Execution_type_name",
+        "Context_Type",
+        "Pipeline_Type",
+        "Git_Repo",
+        "git_repo",
+    ]
+)
+
+
+def _plain(value: t.Any) -> t.Any:
+    """Unwrap ml-metadata `Value` messages to Python values."""
+    if hasattr(value, "WhichOneof"):
+        field = value.WhichOneof("value")
+        return getattr(value, field) if field else None
+    return value
+
+
+def _arrow_column(name: str, values: t.List[t.Any]) -> pa.Array:
+    values = [_plain(value) for value in values]
+    try:
+        array = pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Same property holding values of different types in different nodes.
+        array = pa.array([None if value is None else str(value) for value in values], type=pa.string())
+    if name in DICTIONARY_COLUMNS and pa.types.is_string(array.type):
+        array = array.dictionary_encode()
+    return array
+
+
+def _rows_to_arrow(rows: t.List[t.Dict[str, t.Any]], columns: t.Optional[t.List[str]] = None) -> pa.Table:
+    """Build an Arrow table from row dictionaries, missing values become nulls, columns are sorted by name."""
+    if columns is None:
+        columns = sorted(set().union(*rows)) if rows else []
+    return pa.table({name: _arrow_column(name, [row.get(name) for row in rows]) for name in columns})
+
+
+def _rows_to_pandas(rows: t.List[t.Dict[str, t.Any]], columns: t.Optional[t.List[str]] = None) -> pd.DataFrame:
+    """Build a pandas data frame from row dictionaries, missing values become NaN, columns are sorted by name."""
+    if not rows:
+        return pd.DataFrame()
+    if columns is None:
+        columns = sorted(set().union(*rows))
+    return pd.DataFrame.from_records(rows).reindex(columns=columns)
+
+
+def _arrow_to_polars(table: pa.Table) -> t.Any:
+    try:
+        import polars as pl
+    except ImportError as err:
+        raise ImportError("result_format='polars' requires the 'polars' package (pip install cmflib[polars]).") from err
+    return pl.from_arrow(table)
+
+
+def rows_to_result(
+    rows: t.List[t.Dict[str, t.Any]], result_format: str = "pandas", columns: t.Optional[t.List[str]] = None
+) -> t.Any:
+    """Build a result table from row dictionaries.
+
+    Args:
+        rows: One dictionary per row, keys are column names.
+        result_format: One of RESULT_FORMATS.
+        columns: Column names and order, if None all keys of `rows` sorted by name.
+    Returns:
+        pandas data frame, pyarrow table or polars data frame.
+    """
+    if result_format == "pandas":
+        return _rows_to_pandas(rows, columns)
+    table = _rows_to_arrow(rows, columns)
+    return table if result_format == "arrow" else _arrow_to_polars(table)
+
+
+def convert_result(table: pa.Table, result_format: str = "pandas") -> t.Any:
+    """Convert an Arrow table to `result_format`, dictionary-encoding repetitive string columns."""
+    if result_format == "pandas":
+        return table.to_pandas()
+    table = pa.table(
+        {
+            name: column.dictionary_encode() if name in DICTIONARY_COLUMNS and pa.types.is_string(column.type) else column
+            for name, column in zip(table.column_names, table.columns)
+        }
+    )
+    return table if result_format == "arrow" else _arrow_to_polars(table)
@@ -14,21 +14,88 @@
 # limitations under the License.
 ###
 
+import hashlib
+import json
 import requests
 
+from cmflib.server_interface.wire_format import NDJSON_CONTENT_TYPE, choose_encoding, encode_body
+
+
+# Content coding to push mlmd data to the server that sent `response`: None for servers that only accept the json
+# payload wrapped in a json document, 'identity' for servers accepting the uncompressed pipeline document.
+def push_encoding(response):
+    if "Accept-Encoding" not in response.headers:
+        return None
+    return choose_encoding(response.headers["Accept-Encoding"]) or "identity"
+
+
+# Posts `json_data` to `url_to_pass`, with the json payload as the (compressed) request body unless encoding is None
+def post_mlmd(url_to_pass, json_data, encoding):
+    if encoding is None:
+        return requests.post(url_to_pass, json=json_data)
+    params = {key: json.dumps(value) if isinstance(value, bool) else value for key, value in json_data.items()}
+    body, headers = encode_body(params.pop("json_payload"), encoding)
+    return requests.post(url_to_pass, params=params, data=body, headers=headers)
+
+
 # This function posts mlmd data to mlmd_push api on cmf-server
-def call_mlmd_push(json_payload, url, exec_uuid, pipeline_name):
+def call_mlmd_push(json_payload, url, exec_uuid, pipeline_name, encoding=None):
     url_to_pass = f"{url}/api/mlmd_push"
     json_data = {"exec_uuid": exec_uuid, "json_payload": json_payload, "pipeline_name": pipeline_name}
-    response = requests.post(url_to_pass, json=json_data)  # Post request
+    response = post_mlmd(url_to_pass, json_data, encoding)  # Post request
     # print("Status code -", response.status_code)
     return response
 
 
+# This function posts execution uuids to cmf-server, which returns the ones it does not have
+def call_mlmd_push_missing(url, pipeline_name, execution_uuids):
+    url_to_pass = f"{url}/api/mlmd_push/missing"
+    json_data = {"pipeline_name": pipeline_name, "execution_uuids": execution_uuids}
+    response = requests.post(url_to_pass, json=json_data)
+    return response
+
+
+# Idempotency key of a chunk of a chunked mlmd push: sha256 of the canonical JSON of the chunk.
+# Properties are dumped in map order, which differs between dumps, so the raw JSON string can not be hashed.
+def chunk_key(json_payload):
+    canonical = json.dumps(json.loads(json_payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# This function posts one chunk of a chunked mlmd push to cmf-server
+def call_mlmd_push_chunk(json_payload, url, exec_uuid, pipeline_name, push_id, chunk_index, last_chunk, encoding=None):
+    url_to_pass = f"{url}/api/mlmd_push/chunk"
+    json_data = {
+        "exec_uuid": exec_uuid,
+        "json_payload": json_payload,
+        "pipeline_name": pipeline_name,
+        "push_id": push_id,
+        "chunk_index": chunk_index,
+        "chunk_key": chunk_key(json_payload),
+        "last_chunk": last_chunk,
+    }
+    response = post_mlmd(url_to_pass, json_data, encoding)
+    return response
+
+
+# This function gets the chunks of a chunked mlmd push acknowledged by cmf-server
+def call_mlmd_push_status(url, push_id):
+    url_to_pass = f"{url}/api/mlmd_push/{push_id}"
+    response = requests.get(url_to_pass)
+    return response
+
+
 # This function gets mlmd data from mlmd_pull api from cmf-server
-def call_mlmd_pull(url, pipeline_name, exec_uuid):
+# servers that support it stream the data as newline delimited records, which the response yields as they arrive
+# with the etag of an earlier pull, the server answers 304 (without data) if the pipeline did not change
+def call_mlmd_pull(url, pipeline_name, exec_uuid, etag=None):
     url_to_pass = f"{url}/api/mlmd_pull"
-    response = requests.post(url_to_pass, json={"pipeline_name":pipeline_name, "exec_uuid": exec_uuid})  
+    headers = {"Accept": f"{NDJSON_CONTENT_TYPE}, application/json;q=0.9, */*;q=0.8"}
+    if etag:
+        headers["If-None-Match"] = etag
+    response = requests.post(
+        url_to_pass, json={"pipeline_name":pipeline_name, "exec_uuid": exec_uuid}, headers=headers, stream=True
+    )
     return response
 
 
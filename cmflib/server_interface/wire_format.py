@@ -0,0 +1,238 @@
+###
+# Copyright (2024) Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+"""Wire format of metadata pushes and pulls.
+
+Peers that support it send the pipeline JSON document itself as the request body (`MLMD_CONTENT_TYPE`, other request
+fields are query parameters) instead of a JSON string inside another JSON document, compressed with the best content
+coding both peers support. Servers advertise the content codings they accept in the `Accept-Encoding` response header
+(RFC 7694); responses are compressed according to the `Accept-Encoding` request header.
+"""
+
+import gzip
+import typing as t
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+__all__ = [
+    "MLMD_CONTENT_TYPE",
+    "NDJSON_CONTENT_TYPE",
+    "CONTENT_ENCODINGS",
+    "MIN_COMPRESS_SIZE",
+    "compress",
+    "compress_stream",
+    "decompress",
+    "Decompressor",
+    "BodyTooLargeError",
+    "choose_encoding",
+    "encode_body",
+]
+
+# Media type of a request body that is the pipeline JSON document.
+MLMD_CONTENT_TYPE = "application/vnd.cmf.mlmd+json"
+# Media type of streamed metadata, one pipeline, stage or execution record per line (see `CmfQuery.iter_ndjson`).
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+# Supported content codings in order of preference, zstd requires the optional 'zstandard' package.
+CONTENT_ENCODINGS: t.List[str] = (["zstd"] if zstandard is not None else []) + ["gzip"]
+# Bodies smaller than this are sent uncompressed.
+MIN_COMPRESS_SIZE = 1024
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compress `data` with the given content coding."""
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    raise ValueError(f"Unsupported content encoding '{encoding}'.")
+
+
+def compress_stream(chunks: t.Iterable[str], encoding: t.Optional[str]) -> t.Iterator[bytes]:
+    """Encode and compress a stream of text chunks with the given content coding, None for no compression.
+
+    Compressed output is emitted once it exceeds `MIN_COMPRESS_SIZE`, so small chunks are not sent one by one.
+    """
+    if encoding is None:
+        for chunk in chunks:
+            yield chunk.encode("utf-8")
+        return
+    if encoding == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    elif encoding == "zstd" and zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    else:
+        raise ValueError(f"Unsupported content encoding '{encoding}'.")
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += compressor.compress(chunk.encode("utf-8"))
+        if len(buffer) >= MIN_COMPRESS_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += compressor.flush()
+    yield bytes(buffer)
+
+
+class BodyTooLargeError(Exception):
+    """Raised when a decompressed body is larger than the maximum size."""
+
+
+class _Sink:
+    """Collects decompressed output and stops once there is more than `max_size` bytes of it."""
+
+    def __init__(self, max_size: t.Optional[int]) -> None:
+        self.max_size = max_size
+        self.size = 0
+        self.parts: t.List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            raise BodyTooLargeError(f"Decompressed body is larger than {self.max_size} bytes.")
+        self.parts.append(bytes(data))
+        return len(data)
+
+
+class Decompressor:
+    """Decompresses a body that arrives in chunks, without holding more than `max_size` decompressed bytes.
+
+    Output is produced in bounded pieces, so a small body that decompresses to a huge one (a decompression bomb)
+    fails with `BodyTooLargeError` once `max_size` is exceeded instead of exhausting memory.
+
+    Args:
+        encoding: Content coding of the body, None or 'identity' for uncompressed data.
+        max_size: Maximum size of the decompressed body in bytes, None for no limit.
+    Raises:
+        ValueError: If the content coding is not supported.
+    """
+
+    # Decompressed bytes produced per step.
+    _STEP = 1024 * 1024
+
+    def __init__(self, encoding: t.Optional[str], max_size: t.Optional[int] = None) -> None:
+        self.encoding = (encoding or "identity").strip().lower()
+        self._sink = _Sink(max_size)
+        self._zlib: t.Any = None
+        self._zstd: t.Any = None
+        if self.encoding == "gzip":
+            self._zlib = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self.encoding == "zstd" and zstandard is not None:
+            # Frames written by streaming compressors may not record the content size.
+            self._zstd = zstandard.ZstdDecompressor().stream_writer(self._sink, write_size=self._STEP)
+        elif self.encoding != "identity":
+            raise ValueError(f"Unsupported content encoding '{self.encoding}'.")
+
+    def write(self, data: bytes) -> None:
+        """Decompress the next chunk of the body.
+
+        Raises:
+            BodyTooLargeError: If the decompressed body is larger than `max_size`.
+            OSError: If the chunk is not valid compressed data.
+        """
+        if self._zlib is not None:
+            self._inflate(data)
+        elif self._zstd is not None:
+            try:
+                self._zstd.write(data)
+            except zstandard.ZstdError as e:
+                raise OSError(str(e)) from e
+        else:
+            self._sink.write(data)
+
+    def finish(self) -> bytes:
+        """Return the decompressed body.
+
+        Raises:
+            EOFError: If the gzip body ended before the end of the compressed data.
+        """
+        if self._zlib is not None:
+            self._sink.write(self._zlib.flush())
+            if not self._zlib.eof:
+                raise EOFError("Compressed body ended before the end-of-stream marker.")
+        if self._zstd is not None:
+            self._zstd.flush()
+        return b"".join(self._sink.parts)
+
+    def _inflate(self, data: bytes) -> None:
+        try:
+            while data:
+                self._sink.write(self._zlib.decompress(data, self._STEP))
+                data = self._zlib.unconsumed_tail
+                if self._zlib.eof:
+                    # A gzip body can have several members, like gzip.decompress reads them.
+                    data = self._zlib.unused_data + data
+                    if data:
+                        self._zlib = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        except zlib.error as e:
+            raise OSError(str(e)) from e
+
+
+def decompress(data: bytes, encoding: t.Optional[str], max_size: t.Optional[int] = None) -> bytes:
+    """Decompress `data` compressed with the given content coding, None or 'identity' for uncompressed data.
+
+    Raises:
+        BodyTooLargeError: If the decompressed data is larger than `max_size` bytes.
+    """
+    decompressor = Decompressor(encoding, max_size)
+    decompressor.write(data)
+    return decompressor.finish()
+
+
+def choose_encoding(
+    accept_encoding: t.Optional[str], encodings: t.Sequence[str] = tuple(CONTENT_ENCODINGS)
+) -> t.Optional[str]:
+    """Return the first of `encodings` accepted by an `Accept-Encoding` header, None if there is none.
+
+    Codings with a zero quality value are excluded, `*` matches every coding not listed explicitly.
+    """
+    if not accept_encoding:
+        return None
+    qualities: t.Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        quality = 1.0
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip().lower()] = quality
+    wildcard = qualities.get("*", 0.0)
+    for encoding in encodings:
+        if qualities.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def encode_body(json_payload: str, encoding: t.Optional[str]) -> t.Tuple[bytes, t.Dict[str, str]]:
+    """Return the request body and headers sending the pipeline JSON document `json_payload`.
+
+    Args:
+        json_payload: Pipeline JSON document.
+        encoding: Content coding accepted by the server, None or 'identity' to send the document uncompressed.
+    Returns:
+        Tuple of the body and the request headers.
+    """
+    data = json_payload.encode("utf-8")
+    headers = {"Content-Type": MLMD_CONTENT_TYPE}
+    if encoding not in (None, "identity") and len(data) >= MIN_COMPRESS_SIZE:
+        data = compress(data, encoding)
+        headers["Content-Encoding"] = encoding
+    return data, headers
@@ -0,0 +1,234 @@
+###
+# Copyright (2024) Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+import logging
+import os
+import threading
+import typing as t
+
+import pyarrow as pa
+from ml_metadata.metadata_store import ListOptions, OrderByField
+from ml_metadata.proto import metadata_store_pb2 as mlpb
+
+from cmflib.query_results import rows_to_result
+
+if t.TYPE_CHECKING:
+    from cmflib.cmfquery import CmfQuery
+
+__all__ = ["SqlCatalog"]
+
+logger = logging.getLogger(__name__)
+
+# Columns every file-backed view starts with, the rest are the columns of the Parquet files.
+_FILE_COLUMNS = ["execution_id", "artifact_id", "artifact_name"]
+
+
+def _connect() -> t.Any:
+    try:
+        import duckdb
+    except ImportError as err:
+        raise ImportError("CmfQuery.sql requires the 'duckdb' package (pip install cmflib[sql]).") from err
+    return duckdb.connect()
+
+
+def _table(rows: t.List[t.Dict[str, t.Any]], columns: t.List[str]) -> pa.Table:
+    """Arrow table with `columns` first and all remaining (property) columns sorted by name."""
+    names = set().union(*rows) if rows else set()
+    return rows_to_result(rows, "arrow", columns + sorted(names - set(columns)))
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+class SqlCatalog:
+    """MLMD metadata and Parquet files of a store as tables of an embedded DuckDB database.
+
+    Tables (Arrow tables scanned in place by DuckDB):
+        pipelines: pipeline_id, pipeline and pipeline properties.
+        stages: stage_id, stage, pipeline_id and stage properties.
+        executions: execution_id, execution_name, execution_type, stage_id, pipeline_id, times and properties.
+        artifacts: artifact_id, artifact_name, type, uri, times and properties.
+        events: execution_id, artifact_id, event ("INPUT" / "OUTPUT") and milliseconds_since_epoch.
+    Views over Parquet files (read lazily by DuckDB, with the columns of all files merged by name):
+        step_metrics: execution_id (producer), artifact_id, artifact_name and the metric columns.
+        dataslices: execution_id (producer), artifact_id, artifact_name and the dataslice columns.
+
+    Args:
+        query: CmfQuery whose store is exposed.
+    """
+
+    def __init__(self, query: "CmfQuery") -> None:
+        self.query = query
+        self.store = query.store
+        self.connection: t.Any = None
+        self.watermark: t.Optional[t.Tuple] = None
+        self._lock = threading.RLock()
+
+    def _store_watermark(self) -> t.Tuple:
+        """Newest ids and update times of executions, artifacts and contexts."""
+        stamp = []
+        for list_nodes in (self.store.get_executions, self.store.get_artifacts, self.store.get_contexts):
+            for field in (OrderByField.ID, OrderByField.UPDATE_TIME):
+                nodes = list_nodes(list_options=ListOptions(limit=1, order_by=field, is_asc=False))
+                stamp.append((nodes[0].id, nodes[0].last_update_time_since_epoch) if nodes else None)
+        return tuple(stamp)
+
+    def refresh(self) -> "SqlCatalog":
+        """Rebuild the catalog if executions, artifacts or contexts were added or updated since the last build."""
+        with self._lock:
+            watermark = self._store_watermark()
+            if watermark != self.watermark:
+                self.rebuild()
+                self.watermark = watermark
+        return self
+
+    def rebuild(self) -> "SqlCatalog":
+        with self._lock:
+            if self.connection is None:
+                self.connection = _connect()
+            self._register_contexts()
+            artifacts, artifact_types, events = self._register_nodes()
+            producers = {
+                event.artifact_id: event.execution_id for event in events if event.type == mlpb.Event.OUTPUT
+            }
+            for view, type_name in (("step_metrics", "Step_Metrics"), ("dataslices", "Dataslice")):
+                self._register_files(
+                    view, [a for a in artifacts if artifact_types.get(a.type_id) == type_name], producers
+                )
+        return self
+
+    def _register_contexts(self) -> None:
+        pipelines, stages = [], []
+        for pipeline in self.store.get_contexts_by_type("Parent_Context"):
+            pipelines.append(self.query._transform_to_dict(pipeline, {"pipeline_id": pipeline.id, "pipeline": pipeline.name}))
+            for stage in self.store.get_children_contexts_by_context(pipeline.id):
+                stages.append(
+                    self.query._transform_to_dict(
+                        stage, {"stage_id": stage.id, "stage": stage.name, "pipeline_id": pipeline.id}
+                    )
+                )
+        self.connection.register("pipelines", _table(pipelines, ["pipeline_id", "pipeline"]))
+        self.connection.register("stages", _table(stages, ["stage_id", "stage", "pipeline_id"]))
+
+    def _register_nodes(self) -> t.Tuple[t.List, t.Dict[int, str], t.List]:
+        """Register executions, artifacts and events, return artifacts, artifact type names and events."""
+        execution_types = {e_type.id: e_type.name for e_type in self.store.get_execution_types()}
+        artifact_types = {a_type.id: a_type.name for a_type in self.store.get_artifact_types()}
+
+        executions = self.store.get_executions()
+        execution_rows = []
+        for exe in executions:
+            row = self.query._transform_to_dict(
+                exe,
+                {
+                    "execution_id": exe.id,
+                    "execution_name": exe.name,
+                    "execution_type": execution_types.get(exe.type_id),
+                    "create_time_since_epoch": exe.create_time_since_epoch,
+                    "last_update_time_since_epoch": exe.last_update_time_since_epoch,
+                },
+            )
+            row["stage_id"] = row.get("Context_ID")
+            row["pipeline_id"] = row.get("Pipeline_id")
+            execution_rows.append(row)
+        self.connection.register(
+            "executions",
+            _table(
+                execution_rows,
+                ["execution_id", "execution_name", "execution_type", "stage_id", "pipeline_id",
+                 "create_time_since_epoch", "last_update_time_since_epoch"],
+            ),
+        )
+
+        artifacts = self.store.get_artifacts()
+        artifact_rows = [
+            self.query._transform_to_dict(
+                artifact,
+                {
+                    "artifact_id": artifact.id,
+                    "artifact_name": artifact.name,
+                    "type": artifact_types.get(artifact.type_id),
+                    "uri": artifact.uri,
+                    "create_time_since_epoch": artifact.create_time_since_epoch,
+                    "last_update_time_since_epoch": artifact.last_update_time_since_epoch,
+                },
+            )
+            for artifact in artifacts
+        ]
+        self.connection.register(
+            "artifacts",
+            _table(
+                artifact_rows,
+                ["artifact_id", "artifact_name", "type", "uri", "create_time_since_epoch", "last_update_time_since_epoch"],
+            ),
+        )
+
+        events = self.store.get_events_by_execution_ids([exe.id for exe in executions]) if executions else []
+        self.connection.register(
+            "events",
+            pa.table(
+                {
+                    "execution_id": pa.array([event.execution_id for event in events], pa.int64()),
+                    "artifact_id": pa.array([event.artifact_id for event in events], pa.int64()),
+                    "event": pa.array([mlpb.Event.Type.Name(event.type) for event in events], pa.string()),
+                    "milliseconds_since_epoch": pa.array(
+                        [event.milliseconds_since_epoch for event in events], pa.int64()
+                    ),
+                }
+            ),
+        )
+        return artifacts, artifact_types, events
+
+    def _register_files(self, view: str, artifacts: t.List[mlpb.Artifact], producers: t.Dict[int, int]) -> None:  # type: ignore  # Artifact type not recognized by mypy, using ignore to bypass
+        """Create `view` over the Parquet files of `artifacts` joined with the producing execution."""
+        files = []
+        for artifact in artifacts:
+            path = self.query._get_artifact_path(artifact)
+            if os.path.exists(path):
+                files.append((path, producers.get(artifact.id), artifact.id, artifact.name))
+            else:
+                logger.warning("%s file of artifact %s does not exist (path=%s).", view, artifact.name, path)
+        mapping = f"_{view}_files"
+        self.connection.register(
+            mapping,
+            pa.table(
+                {
+                    "filename": pa.array([f[0] for f in files], pa.string()),
+                    "execution_id": pa.array([f[1] for f in files], pa.int64()),
+                    "artifact_id": pa.array([f[2] for f in files], pa.int64()),
+                    "artifact_name": pa.array([f[3] for f in files], pa.string()),
+                }
+            ),
+        )
+        columns = ", ".join(f"f.{name}" for name in _FILE_COLUMNS)
+        if files:
+            paths = ", ".join(_quote(f[0]) for f in files)
+            source = (
+                f"SELECT {columns}, p.* EXCLUDE (filename) "
+                f"FROM read_parquet([{paths}], union_by_name = true, filename = true) p "
+                f"JOIN {mapping} f ON f.filename = p.filename"
+            )
+        else:
+            source = f"SELECT {columns} FROM {mapping} f"
+        self.connection.execute(f"CREATE OR REPLACE VIEW {view} AS {source}")
+
+    def sql(self, query: str, params: t.Optional[t.Sequence] = None) -> pa.Table:
+        """Run `query` and return the result as an Arrow table."""
+        with self._lock:
+            result = self.connection.execute(query, params or [])
+            # to_arrow_table() replaces fetch_arrow_table() in duckdb >= 1.4
+            return result.to_arrow_table() if hasattr(result, "to_arrow_table") else result.fetch_arrow_table()
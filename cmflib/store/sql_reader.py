@@ -0,0 +1,247 @@
+import sqlite3
+import threading
+import typing as t
+
+import pandas as pd
+import pyarrow as pa
+
+__all__ = ["SqlReader"]
+
+# Table names are left unquoted, so the same statements work on SQLite (case-insensitive names) and on
+# PostgreSQL (unquoted names fold to the lower-case tables created by ml-metadata).
+_PIPELINE_STAGES = """
+    SELECT c.id FROM Context c
+    JOIN ParentContext pc ON pc.context_id = c.id
+    WHERE pc.parent_context_id = {p}
+    ORDER BY c.id
+"""
+
+_PIPELINE_ID = """
+    SELECT c.id FROM Context c
+    JOIN Type ty ON ty.id = c.type_id
+    WHERE ty.name = 'Parent_Context' AND c.name = {p}
+    ORDER BY c.id
+"""
+
+# Row order follows ml-metadata: executions of a context are listed newest first, artifacts by id.
+_STAGE_EXECUTIONS = """
+    SELECT a.context_id, e.id, e.name FROM Execution e
+    JOIN Association a ON a.execution_id = e.id
+    WHERE a.context_id IN ({ids})
+    ORDER BY a.context_id, e.create_time_since_epoch DESC, e.id DESC
+"""
+
+_STAGE_ARTIFACTS = """
+    SELECT att.context_id, ar.id, ty.name, ar.uri, ar.name, ar.create_time_since_epoch,
+           ar.last_update_time_since_epoch
+    FROM Artifact ar
+    JOIN Attribution att ON att.artifact_id = ar.id
+    JOIN Type ty ON ty.id = ar.type_id
+    WHERE att.context_id IN ({ids})
+    ORDER BY att.context_id, ar.id
+"""
+
+# Ids are never reused and node updates bump last_update_time_since_epoch, so maximum values (index lookups) are
+# enough to notice changes without counting rows.
+_STORE_VERSION = """
+    SELECT
+        (SELECT MAX(id) FROM Execution), (SELECT MAX(last_update_time_since_epoch) FROM Execution),
+        (SELECT MAX(id) FROM Artifact), (SELECT MAX(last_update_time_since_epoch) FROM Artifact),
+        (SELECT MAX(id) FROM Context), (SELECT MAX(last_update_time_since_epoch) FROM Context),
+        (SELECT MAX(id) FROM Event), (SELECT MAX(id) FROM Association), (SELECT MAX(id) FROM Attribution),
+        (SELECT COUNT(*) FROM ParentContext)
+"""
+
+_PROPERTIES = """
+    SELECT {key}, name, is_custom_property, int_value, double_value, string_value FROM {table}
+    WHERE {key} IN ({ids})
+"""
+
+
+def _property_value(int_value, double_value, string_value) -> t.Any:
+    """Same precedence as `CmfQuery._copy`: string, then int, then double (0.0 when unset)."""
+    if string_value is not None:
+        return string_value
+    if int_value is not None:
+        return int(int_value)
+    return 0.0 if double_value is None else float(double_value)
+
+
+class SqlReader:
+    """Read-only access to the MLMD schema with hand-written SQL.
+
+    Bulk reads through ml-metadata materialize a protobuf per node with all of its properties, and CmfQuery then
+    turns every protobuf into a one-row data frame. This reader fetches nodes and properties with a couple of
+    statements and pivots properties straight into columns. Results have the same columns and rows as the
+    respective `CmfQuery` methods using the ml-metadata API.
+
+    Args:
+        connection: DB-API connection to the MLMD database (sqlite3 or psycopg).
+        paramstyle: Placeholder used by the driver, "?" for sqlite3, "%s" for psycopg.
+        connect: Callable opening a new connection. If set, a statement failing with one of `reconnect_errors`
+            (e.g., because the database server restarted) is run once more on a new connection.
+        reconnect_errors: Exception types of the driver meaning that the connection is broken.
+    """
+
+    def __init__(
+        self,
+        connection: t.Any,
+        paramstyle: str = "?",
+        connect: t.Optional[t.Callable[[], t.Any]] = None,
+        reconnect_errors: t.Tuple[t.Type[BaseException], ...] = (),
+    ) -> None:
+        self.connection = connection
+        self.paramstyle = paramstyle
+        self.connect = connect
+        self.reconnect_errors = reconnect_errors
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_sqlite(cls, filename: str) -> "SqlReader":
+        """Open the MLMD SQLite file read-only."""
+        connection = sqlite3.connect(f"file:{filename}?mode=ro", uri=True, check_same_thread=False)
+        return cls(connection, "?")
+
+    @classmethod
+    def from_postgres(cls, config: t.Dict[str, t.Any]) -> "SqlReader":
+        """Connect to the MLMD PostgreSQL database, `config` is the output of `get_postgres_config`."""
+        # psycopg is only available where cmf-server is installed.
+        import psycopg
+
+        def connect() -> t.Any:
+            return psycopg.connect(
+                host=config["host"],
+                port=config["port"],
+                user=config["user"],
+                password=config["password"],
+                dbname=config["dbname"],
+                autocommit=True,
+            )
+
+        # Statements are read-only and run in autocommit mode, so running one again is safe.
+        return cls(connect(), "%s", connect=connect, reconnect_errors=(psycopg.OperationalError,))
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _fetch(self, sql: str, params: t.Sequence = ()) -> t.List[t.Tuple]:
+        with self._lock:
+            try:
+                return self._execute(sql, params)
+            except self.reconnect_errors:
+                if self.connect is None:
+                    raise
+                try:
+                    self.connection.close()
+                except Exception:
+                    pass
+                self.connection = self.connect()
+                return self._execute(sql, params)
+
+    def _execute(self, sql: str, params: t.Sequence) -> t.List[t.Tuple]:
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(sql.format(p=self.paramstyle), tuple(params))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _fetch_in(self, sql: str, ids: t.Sequence[int], **kwargs) -> t.List[t.Tuple]:
+        """Run `sql` with the `{ids}` placeholder bound to `ids`, ids are integers so they are inlined."""
+        if not ids:
+            return []
+        return self._fetch(sql.format(ids=",".join(str(int(i)) for i in ids), p="{p}", **kwargs))
+
+    def get_store_version(self) -> t.Tuple:
+        """Return a stamp that changes whenever the MLMD database changes.
+
+        For SQLite this is `PRAGMA data_version`, which changes after commits of any other connection (including
+        the ml-metadata one). For other databases it is built from maximum ids and update times of MLMD tables.
+        """
+        if isinstance(self.connection, sqlite3.Connection):
+            return tuple(self._fetch("PRAGMA data_version")[0])
+        return tuple(self._fetch(_STORE_VERSION)[0])
+
+    def get_pipeline_id(self, pipeline_name: str) -> int:
+        """Return pipeline identifier or -1 if one does not exist."""
+        rows = self._fetch(_PIPELINE_ID, (pipeline_name,))
+        return rows[0][0] if rows else -1
+
+    def get_stage_ids(self, pipeline_id: int) -> t.List[int]:
+        """Return identifiers of the stages (child contexts) of the given pipeline."""
+        return [row[0] for row in self._fetch(_PIPELINE_STAGES, (pipeline_id,))]
+
+    def _pivot(
+        self, nodes: t.List[t.Tuple[int, t.Dict[str, t.Any]]], table: str, key: str, result_format: str = "pandas"
+    ) -> t.Any:
+        """Merge properties of `nodes` into columns and build the output table.
+
+        Args:
+            nodes: Pairs of (node id, dict of node attributes), one pair per output row.
+            table: Property table name.
+            key: Column of the property table referencing the node.
+            result_format: "pandas" or "arrow".
+        Returns:
+            pandas data frame or pyarrow table with one row per element in `nodes`, columns sorted by name.
+        """
+        properties: t.Dict[int, t.Dict[str, t.Any]] = {}
+        for node_id, name, is_custom, int_value, double_value, string_value in self._fetch_in(
+            _PROPERTIES, sorted({node_id for node_id, _ in nodes}), table=table, key=key
+        ):
+            name = "custom_properties_" + name if is_custom else name
+            properties.setdefault(node_id, {})[name] = _property_value(int_value, double_value, string_value)
+
+        names = sorted({name for _, attrs in nodes for name in attrs} | {
+            name for values in properties.values() for name in values
+        })
+        columns: t.Dict[str, t.List[t.Any]] = {name: [None] * len(nodes) for name in names}
+        for row, (node_id, attrs) in enumerate(nodes):
+            # properties overwrite node attributes with the same name, as in `CmfQuery._transform_to_dataframe`
+            for source in (attrs, properties.get(node_id, {})):
+                for name, value in source.items():
+                    columns[name][row] = value
+
+        if result_format == "arrow":
+            return pa.table(columns)
+        if not nodes:
+            return pd.DataFrame()
+        return pd.DataFrame(columns)
+
+    def get_executions_in_stages(self, stage_ids: t.List[int], result_format: str = "pandas") -> t.Any:
+        """Return executions associated with the given stages, one row per (stage, execution) pair."""
+        nodes = [
+            # NULL columns map to protobuf defaults
+            (exe_id, {"id": exe_id, "name": name or ""})
+            for _, exe_id, name in self._fetch_in(_STAGE_EXECUTIONS, stage_ids)
+        ]
+        return self._pivot(nodes, "ExecutionProperty", "execution_id", result_format)
+
+    def get_artifacts_in_stages(self, stage_ids: t.List[int], result_format: str = "pandas") -> t.Any:
+        """Return artifacts attributed to the given stages, one row per (stage, artifact) pair."""
+        nodes = [
+            (
+                art_id,
+                {
+                    "id": art_id,
+                    "type": type_name,
+                    "uri": uri or "",
+                    "name": name or "",
+                    "create_time_since_epoch": create_time,
+                    "last_update_time_since_epoch": update_time,
+                },
+            )
+            for _, art_id, type_name, uri, name, create_time, update_time in self._fetch_in(_STAGE_ARTIFACTS, stage_ids)
+        ]
+        return self._pivot(nodes, "ArtifactProperty", "artifact_id", result_format)
+
+    def get_all_executions_in_pipeline(self, pipeline_name: str, result_format: str = "pandas") -> t.Any:
+        """Return all executions of the given pipeline."""
+        return self.get_executions_in_stages(
+            self.get_stage_ids(self.get_pipeline_id(pipeline_name)), result_format
+        )
+
+    def get_all_artifacts_by_context(self, pipeline_name: str, result_format: str = "pandas") -> t.Any:
+        """Return all artifacts of the given pipeline."""
+        return self.get_artifacts_in_stages(
+            self.get_stage_ids(self.get_pipeline_id(pipeline_name)), result_format
+        )
@@ -0,0 +1,160 @@
+import logging
+import threading
+import time
+import typing as t
+
+from ml_metadata.metadata_store import metadata_store
+
+__all__ = ["StorePool", "PooledStore"]
+
+logger = logging.getLogger(__name__)
+
+
+class _Lease:
+    """Connection held by one thread and the time it was last known to work."""
+
+    def __init__(self, store: t.Optional[metadata_store.MetadataStore] = None) -> None:
+        self.store = store
+        self.checked = time.monotonic()
+
+
+class StorePool:
+    """Bounded pool of MLMD connections, one per thread.
+
+    `MetadataStore` objects must not be used by several threads at the same time. The pool hands every thread its
+    own connection, which the thread keeps until it calls `release` or exits. Connections of finished threads are
+    reused by other threads. When `max_size` connections are in use, new threads wait up to `timeout` seconds.
+
+    Args:
+        connect: Callable creating a new connection, e.g. `PostgresStore(config).connect`.
+        max_size: Maximum number of connections.
+        timeout: Seconds to wait for a connection when the pool is exhausted.
+        health_check_interval: Seconds after which a connection is checked with a cheap query before it is handed
+            out again, and replaced with a new one if the check fails. None disables health checks.
+    """
+
+    def __init__(
+        self,
+        connect: t.Callable[[], metadata_store.MetadataStore],
+        max_size: int = 16,
+        timeout: float = 30.0,
+        health_check_interval: t.Optional[float] = 60.0,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError(f"Pool size must be positive (max_size={max_size}).")
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._local = threading.local()
+        self._leases: t.Dict[threading.Thread, _Lease] = {}
+        self._idle: t.List[_Lease] = []
+        self._cond = threading.Condition()
+
+    @property
+    def size(self) -> int:
+        """Number of open connections, in use or idle."""
+        with self._cond:
+            return len(self._leases) + len(self._idle)
+
+    def get(self) -> metadata_store.MetadataStore:
+        """Return the connection of the calling thread, acquiring one from the pool on first use."""
+        lease: t.Optional[_Lease] = getattr(self._local, "lease", None)
+        if lease is None:
+            lease = self._acquire()
+        elif self.health_check_interval is not None and time.monotonic() - lease.checked > self.health_check_interval:
+            self._check(lease)
+        return lease.store
+
+    def release(self) -> None:
+        """Return the connection of the calling thread to the pool."""
+        lease: t.Optional[_Lease] = getattr(self._local, "lease", None)
+        if lease is None:
+            return
+        self._local.lease = None
+        with self._cond:
+            self._leases.pop(threading.current_thread(), None)
+            self._idle.append(lease)
+            self._cond.notify()
+
+    def reconnect(self) -> metadata_store.MetadataStore:
+        """Replace the connection of the calling thread with a new one, e.g. after the database restarted."""
+        lease: t.Optional[_Lease] = getattr(self._local, "lease", None)
+        if lease is None:
+            return self.get()
+        lease.store = self.connect()
+        lease.checked = time.monotonic()
+        return lease.store
+
+    def close(self) -> None:
+        """Drop all connections, threads acquire new ones on next use."""
+        with self._cond:
+            self._leases.clear()
+            self._idle.clear()
+            self._local = threading.local()
+            self._cond.notify_all()
+
+    def _reclaim(self) -> None:
+        """Move connections of threads that exited to the idle list, must be called with the lock held."""
+        for thread in [thread for thread in self._leases if not thread.is_alive()]:
+            self._idle.append(self._leases.pop(thread))
+
+    def _acquire(self) -> _Lease:
+        thread = threading.current_thread()
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                self._reclaim()
+                if self._idle:
+                    lease: t.Optional[_Lease] = self._idle.pop()
+                    break
+                if len(self._leases) < self.max_size:
+                    lease = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RuntimeError(
+                        f"No MLMD connection available within {self.timeout} seconds (max_size={self.max_size})."
+                    )
+                # Threads do not return connections when they exit, so wake up periodically to reclaim them.
+                self._cond.wait(min(remaining, 1.0))
+            if lease is None:
+                # Reserve the slot, the connection is opened outside of the lock.
+                lease = _Lease()
+            self._leases[thread] = lease
+
+        if lease.store is None:
+            try:
+                lease.store = self.connect()
+            except Exception:
+                with self._cond:
+                    self._leases.pop(thread, None)
+                    self._cond.notify()
+                raise
+        elif self.health_check_interval is not None and time.monotonic() - lease.checked > self.health_check_interval:
+            self._check(lease)
+        self._local.lease = lease
+        return lease
+
+    def _check(self, lease: _Lease) -> None:
+        """Run a cheap query on the connection and reconnect if it fails."""
+        try:
+            lease.store.get_context_types()
+        except Exception as err:
+            logger.warning("MLMD connection failed health check, reconnecting: %s", err)
+            lease.store = self.connect()
+        lease.checked = time.monotonic()
+
+
+class PooledStore:
+    """`MetadataStore` stand-in that forwards every call to the calling thread's connection from `pool`.
+
+    Args:
+        pool: Connection pool.
+    """
+
+    def __init__(self, pool: StorePool) -> None:
+        self.pool = pool
+
+    def __getattr__(self, name: str) -> t.Any:
+        return getattr(self.pool.get(), name)
@@ -0,0 +1,81 @@
+import os
+import tempfile
+
+import pytest
+from ml_metadata.proto import metadata_store_pb2 as mlpb
+
+import cmflib.cmf
+from cmflib.cmf import Cmf
+from cmflib.store.sqllite_store import SqlliteStore
+from cmflib.metadata_helper import (
+    get_or_create_parent_context,
+    get_or_create_run_context,
+    associate_child_to_parent_context,
+    create_new_execution_in_existing_run_context,
+    create_new_artifact_event_and_attribution,
+    link_execution_to_artifact,
+)
+
+
+def populate_mlmd(filepath, pipeline_name="Test-env", stages=("Prepare", "Train"), executions_per_stage=2):
+    """Populate an MLMD file with a small CMF-shaped pipeline.
+
+    Every execution produces one Dataset artifact, and every execution after the first one consumes the
+    output of the first execution of the pipeline. No git/dvc setup is required.
+    """
+    store = SqlliteStore({"filename": filepath}).connect()
+    parent = get_or_create_parent_context(store, pipeline_name)
+    first_uri = None
+    for stage in stages:
+        ctx = get_or_create_run_context(store, f"{pipeline_name}/{stage}")
+        associate_child_to_parent_context(store, parent, ctx)
+        for index in range(executions_per_stage):
+            execution = create_new_execution_in_existing_run_context(
+                store,
+                execution_type_name=ctx.name,
+                execution_name=ctx.name,
+                context_id=ctx.id,
+                execution="python src/run.py",
+                pipeline_id=parent.id,
+                pipeline_type=parent.name,
+                git_repo="https://github.com/example/repo.git",
+                git_start_commit="0123abcd",
+                custom_properties={"seed": index},
+            )
+            execution.properties["Execution_uuid"].string_value = f"{pipeline_name}-{stage}-{index}"
+            store.put_executions([execution])
+            if first_uri:
+                link_execution_to_artifact(store, execution.id, first_uri, "input", mlpb.Event.INPUT)
+            uri = f"{pipeline_name}-{stage}-{index}-md5"
+            create_new_artifact_event_and_attribution(
+                store,
+                execution.id,
+                ctx.id,
+                uri,
+                f"artifacts/{stage.lower()}_{index}.csv:{uri}",
+                "Dataset",
+                mlpb.Event.OUTPUT,
+                properties={"git_repo": "https://github.com/example/repo.git", "Commit": "commit 0123abcd"},
+                artifact_type_properties={"git_repo": mlpb.STRING, "Commit": mlpb.STRING},
+                custom_properties={"user-metadata1": "metadata_value"},
+            )
+            if first_uri is None:
+                first_uri = uri
+    return store
+
+
+@pytest.fixture
+def mlmd_file():
+    """Create a temporary MLMD file containing one small pipeline."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filepath = os.path.join(tmp_dir, "mlmd")
+        populate_mlmd(filepath)
+        yield filepath
+
+
+@pytest.fixture
+def no_git(monkeypatch):
+    """Let `Cmf` open SQLite stores outside of a git repository."""
+    monkeypatch.setattr(Cmf, "_Cmf__prechecks", staticmethod(lambda: None))
+    monkeypatch.setattr(cmflib.cmf, "git_checkout_new_branch", lambda branch_name: None)
+    monkeypatch.delenv("NEO4J_URI", raising=False)
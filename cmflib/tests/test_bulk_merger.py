@@ -0,0 +1,266 @@
+import json
+import os
+import re
+
+import pytest
+
+from ml_metadata.proto import metadata_store_pb2 as mlpb
+
+from cmflib.bulk_merger import BulkMerger
+from cmflib.cmf_merger import parse_json_to_mlmd
+from cmflib.store.sqllite_store import SqlliteStore
+from cmflib.store.store_pool import StorePool
+
+
+def _artifact(type_name, name, uri, properties=None, custom_properties=None):
+    return {
+        "type": type_name,
+        "name": name,
+        "uri": uri,
+        "properties": properties or {},
+        "custom_properties": custom_properties or {},
+    }
+
+
+def _execution(stage, index, events, name="", tag="a"):
+    return {
+        "name": name,
+        "properties": {
+            "Context_Type": stage,
+            "Execution": f"python src/{stage.split('/')[-1]}.py {index}",
+            "Execution_uuid": f"{stage}-{tag}-{index}",
+            "Git_Repo": "https://github.com/example/repo.git",
+            "Git_Start_Commit": "0123abcd",
+            "Git_End_Commit": f"end-{tag}",
+        },
+        "custom_properties": {"seed": index, "lr": 0.1},
+        "events": [{"type": event_type, "artifact": artifact} for event_type, artifact in events],
+    }
+
+
+def make_pipeline(tag="a", executions_per_stage=3):
+    """Pipeline JSON with every artifact type, artifacts shared between executions and a reused execution."""
+    git = {"git_repo": "https://github.com/example/repo.git", "Commit": "commit 0123abcd"}
+    prepare, train = "Test-env/Prepare", "Test-env/Train"
+    prepare_executions, train_executions = [], []
+    for i in range(executions_per_stage):
+        prepare_executions.append(_execution(prepare, i, [
+            (mlpb.Event.INPUT, _artifact("Environment", "python_env.txt:env-md5", "env-md5", dict(git, url=f"env-{tag}"))),
+            (mlpb.Event.INPUT, _artifact("Dataset", "data/raw.xml:raw-md5", "raw-md5", dict(git, url=f"/raw-{tag}"),
+                                         {"user-metadata1": f"value-{tag}", "size": i})),
+            (mlpb.Event.OUTPUT, _artifact("Dataset", f"data/prepared_{i}.csv:prep-{i}-md5", f"prep-{i}-md5",
+                                          dict(git, url="/prepared"))),
+            (mlpb.Event.OUTPUT, _artifact("Dataslice", f"slices/slice_{tag}_{i}:slice-{tag}-{i}",
+                                          f"slice-{tag}-{i}", git, {"split": "train"})),
+            # Second input event of the same dataslice, the per-event merge fails to add it.
+            (mlpb.Event.INPUT, _artifact("Dataslice", "slices/shared:slice-shared", "slice-shared", git,
+                                         {"split": f"shared-{tag}"})),
+            (mlpb.Event.INPUT, _artifact("Dataslice", "slices/shared:slice-shared", "slice-shared", git,
+                                         {"split": f"shared-{tag}"})),
+            # The name is taken by an artifact with another uri.
+            (mlpb.Event.OUTPUT, _artifact("Dataslice", "slices/taken", f"taken-{tag}-{i}", git)),
+        ]))
+        train_executions.append(_execution(train, i, [
+            (mlpb.Event.INPUT, _artifact("Dataset", f"data/prepared_{i}.csv:prep-{i}-md5", f"prep-{i}-md5",
+                                         dict(git, url=f"/prepared-{tag}"))),
+            (mlpb.Event.INPUT, _artifact("Label", "labels.csv:labels-md5", "labels-md5", dict(git, url="/labels"),
+                                         {"labels_uri": "labels-md5"})),
+            (mlpb.Event.OUTPUT, _artifact("Model", f"models/model.pkl:model-{i}-md5:{i}", f"model-{i}-md5", {
+                "model_framework": "SKlearn", "model_type": "RandomForest", "model_name": "rf",
+                "Commit": "commit 0123abcd", "url": f"/models-{tag}",
+            }, {"n_estimators": 10})),
+            (mlpb.Event.OUTPUT, _artifact("Metrics", f"metrics_{i}:metrics-{tag}-{i}:{100 + i}", f"metrics-{tag}-{i}",
+                                          {"metrics_name": f"metrics_{i}:metrics-{tag}-{i}:{100 + i}"}, {"auc": 0.9})),
+            (mlpb.Event.OUTPUT, _artifact("Step_Metrics", f"step_metrics_{i}:step-{tag}-{i}:{100 + i}",
+                                          f"step-{tag}-{i}", {"Commit": "commit 0123abcd", "url": "/step"})),
+            (mlpb.Event.OUTPUT, _artifact("Unknown", "unknown", "unknown-md5")),
+        ]))
+    # Executions with a name are reused by every push.
+    train_executions.append(_execution(train, 99, [
+        (mlpb.Event.INPUT, _artifact("Model", "models/model.pkl:model-0-md5:0", "model-0-md5",
+                                     {"url": f"/reused-{tag}"})),
+        (mlpb.Event.OUTPUT, _artifact("Metrics", f"reused:metrics-reused:{tag}", "metrics-reused")),
+    ], name="evaluate", tag=tag))
+    return {
+        "name": "Test-env",
+        "stages": [
+            {"name": prepare, "custom_properties": {"owner": "team"}, "executions": prepare_executions},
+            {"name": train, "custom_properties": {}, "executions": train_executions},
+        ],
+    }
+
+
+def _seed(filepath):
+    store = SqlliteStore({"filename": filepath}).connect()
+    artifact_type = store.put_artifact_type(mlpb.ArtifactType(
+        name="Dataslice", properties={"git_repo": mlpb.STRING, "Commit": mlpb.STRING, "url": mlpb.STRING}
+    ))
+    store.put_artifacts([mlpb.Artifact(type_id=artifact_type, name="slices/taken", uri="taken-seed")])
+
+
+def _snapshot(filepath):
+    """Store content without ids of the type tables and timestamps."""
+    store = SqlliteStore({"filename": filepath}).connect()
+    artifact_types = {a_type.id: a_type.name for a_type in store.get_artifact_types()}
+    execution_types = {e_type.id: e_type.name for e_type in store.get_execution_types()}
+
+    def props(node):
+        result = {key: value for key, value in node.properties.items()}
+        if "Execution_uuid" in result:
+            result["Execution_uuid"] = sorted(result["Execution_uuid"].string_value.split(","))
+        return result, dict(node.custom_properties.items())
+
+    contexts = store.get_contexts()
+    executions = store.get_executions()
+    return {
+        "contexts": [(c.id, c.name, c.type_id, props(c)) for c in contexts],
+        "parents": [(c.id, [p.id for p in store.get_parent_contexts_by_context(c.id)]) for c in contexts],
+        "executions": [(e.id, execution_types[e.type_id], e.name, props(e)) for e in executions],
+        "artifacts": [(a.id, artifact_types[a.type_id], a.name, a.uri, props(a)) for a in store.get_artifacts()],
+        "events": sorted(
+            (e.execution_id, e.artifact_id, e.type, [step.key for step in e.path.steps])
+            for e in store.get_events_by_execution_ids([e.id for e in executions])
+        ),
+        "attributions": [(c.id, sorted(a.id for a in store.get_artifacts_by_context(c.id))) for c in contexts],
+        "associations": [(c.id, sorted(e.id for e in store.get_executions_by_context(c.id))) for c in contexts],
+    }
+
+
+def test_bulk_merge_matches_per_event_merge(tmp_path, no_git):
+    stores = {}
+    for bulk in (False, True):
+        filepath = os.path.join(tmp_path, f"mlmd_{bulk}")
+        _seed(filepath)
+        for tag in ("a", "b"):
+            assert parse_json_to_mlmd(json.dumps(make_pipeline(tag)), filepath, "pull", None, bulk=bulk) == "success"
+        stores[bulk] = _snapshot(filepath)
+
+    for key, legacy in stores[False].items():
+        assert stores[True][key] == legacy, key
+    # Sanity checks that the payload exercises reuse of executions and artifacts.
+    assert [e for e in stores[True]["executions"] if e[2] == "evaluate"][0][3][0]["Execution_uuid"] == [
+        "Test-env/Train-a-99", "Test-env/Train-b-99"
+    ]
+    assert len([a for a in stores[True]["artifacts"] if a[3] == "raw-md5"]) == 1
+
+
+def test_bulk_merge_exec_uuid(tmp_path, no_git):
+    filepath = os.path.join(tmp_path, "mlmd")
+    pipeline = make_pipeline()
+    parse_json_to_mlmd(json.dumps(pipeline), filepath, "pull", "Test-env/Train-a-1", bulk=True)
+
+    store = SqlliteStore({"filename": filepath}).connect()
+    executions = store.get_executions()
+    assert [e.properties["Execution_uuid"].string_value for e in executions] == ["Test-env/Train-a-1"]
+    assert [c.name for c in store.get_contexts()] == ["Test-env", "Test-env/Train"]
+    assert len(store.get_events_by_execution_ids([executions[0].id])) == 5
+
+
+def _normalized(filepath):
+    """Store content with executions and artifacts identified by uuid and name instead of id.
+
+    Model and metrics names end with the id of the execution that created them, which is dropped.
+    """
+    store = SqlliteStore({"filename": filepath}).connect()
+    executions = {e.id: e.properties["Execution_uuid"].string_value for e in store.get_executions()}
+    artifacts = {a.id: (re.sub(r":\d+$", "", a.name), a.uri) for a in store.get_artifacts()}
+    return {
+        "executions": sorted(executions.values()),
+        "artifacts": sorted(artifacts.values()),
+        "events": sorted(
+            (executions[e.execution_id], artifacts[e.artifact_id], e.type)
+            for e in store.get_events_by_execution_ids(list(executions))
+        ),
+        "attributions": sorted(
+            (c.name, artifacts[a.id]) for c in store.get_contexts() for a in store.get_artifacts_by_context(c.id)
+        ),
+    }
+
+
+def test_bulk_merge_parallel_stages(tmp_path, no_git):
+    pipeline = make_pipeline()
+    # A stage sharing no artifacts with the others.
+    pipeline["stages"].append({"name": "Test-env/Report", "custom_properties": {}, "executions": [
+        _execution("Test-env/Report", i, [
+            (mlpb.Event.OUTPUT, _artifact("Dataset", f"report_{i}.html:report-{i}", f"report-{i}", {"url": "/r"})),
+        ]) for i in range(3)
+    ]})
+    stores = {}
+    for workers in (1, 3):
+        filepath = os.path.join(tmp_path, f"mlmd_{workers}")
+        _seed(filepath)
+        store_pool = StorePool(SqlliteStore({"filename": filepath}).connect, max_size=workers)
+        assert parse_json_to_mlmd(
+            json.dumps(pipeline), filepath, "pull", None, workers=workers, store_pool=store_pool
+        ) == "success"
+        stores[workers] = _normalized(filepath)
+    assert stores[3] == stores[1]
+    assert len(stores[3]["executions"]) == 10
+
+
+def test_bulk_merge_parallel_stages_share_pool(tmp_path, no_git):
+    """Test that merge threads return their connections, so more threads than connections finish the merge."""
+    filepath = os.path.join(tmp_path, "mlmd")
+    _seed(filepath)
+    store_pool = StorePool(SqlliteStore({"filename": filepath}).connect, max_size=1, timeout=30)
+    assert parse_json_to_mlmd(
+        json.dumps(make_pipeline()), filepath, "pull", None, workers=3, store_pool=store_pool
+    ) == "success"
+    assert store_pool.size == 1
+    assert len(_normalized(filepath)["executions"]) == 7
+
+
+def test_bulk_merge_replans_are_bounded(tmp_path, no_git, monkeypatch):
+    """Test that a stage is written with its uris claimed when concurrent merges keep changing its artifacts."""
+    filepath = os.path.join(tmp_path, "mlmd_unchanged")
+    _seed(filepath)
+    assert parse_json_to_mlmd(json.dumps(make_pipeline()), filepath, "pull", None) == "success"
+    expected = _normalized(filepath)
+
+    filepath = os.path.join(tmp_path, "mlmd_changed")
+    _seed(filepath)
+    monkeypatch.setattr(BulkMerger, "_unchanged", lambda self, plan, uris: False)
+    assert parse_json_to_mlmd(json.dumps(make_pipeline()), filepath, "pull", None) == "success"
+    assert _normalized(filepath) == expected
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_bulk_merge_stage_error(tmp_path, no_git, monkeypatch, workers):
+    """Test that a failed stage fails the merge after the other stages were merged, with and without threads."""
+    merge_stage = BulkMerger.merge_stage
+
+    def failing_merge_stage(self, stage, executions):
+        if stage["name"] == "Test-env/Prepare":
+            raise RuntimeError("stage failed")
+        return merge_stage(self, stage, executions)
+
+    filepath = os.path.join(tmp_path, "mlmd")
+    _seed(filepath)
+    monkeypatch.setattr(BulkMerger, "merge_stage", failing_merge_stage)
+    store_pool = StorePool(SqlliteStore({"filename": filepath}).connect, max_size=3)
+    assert parse_json_to_mlmd(
+        json.dumps(make_pipeline()), filepath, "pull", None, workers=workers, store_pool=store_pool
+    ) == "Failed to merge stages: Test-env/Prepare"
+    store = SqlliteStore({"filename": filepath}).connect()
+    train = [c for c in store.get_contexts() if c.name == "Test-env/Train"][0]
+    assert store.get_executions_by_context(train.id)
+
+
+def test_bulk_merge_updated_artifacts(tmp_path, no_git):
+    """Test that only existing artifacts whose properties changed are reported as updated."""
+    filepath = os.path.join(tmp_path, "mlmd")
+    _seed(filepath)
+    assert parse_json_to_mlmd(json.dumps(make_pipeline()), filepath, "pull", None) == "success"
+    store = SqlliteStore({"filename": filepath}).connect()
+    raw = store.get_artifacts_by_uri("raw-md5")[0]
+
+    updated = set()
+    status = parse_json_to_mlmd(json.dumps(make_pipeline()), filepath, "pull", None, updated_artifacts=updated)
+    assert status == "success"
+    assert updated == set()
+
+    # The raw dataset gets the custom properties of another push.
+    status = parse_json_to_mlmd(json.dumps(make_pipeline("b")), filepath, "pull", None, updated_artifacts=updated)
+    assert status == "success"
+    assert raw.id in updated
+    assert store.get_artifacts_by_id([raw.id])[0] != raw
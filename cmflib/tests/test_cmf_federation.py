@@ -0,0 +1,175 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from cmflib.bulk_merger import BulkMerger
+from cmflib.cmf_federation import iter_ndjson_pipelines, update_mlmd, update_mlmd_stream
+from cmflib.commands.metadata import push
+from cmflib.server_interface import server_interface
+from cmflib.cmfquery import CmfQuery
+from cmflib.store.sqllite_store import SqlliteStore
+from cmflib.tests.conftest import populate_mlmd
+from cmflib.tests.test_bulk_merger import make_pipeline
+
+
+def test_concurrent_pulls_of_same_executions(tmp_path, no_git):
+    """Test that merges of the same executions take turns, so that every execution is added once."""
+    filepath = os.path.join(tmp_path, "mlmd")
+    SqlliteStore({"filename": filepath}).connect()
+    payload = json.dumps({"Pipeline": [make_pipeline()]})
+
+    def pull(_):
+        return update_mlmd(CmfQuery(filepath), payload, "Test-env", "pull", None)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        # The named execution is merged by every pull.
+        assert list(executor.map(pull, range(4))) == ["success"] * 4
+
+    store = SqlliteStore({"filename": filepath}).connect()
+    uuids = [e.properties["Execution_uuid"].string_value for e in store.get_executions()]
+    expected = [f"Test-env/{stage}-a-{i}" for stage in ("Prepare", "Train") for i in range(3)] + ["Test-env/Train-a-99"]
+    assert sorted(uuids) == sorted(expected)
+
+
+def test_update_mlmd_merge_failed(tmp_path, no_git, monkeypatch):
+    """Test that a failed stage is reported as merge_failed instead of raising."""
+    filepath = os.path.join(tmp_path, "mlmd")
+    SqlliteStore({"filename": filepath}).connect()
+
+    def failing_merge_stage(self, stage, executions):
+        raise RuntimeError("stage failed")
+
+    monkeypatch.setattr(BulkMerger, "merge_stage", failing_merge_stage)
+    payload = json.dumps({"Pipeline": [make_pipeline()]})
+    assert update_mlmd(CmfQuery(filepath), payload, "Test-env", "pull", None) == "merge_failed"
+
+
+class _Response:
+    def __init__(self, status_code, body, headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def json(self):
+        return self.body
+
+
+class _ChunkServer:
+    """In-process stand-in for the chunked push endpoints, merging chunks into a SQLite store."""
+
+    def __init__(self, filepath, fail_at=None):
+        self.query = CmfQuery(filepath)
+        self.acks = {}
+        self.received = []
+        self.fail_at = fail_at
+        self.negotiated = []
+        self.encodings = []
+
+    def missing(self, url, pipeline_name, execution_uuids):
+        self.negotiated.append(execution_uuids)
+        known = self.query.get_execution_uuids(pipeline_name)
+        return _Response(200, {"missing": [u for u in execution_uuids if u not in known], "known_uuids": len(known)})
+
+    def status(self, url, push_id):
+        chunks = list(self.acks.get(push_id, {}).values())
+        return _Response(200, {"push_id": push_id, "chunks": chunks}, {"Accept-Encoding": "gzip"})
+
+    def push_chunk(self, json_payload, url, exec_uuid, pipeline_name, push_id, chunk_index, last_chunk, encoding=None):
+        if chunk_index == self.fail_at:
+            raise requests.ConnectionError()
+        self.received.append(chunk_index)
+        self.encodings.append(encoding)
+        status = update_mlmd(self.query, json_payload, pipeline_name, "pull", exec_uuid)
+        self.acks.setdefault(push_id, {})[chunk_index] = {
+            "chunk_index": chunk_index,
+            "chunk_key": server_interface.chunk_key(json_payload),
+            "status": status,
+        }
+        return _Response(200, {"status": status})
+
+
+def test_chunked_push_resumes(tmp_path, no_git, mlmd_file, monkeypatch):
+    """Test that a failed push resumes after the acknowledged chunks and merges every execution."""
+    server = _ChunkServer(os.path.join(tmp_path, "server_mlmd"), fail_at=1)
+    monkeypatch.setattr(server_interface, "call_mlmd_push_status", server.status)
+    monkeypatch.setattr(server_interface, "call_mlmd_push_chunk", server.push_chunk)
+    monkeypatch.setattr(push.time, "sleep", lambda seconds: None)
+    command = push.CmdMetadataPush(None)
+    query = CmfQuery(mlmd_file)
+
+    with pytest.raises(requests.ConnectionError):
+        command.push_in_chunks(query, mlmd_file, "http://server", "Test-env", None, 1)
+    assert server.received == [0]
+
+    server.fail_at = None
+    assert command.push_in_chunks(query, mlmd_file, "http://server", "Test-env", None, 1) == (200, "success")
+    assert server.received == [0, 1, 2, 3]
+    assert set(server.encodings) == {"gzip"}
+    assert server.query.get_execution_uuids("Test-env") == query.get_execution_uuids("Test-env")
+
+    # Nothing is merged again, the last chunk is sent to complete the push.
+    assert command.push_in_chunks(query, mlmd_file, "http://server", "Test-env", None, 1) == (200, "success")
+    assert server.received == [0, 1, 2, 3, 3]
+
+
+def test_push_negotiates_missing_executions(tmp_path, no_git, mlmd_file, monkeypatch):
+    """Test that pushes after the first one negotiate and send only executions updated since the watermark."""
+    server = _ChunkServer(os.path.join(tmp_path, "server_mlmd"))
+    monkeypatch.setattr(server_interface, "call_mlmd_push_status", server.status)
+    monkeypatch.setattr(server_interface, "call_mlmd_push_chunk", server.push_chunk)
+    monkeypatch.setattr(server_interface, "call_mlmd_push_missing", server.missing)
+    command = push.CmdMetadataPush(None)
+
+    exec_uuids, watermark = command.missing_executions(CmfQuery(mlmd_file), "http://server", "Test-env", None)
+    assert exec_uuids == {f"Test-env-{stage}-{i}" for stage in ("Prepare", "Train") for i in range(2)}
+    assert command.push_in_chunks(CmfQuery(mlmd_file), mlmd_file, "http://server", "Test-env", None, 2, exec_uuids) == (
+        200, "success"
+    )
+    push.save_push_watermark(mlmd_file, "http://server", "Test-env", watermark)
+    assert push.load_push_watermark(mlmd_file, "http://server", "Test-env") == watermark
+    assert push.load_push_watermark(mlmd_file, "http://other", "Test-env") is None
+
+    populate_mlmd(mlmd_file, stages=("Eval",), executions_per_stage=1)
+    query = CmfQuery(mlmd_file)
+    exec_uuids, next_watermark = command.missing_executions(query, "http://server", "Test-env", watermark)
+    assert exec_uuids == {"Test-env-Eval-0"}
+    assert next_watermark > watermark
+    # Executions older than the watermark are not negotiated.
+    assert "Test-env-Prepare-0" not in server.negotiated[-1]
+    server.received.clear()
+    assert command.push_in_chunks(query, mlmd_file, "http://server", "Test-env", None, 2, exec_uuids) == (200, "success")
+    assert server.received == [0]
+    assert server.query.get_execution_uuids("Test-env") == query.get_execution_uuids("Test-env")
+
+    # A server without the pipeline gets every execution despite the watermark.
+    reset = _ChunkServer(os.path.join(tmp_path, "reset_mlmd"))
+    monkeypatch.setattr(server_interface, "call_mlmd_push_missing", reset.missing)
+    exec_uuids, _ = command.missing_executions(query, "http://server", "Test-env", next_watermark)
+    assert exec_uuids == query.get_execution_uuids("Test-env")
+
+
+def test_update_mlmd_stream(tmp_path, no_git, mlmd_file):
+    """Test that streamed records are merged in batches and give the same store as a merge of the whole document."""
+    source = CmfQuery(mlmd_file)
+    batches = list(iter_ndjson_pipelines(line.encode() for line in source.iter_ndjson("Test-env")))
+    assert [[(stage["name"], len(stage["executions"])) for stage in batch["stages"]] for batch in batches] == [
+        [("Test-env/Prepare", 2), ("Test-env/Train", 2)]
+    ]
+    batches = list(iter_ndjson_pipelines(source.iter_ndjson("Test-env"), batch_size=3))
+    assert [[(stage["name"], len(stage["executions"])) for stage in batch["stages"]] for batch in batches] == [
+        [("Test-env/Prepare", 2), ("Test-env/Train", 1)], [("Test-env/Train", 1)]
+    ]
+    with pytest.raises(ValueError):
+        list(iter_ndjson_pipelines(['{"execution": {}}']))
+
+    filepath = os.path.join(tmp_path, "mlmd")
+    SqlliteStore({"filename": filepath}).connect()
+    target = CmfQuery(filepath)
+    assert update_mlmd_stream(target, source.iter_ndjson(), "Test-env", "pull", None, batch_size=1) == "success"
+    assert target.get_execution_uuids("Test-env") == source.get_execution_uuids("Test-env")
+    assert len(target.get_all_artifacts_by_context("Test-env")) == len(source.get_all_artifacts_by_context("Test-env"))
+    assert update_mlmd_stream(target, source.iter_ndjson(), "Test-env", "pull", None) == "exists"
+    assert update_mlmd_stream(target, source.iter_ndjson(), "Other", "pull", None) == "pipeline_not_exist"
@@ -0,0 +1,403 @@
+import io
+import os
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from cmflib.cmfquery import CmfQuery
+from cmflib.query_cache import QueryCache
+from cmflib.metadata_helper import (
+    associate_child_to_parent_context,
+    get_or_create_parent_context,
+    get_or_create_run_context,
+)
+from cmflib.store.sqllite_store import SqlliteStore
+from cmflib.tests.conftest import populate_mlmd
+
+
+@pytest.fixture
+def query(mlmd_file):
+    return CmfQuery(mlmd_file)
+
+
+def test_get_all_executions_for_artifact_id(query):
+    """Test that executions are resolved together with their stage and pipeline."""
+    df = query.get_all_executions_for_artifact_id(1)
+
+    assert list(df.columns) == ["Type", "execution_id", "execution_name", "execution_type_name", "pipeline", "stage"]
+    assert df["Type"].tolist() == ["OUTPUT", "INPUT", "INPUT", "INPUT"]
+    assert df["execution_id"].tolist() == [1, 2, 3, 4]
+    assert df["stage"].tolist() == ["Test-env/Prepare", "Test-env/Prepare", "Test-env/Train", "Test-env/Train"]
+    assert set(df["pipeline"]) == {"Test-env"}
+
+
+def test_get_all_executions_for_artifact_id_unknown(query):
+    """Test that an unknown artifact id returns an empty data frame."""
+    assert query.get_all_executions_for_artifact_id(1000).empty
+
+
+def test_get_all_executions_for_artifact_ids(query):
+    """Test the multi-artifact variant matches per-artifact lookups."""
+    df = query.get_all_executions_for_artifact_ids([1, 2, 3])
+
+    assert set(df["artifact_id"]) == {1, 2, 3}
+    for artifact_id, group in df.groupby("artifact_id"):
+        single = query.get_all_executions_for_artifact_id(artifact_id)
+        assert group["execution_id"].tolist() == single["execution_id"].tolist()
+        assert group["Type"].tolist() == single["Type"].tolist()
+
+
+def test_get_all_executions_for_artifact(query):
+    """Test lookup by artifact name."""
+    name = query.get_all_artifacts()[0]
+    df = query.get_all_executions_for_artifact(name)
+
+    assert "artifact_id" not in df.columns
+    assert df["execution_id"].tolist() == [1, 2, 3, 4]
+
+
+def test_dump_json_streams_same_document(query):
+    """Test that the streamed document matches dumptojson for any batch size."""
+    expected = json.loads(query.dumptojson("Test-env"))
+    buffer = io.StringIO()
+    query.dump_json(buffer, "Test-env", batch_size=1)
+
+    assert json.loads(buffer.getvalue()) == expected
+    stages = expected["Pipeline"][0]["stages"]
+    assert [stage["name"] for stage in stages] == ["Test-env/Prepare", "Test-env/Train"]
+    assert [len(execution["events"]) for execution in stages[1]["executions"]] == [2, 2]
+    assert stages[0]["executions"][0]["events"][0]["artifact"]["type"] == "Dataset"
+
+
+def test_extract_to_json_skips_unchanged(query):
+    """Test that pipelines without updates after last_sync_time are left out."""
+    assert json.loads(query.extract_to_json(0))["Pipeline"][0]["name"] == "Test-env"
+    assert json.loads(query.extract_to_json(2**62)) == {"Pipeline": []}
+
+
+def test_extract_to_json_incremental(query):
+    """Test that only stages and executions updated after last_sync_time are exported."""
+    watermark = query.store.get_executions_by_id([3])[0].last_update_time_since_epoch
+    pipelines = json.loads(query.extract_to_json(watermark))["Pipeline"]
+
+    assert [stage["name"] for stage in pipelines[0]["stages"]] == ["Test-env/Train"]
+    assert [execution["id"] for execution in pipelines[0]["stages"][0]["executions"]] == [4]
+
+
+def test_query_cache(query, mlmd_file):
+    """Test that cached results are reused, protected from callers and dropped when the store changes."""
+    cache = query.enable_cache()
+    df = query.get_all_executions_in_pipeline("Test-env")
+    df.loc[0, "name"] = "modified"
+    misses = cache.misses
+
+    assert "modified" not in query.get_all_executions_in_pipeline("Test-env")["name"].tolist()
+    assert (cache.hits, cache.misses) == (1, misses)
+
+    assert query.get_pipeline_names() == ["Test-env"]
+    populate_mlmd(mlmd_file, pipeline_name="Other-env", stages=("Prepare",))
+    assert query.get_pipeline_names() == ["Test-env", "Other-env"]
+
+
+def test_query_cache_store_changed_during_compute():
+    """Test that results computed while the store changed are returned but not cached."""
+    versions = [1]
+    cache = QueryCache(lambda: versions[-1])
+
+    def compute():
+        versions.append(versions[-1] + 1)
+        return len(versions)
+
+    assert cache.get_or_compute("key", compute) == 2
+    assert len(cache) == 0
+    assert cache.get_or_compute("key", lambda: 0) == 0
+    assert len(cache) == 1
+    assert cache.get_or_compute("key", compute) == 0
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_arrow_result_format(mlmd_file):
+    """Test that arrow results hold the same data as pandas ones, with dictionary-encoded repetitive columns."""
+    expected = CmfQuery(mlmd_file).get_all_artifacts_by_context("Test-env")
+    table = CmfQuery(mlmd_file, result_format="arrow").get_all_artifacts_by_context("Test-env")
+
+    assert isinstance(table, pa.Table)
+    assert pa.types.is_dictionary(table.schema.field("type").type)
+    actual = table.to_pandas()
+    actual = actual.astype({name: str for name in actual.select_dtypes("category").columns})
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_arrow_result_format_events(mlmd_file):
+    """Test the arrow variant of the artifact to executions lookup."""
+    table = CmfQuery(mlmd_file, result_format="arrow").get_all_executions_for_artifact_id(1)
+
+    assert table.column_names == ["Type", "execution_id", "execution_name", "execution_type_name", "pipeline", "stage"]
+    assert table.column("execution_type_name").to_pylist() == ["Test-env/Prepare"] * 2 + ["Test-env/Train"] * 2
+    assert pa.types.is_dictionary(table.schema.field("stage").type)
+
+
+def test_unsupported_result_format(mlmd_file):
+    with pytest.raises(ValueError):
+        CmfQuery(mlmd_file, result_format="unknown")
+
+
+@pytest.fixture
+def metrics_name(mlmd_file):
+    """Register a Step_Metrics artifact with a multi row group Parquet file next to the MLMD file."""
+    from ml_metadata.proto import metadata_store_pb2 as mlpb
+    from cmflib.metadata_helper import create_new_artifact_event_and_attribution
+    from cmflib.store.sqllite_store import SqlliteStore
+
+    path = os.path.join(os.path.dirname(mlmd_file), "training_metrics")
+    metrics = pd.DataFrame(
+        {"loss": [1.0 / step for step in range(1, 101)], "accuracy": [step / 100 for step in range(1, 101)]},
+        index=pd.Index(list(range(1, 101)), name="SequenceNumber"),
+    )
+    metrics.to_parquet(path, row_group_size=10)
+    name = f"{path}:0123abcd:1:metrics-uuid"
+    store = SqlliteStore({"filename": mlmd_file}).connect()
+    execution = store.get_executions()[0]
+    context = store.get_contexts_by_execution(execution.id)[0]
+    create_new_artifact_event_and_attribution(
+        store, execution.id, context.id, "0123abcd", name, "Step_Metrics", mlpb.Event.OUTPUT
+    )
+    return name
+
+
+def test_get_metrics(query, metrics_name):
+    """Test that columns, step range and filters are applied when reading metrics."""
+    expected = pd.read_parquet(metrics_name.split(":")[0])
+    pd.testing.assert_frame_equal(query.get_metrics(metrics_name), expected)
+
+    df = query.get_metrics(metrics_name, columns=["loss"], step_range=(21, 30), filters=[("loss", "<", 1 / 25)])
+    assert list(df.columns) == ["loss"]
+    assert list(df.index) == [26, 27, 28, 29, 30]
+    assert df.index.name == "SequenceNumber"
+
+    assert list(query.get_metrics(metrics_name, step_range=(None, 3)).index) == [1, 2, 3]
+    assert query.get_metrics("unknown") is None
+
+
+def test_summarize_metrics(query, metrics_name):
+    """Test that summaries from Parquet statistics match the aggregated metrics."""
+    df = query.summarize_metrics("Test-env", agg=[min, max, "last", "count"])
+    metrics = pd.read_parquet(metrics_name.split(":")[0])
+
+    assert list(df.columns) == ["metrics_name", "execution_id", "stage", "metric", "min", "max", "last", "count"]
+    assert list(df["metric"]) == ["loss", "accuracy"]
+    assert set(df["metrics_name"]) == {metrics_name}
+    assert set(df["stage"]) == {"Test-env/Prepare"}
+    for row in df.itertuples():
+        assert (row.min, row.max, row.last, row.count) == (
+            metrics[row.metric].min(), metrics[row.metric].max(), metrics[row.metric].iloc[-1], len(metrics)
+        )
+
+    assert list(query.summarize_metrics("Test-env", ["accuracy"], agg=["last"])["last"]) == [1.0]
+    assert query.summarize_metrics("Unknown").empty
+    with pytest.raises(ValueError):
+        query.summarize_metrics("Test-env", agg=["mean"])
+
+
+def test_sql(query, metrics_name, mlmd_file):
+    """Test that metadata and step metrics can be joined in SQL."""
+    pytest.importorskip("duckdb")
+    df = query.sql(
+        "SELECT e.execution_type, m.artifact_name, count(*) AS steps, min(m.loss) AS min_loss "
+        "FROM executions e JOIN step_metrics m USING (execution_id) GROUP BY ALL"
+    )
+    assert df.to_dict("records") == [
+        {"execution_type": "Test-env/Prepare", "artifact_name": metrics_name, "steps": 100, "min_loss": 0.01}
+    ]
+
+    outputs = query.sql(
+        "SELECT count(*) AS n FROM events ev JOIN artifacts a USING (artifact_id) WHERE ev.event = ? AND a.type = ?",
+        ["OUTPUT", "Dataset"],
+    )
+    assert outputs["n"][0] == 4
+
+    populate_mlmd(mlmd_file, pipeline_name="Other-env", stages=("Prepare",), executions_per_stage=1)
+    assert list(query.sql("SELECT pipeline FROM pipelines ORDER BY pipeline_id")["pipeline"]) == ["Test-env", "Other-env"]
+    assert query.sql("SELECT * FROM dataslices").empty
+
+
+def test_get_all_executions_in_stages(query, mlmd_file):
+    """Test that the batched stage query matches per-stage queries, also after the store changed."""
+    populate_mlmd(mlmd_file, pipeline_name="Other-env", stages=("Prepare", "Train", "Eval"), executions_per_stage=3)
+    for pipeline_name in ("Test-env", "Other-env"):
+        executions = query.get_all_executions_in_stages(pipeline_name)
+        assert list(executions) == query.get_pipeline_stages(pipeline_name)
+        for stage, df in executions.items():
+            pd.testing.assert_frame_equal(df, query.get_all_executions_in_stage(stage))
+            assert list(df["id"]) == [exe.id for exe in query.get_all_exe_in_stage(stage)]
+
+    assert list(query.get_all_executions_in_stages("Other-env", ["Other-env/Eval"])) == ["Other-env/Eval"]
+    assert query.get_all_executions_in_stages("Unknown") == {}
+
+
+def test_context_index_refresh(query, mlmd_file):
+    """Test that pipelines and stages added after the index was built are found."""
+    assert query.get_pipeline_id("New-env") == -1
+    populate_mlmd(mlmd_file, pipeline_name="New-env", stages=("Prepare",), executions_per_stage=1)
+
+    assert query.get_pipeline_stages("New-env") == ["New-env/Prepare"]
+    assert len(query.get_all_executions_in_stage("New-env/Prepare")) == 1
+
+
+def test_context_index_unlinked_stage(query, mlmd_file, monkeypatch):
+    """Test that a stage linked after the index was built is found, and that old unlinked stages are not checked."""
+    store = SqlliteStore({"filename": mlmd_file}).connect()
+    stage = get_or_create_run_context(store, "Test-env/Late")
+    assert "Test-env/Late" not in query.get_pipeline_stages("Test-env")
+
+    # Linking a stage does not change the most recently updated context.
+    associate_child_to_parent_context(store, get_or_create_parent_context(store, "Test-env"), stage)
+    assert "Test-env/Late" in query.get_pipeline_stages("Test-env")
+
+    orphan = get_or_create_run_context(store, "Test-env/Orphan")
+    query.get_pipeline_stages("Test-env")
+    checked = []
+    monkeypatch.setattr(
+        query._context_index.store, "get_parent_contexts_by_context", lambda ctx_id: checked.append(ctx_id) or []
+    )
+    # Only the unlinked stage is checked, the index is not rebuilt.
+    monkeypatch.setattr(query._context_index, "_build", None)
+    query.get_pipeline_stages("Test-env")
+    assert checked and set(checked) == {orphan.id}
+    checked.clear()
+    query._context_index.grace_ms = -1
+    query.get_pipeline_stages("Test-env")
+    assert checked == []
+
+
+def test_get_execution_uuids(query, mlmd_file):
+    """Test that the uuid index picks up new stages, new executions and uuids added to existing executions."""
+    expected = {f"Test-env-{stage}-{index}" for stage in ("Prepare", "Train") for index in range(2)}
+    assert query.get_execution_uuids("Test-env") == expected
+    assert query.get_execution_uuids("Unknown") == frozenset()
+
+    store = populate_mlmd(mlmd_file, stages=("Eval",), executions_per_stage=1)
+    # A reused execution collects the uuids of later runs.
+    execution = store.get_executions_by_id([1])[0]
+    execution.properties["Execution_uuid"].string_value += ",Test-env-Prepare-rerun"
+    store.put_executions([execution])
+
+    expected |= {"Test-env-Eval-0", "Test-env-Prepare-rerun"}
+    assert query.get_execution_uuids("Test-env") == expected
+    assert set(query.get_all_executions_in_pipeline("Test-env")["Execution_uuid"].str.split(",").sum()) == expected
+
+
+def test_iter_json_batches(query):
+    """Test that batches hold at most `batch_size` executions and together form the `dumptojson` document."""
+    full = json.loads(query.dumptojson("Test-env"))["Pipeline"][0]
+    batches = [json.loads(batch)["Pipeline"][0] for batch in query.iter_json_batches("Test-env", batch_size=3)]
+
+    assert [[(stage["name"], len(stage["executions"])) for stage in batch["stages"]] for batch in batches] == [
+        [("Test-env/Prepare", 2), ("Test-env/Train", 1)], [("Test-env/Train", 1)]
+    ]
+    for batch in batches:
+        assert {k: v for k, v in batch.items() if k != "stages"} == {k: v for k, v in full.items() if k != "stages"}
+    executions = [execution for batch in batches for stage in batch["stages"] for execution in stage["executions"]]
+    assert executions == [execution for stage in full["stages"] for execution in stage["executions"]]
+
+    batches = [json.loads(batch)["Pipeline"][0] for batch in query.iter_json_batches("Test-env", "Test-env-Train-1")]
+    assert [[len(stage["executions"]) for stage in batch["stages"]] for batch in batches] == [[1]]
+    with pytest.raises(ValueError):
+        next(query.iter_json_batches("Test-env", batch_size=0))
+
+
+def test_get_pipeline_version(mlmd_file):
+    query = CmfQuery(mlmd_file)
+    version = query.get_pipeline_version("Test-env")
+    assert query.get_pipeline_version("Test-env") == version
+    assert query.get_pipeline_version("Missing") is None
+
+    populate_mlmd(mlmd_file, stages=("Eval",), executions_per_stage=1)
+    assert query.get_pipeline_version("Test-env") != version
+
+
+def test_get_pipelines_of_artifacts(mlmd_file):
+    """Test that pipelines are found by the artifacts their executions use or produce."""
+    query = CmfQuery(mlmd_file)
+    assert query.get_pipelines_of_artifacts([]) == set()
+    assert query.get_pipelines_of_artifacts([1]) == {"Test-env"}
+
+
+def test_iter_ndjson(query):
+    """Test that records hold the nodes of the `dumptojson` document, one pipeline, stage or execution per line."""
+    full = json.loads(query.dumptojson("Test-env"))["Pipeline"][0]
+    lines = list(query.iter_ndjson("Test-env"))
+    assert all(line.endswith("\n") and line.count("\n") == 1 for line in lines)
+    records = [json.loads(line) for line in lines]
+
+    assert [next(iter(record)) for record in records] == [
+        "pipeline", "stage", "execution", "execution", "stage", "execution", "execution"
+    ]
+    assert records[0]["pipeline"] == {k: v for k, v in full.items() if k != "stages"}
+    assert records[4]["stage"] == {k: v for k, v in full["stages"][1].items() if k != "executions"}
+    assert [r["execution"] for r in records if "execution" in r] == [
+        execution for stage in full["stages"] for execution in stage["executions"]
+    ]
+    # Nothing changed after the last update.
+    last_update = max(record[next(iter(record))]["last_update_time_since_epoch"] for record in records)
+    assert list(query.iter_ndjson(last_sync_time=last_update)) == []
+
+
+def test_get_json_page(query, mlmd_file):
+    """Test that pages cover every execution once and that paging resumes from the cursor of the last page."""
+    full = json.loads(query.dumptojson("Test-env"))["Pipeline"][0]
+
+    def _pages(cursor):
+        while True:
+            page = json.loads(query.get_json_page(cursor["time"], cursor["id"], limit=3))
+            yield page
+            cursor = page["next"] or cursor
+            if not page["more"]:
+                return
+
+    pages = list(_pages({"time": None, "id": 0}))
+    assert [page["more"] for page in pages] == [True, False]
+    assert all(p["name"] == "Test-env" and p["create_time_since_epoch"] == full["create_time_since_epoch"]
+               for page in pages for p in page["Pipeline"])
+    executions = [e for page in pages for p in page["Pipeline"] for s in p["stages"] for e in s["executions"]]
+    update_times = [e["last_update_time_since_epoch"] for e in executions]
+    assert update_times == sorted(update_times)
+    expected = [e for stage in full["stages"] for e in stage["executions"]]
+    assert sorted(executions, key=lambda e: e["id"]) == sorted(expected, key=lambda e: e["id"])
+
+    populate_mlmd(mlmd_file, stages=("Eval",), executions_per_stage=2)
+    pages = list(_pages(pages[-1]["next"]))
+    assert [(s["name"], [e["properties"]["Execution_uuid"] for e in s["executions"]])
+            for page in pages for p in page["Pipeline"] for s in p["stages"]] == [
+        ("Test-env/Eval", ["Test-env-Eval-0", "Test-env-Eval-1"])
+    ]
+    cursor = pages[-1]["next"]
+    assert json.loads(query.get_json_page(cursor["time"], cursor["id"])) == {"Pipeline": [], "next": None, "more": False}
+    with pytest.raises(ValueError):
+        query.get_json_page(limit=0)
+
+
+@pytest.mark.parametrize("order_by", ["id", "create_time", "update_time"])
+@pytest.mark.parametrize("is_asc", [True, False])
+def test_iter_executions(query, order_by, is_asc):
+    """Test that pages cover all executions of a pipeline exactly once, in the requested order."""
+    expected = query.get_all_executions_in_pipeline("Test-env")
+    pages = list(query.iter_executions("Test-env", page_size=3, order_by=order_by, is_asc=is_asc))
+
+    assert [len(page) for page in pages] == [3, 1]
+    ids = [exe_id for page in pages for exe_id in page["id"]]
+    assert ids == sorted(expected["id"], reverse=not is_asc)
+    assert list(pd.concat(query.iter_executions("Test-env", "Test-env/Train"))["id"]) == [3, 4]
+
+
+def test_iter_artifacts(query):
+    """Test artifact pages and the empty iterator for unknown pipelines."""
+    df = pd.concat(query.iter_artifacts("Test-env", page_size=2))
+    expected = query.get_all_artifacts_by_context("Test-env")
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), expected)
+
+    assert list(query.iter_artifacts("Unknown")) == []
+    with pytest.raises(ValueError):
+        next(query.iter_artifacts("Test-env", order_by="name"))
@@ -0,0 +1,63 @@
+import gzip
+import os
+
+from cmflib.export_cache import ExportCache
+
+
+def _key(pipeline="Test-env", version="1", exec_uuid=None):
+    return (pipeline, exec_uuid, version, "application/x-ndjson")
+
+
+def test_export_cache_lru_and_invalidate():
+    cache = ExportCache(max_entries=2, max_bytes=100)
+    cache.put(_key(version="1"), 0, b"a" * 10)
+    cache.put(_key(version="2"), 0, b"b" * 10)
+    assert cache.get(_key(version="1")) == b"a" * 10
+    cache.put(_key("Other"), 0, b"c" * 10)
+    # The least recently used export is evicted, exports larger than max_bytes are not cached.
+    assert cache.get(_key(version="2")) is None
+    cache.put(_key(version="3"), 0, b"d" * 101)
+    assert cache.get(_key(version="3")) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    generation = cache.generation("Test-env")
+    etag = cache.etag(_key(version="1"))
+    cache.invalidate("Test-env")
+    # Invalidations change the entity tag of an unchanged version.
+    assert cache.etag(_key(version="1")) != etag
+    assert cache.get(_key(version="1")) is None
+    assert cache.get(_key("Other")) == b"c" * 10
+    # Exports computed before the invalidation are not stored.
+    cache.put(_key(version="4"), generation, b"e")
+    assert cache.get(_key(version="4")) is None
+    assert cache.etag(_key(version="4")) != cache.etag(_key(version="5"))
+    assert cache.etag(_key(version="4")) != ExportCache().etag(_key(version="4"))
+
+
+def test_export_cache_tee():
+    cache = ExportCache()
+    chunks = [gzip.compress(b"{}\n")] * 3
+    assert list(cache.tee(_key(), 0, iter(chunks))) == chunks
+    assert cache.get(_key()) == b"".join(chunks)
+
+    # Streams that were not consumed to the end are not cached.
+    stream = cache.tee(_key(version="2"), 0, iter(chunks))
+    next(stream)
+    stream.close()
+    assert cache.get(_key(version="2")) is None
+
+
+def test_export_cache_on_disk(tmp_path):
+    directory = os.path.join(tmp_path, "exports")
+    ExportCache(directory=directory).put(_key(version="1"), 0, b"blob-1")
+    cache = ExportCache(directory=directory)
+    assert len(cache) == 0
+    assert cache.get(_key(version="1")) == b"blob-1"
+    assert len(cache) == 1
+
+    # Only the newest version of an export is kept on disk.
+    cache.put(_key(version="2"), 0, b"blob-2")
+    assert ExportCache(directory=directory).get(_key(version="1")) is None
+    assert ExportCache(directory=directory).get(_key(version="2")) == b"blob-2"
+    cache.invalidate("Test-env")
+    assert ExportCache(directory=directory).get(_key(version="2")) is None
@@ -0,0 +1,39 @@
+import threading
+import time
+
+from cmflib.key_lock import KeyLock
+
+
+def test_key_lock_waits_for_overlapping_keys():
+    lock = KeyLock()
+    order = []
+
+    def claim_overlapping():
+        with lock.claim(["b", "c"]):
+            order.append("bc")
+            assert lock.claimed == {"b", "c"}
+
+    with lock.claim(["a", "b"]):
+        overlapping = threading.Thread(target=claim_overlapping)
+        overlapping.start()
+        # Disjoint keys do not wait.
+        with lock.claim(["c"]):
+            order.append("c")
+        time.sleep(0.1)
+        assert order == ["c"]
+        order.append("ab")
+    overlapping.join(5)
+    assert order == ["c", "ab", "bc"]
+    assert lock.claimed == frozenset()
+
+
+def test_key_lock_releases_on_error():
+    lock = KeyLock()
+    try:
+        with lock.claim(["a"]):
+            raise ValueError()
+    except ValueError:
+        pass
+    assert lock.claimed == frozenset()
+    with lock.claim([]):
+        assert lock.claimed == frozenset()
@@ -0,0 +1,52 @@
+import pytest
+from ml_metadata.proto import metadata_store_pb2 as mlpb
+
+from cmflib.cmfquery import CmfQuery, EXCLUDED_ARTIFACT_TYPES
+from cmflib.tests.conftest import populate_mlmd
+
+
+@pytest.fixture
+def query(mlmd_file):
+    return CmfQuery(mlmd_file)
+
+
+def test_lineage_graph_matches_store_queries(query):
+    """Test that one-hop lookups on the graph match the store based queries."""
+    graph = query.get_lineage_graph()
+    pipeline_id = query.get_pipeline_id("Test-env")
+
+    assert graph.num_edges == 7
+    for artifact in query.store.get_artifacts():
+        expected = query.get_one_hop_parent_artifacts_with_id(artifact.id)
+        expected_ids = list(expected["id"]) if not expected.empty else []
+        assert graph.get_parent_artifacts(artifact.id, EXCLUDED_ARTIFACT_TYPES) == expected_ids
+    for execution in query.store.get_executions():
+        for pid in (None, pipeline_id, pipeline_id + 100):
+            expected_ids = sorted(set(query.get_one_hop_parent_execution_ids(execution.id, pid)))
+            assert graph.get_parent_executions(execution.id, pid) == expected_ids
+
+
+def test_lineage_graph_refresh(query, mlmd_file):
+    """Test that refresh picks up a pipeline added after the graph was built."""
+    graph = query.get_lineage_graph()
+    watermark = graph.watermark
+    populate_mlmd(mlmd_file, pipeline_name="Other-env", stages=("Prepare",), executions_per_stage=2)
+
+    graph = query.get_lineage_graph()
+    other_id = query.get_pipeline_id("Other-env")
+    assert graph.watermark > watermark
+    assert graph.num_edges == 10
+    assert graph.get_parent_executions(max(graph.execution_ids), other_id) == [int(min(graph.execution_ids[-2:]))]
+    assert graph.get_artifact_type(int(graph.artifact_ids[-1])) == "Dataset"
+
+
+def test_lineage_graph_refresh_late_event(query):
+    """Test that refresh picks up an event between nodes updated within the slack window."""
+    graph = query.get_lineage_graph()
+    execution_id, artifact_id = int(graph.execution_ids[-1]), int(graph.artifact_ids[1])
+    assert artifact_id not in graph.get_parent_artifacts(int(graph.artifact_ids[-1]))
+    query.store.put_events([mlpb.Event(execution_id=execution_id, artifact_id=artifact_id, type=mlpb.Event.INPUT)])
+
+    graph = query.get_lineage_graph()
+    assert graph.num_edges == 8
+    assert artifact_id in graph.get_parent_artifacts(int(graph.artifact_ids[-1]))
@@ -0,0 +1,64 @@
+import sqlite3
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from cmflib.cmfquery import CmfQuery
+from cmflib.store.sql_reader import SqlReader
+
+
+@pytest.fixture
+def queries(mlmd_file):
+    return CmfQuery(mlmd_file), CmfQuery(mlmd_file, read_backend="sql")
+
+
+@pytest.mark.parametrize("method", ["get_all_executions_in_pipeline", "get_all_artifacts_by_context"])
+def test_sql_backend_matches_mlmd_backend(queries, method):
+    """Test that the SQL backend returns the same table as the ml-metadata backend."""
+    mlmd_query, sql_query = queries
+    expected = getattr(mlmd_query, method)("Test-env")
+    actual = getattr(sql_query, method)("Test-env")
+
+    assert not expected.empty
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("method", ["get_all_executions_in_pipeline", "get_all_artifacts_by_context"])
+def test_sql_backend_unknown_pipeline(queries, method):
+    """Test that both backends return an empty data frame for an unknown pipeline."""
+    for query in queries:
+        assert getattr(query, method)("Unknown").empty
+
+
+def test_sql_reader_arrow_result(queries):
+    """Test that the reader can return a pyarrow table."""
+    _, sql_query = queries
+    table = sql_query.sql_reader.get_all_artifacts_by_context("Test-env", result_format="arrow")
+
+    assert isinstance(table, pa.Table)
+    assert table.num_rows == 4
+    assert table.column("type").to_pylist() == ["Dataset"] * 4
+
+
+def test_unsupported_read_backend(mlmd_file):
+    with pytest.raises(ValueError):
+        CmfQuery(mlmd_file, read_backend="unknown")
+
+
+def test_sql_reader_reconnects(mlmd_file):
+    """Test that a statement failing on a broken connection is run again on a new connection."""
+    connection = sqlite3.connect(mlmd_file, check_same_thread=False)
+    reader = SqlReader(
+        connection, connect=lambda: sqlite3.connect(mlmd_file), reconnect_errors=(sqlite3.ProgrammingError,)
+    )
+    pipeline_id = reader.get_pipeline_id("Test-env")
+    connection.close()
+
+    assert reader.get_pipeline_id("Test-env") == pipeline_id
+    assert reader.connection is not connection
+
+    reader = SqlReader(sqlite3.connect(mlmd_file))
+    reader.connection.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        reader.get_pipeline_id("Test-env")
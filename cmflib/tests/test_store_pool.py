@@ -0,0 +1,69 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from cmflib.cmfquery import CmfQuery
+from cmflib.store.sqllite_store import SqlliteStore
+from cmflib.store.store_pool import StorePool
+
+
+def test_pooled_query_threads(mlmd_file):
+    """Test that threads get their own connections and concurrent reads return the same results."""
+    query = CmfQuery(mlmd_file, pool_size=4)
+    expected = CmfQuery(mlmd_file).get_all_artifacts_by_context("Test-env")
+
+    def read(_):
+        return query.get_all_artifacts_by_context("Test-env"), id(query.store_pool.get())
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(read, range(16)))
+    for df, _ in results:
+        pd.testing.assert_frame_equal(df, expected)
+    assert 1 < len({store_id for _, store_id in results}) <= 4
+    assert query.store_pool.size <= 4
+
+
+def test_store_pool_reuses_connections_of_finished_threads(mlmd_file):
+    pool = StorePool(SqlliteStore({"filename": mlmd_file}).connect, max_size=1, timeout=5)
+    stores = []
+    for _ in range(3):
+        thread = threading.Thread(target=lambda: stores.append(pool.get()))
+        thread.start()
+        thread.join()
+    assert len({id(store) for store in stores}) == 1
+    assert pool.size == 1
+
+
+def test_store_pool_exhausted(mlmd_file):
+    pool = StorePool(SqlliteStore({"filename": mlmd_file}).connect, max_size=1, timeout=0.1)
+    pool.get()
+    errors = []
+
+    def acquire():
+        try:
+            pool.get()
+        except RuntimeError as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=acquire)
+    thread.start()
+    thread.join()
+    assert len(errors) == 1
+
+    pool.release()
+    thread = threading.Thread(target=acquire)
+    thread.start()
+    thread.join()
+    assert len(errors) == 1
+
+
+def test_store_pool_health_check_reconnects(mlmd_file):
+    connect = SqlliteStore({"filename": mlmd_file}).connect
+    pool = StorePool(connect, max_size=1, health_check_interval=0)
+    store = pool.get()
+    store.get_context_types = None  # any failing call counts as a broken connection
+    assert pool.get() is not store
+    with pytest.raises(ValueError):
+        StorePool(connect, max_size=0)
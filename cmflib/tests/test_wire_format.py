@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from cmflib.server_interface import wire_format
+from cmflib.server_interface.server_interface import push_encoding
+
+
+class _Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def test_choose_encoding():
+    assert wire_format.choose_encoding(None) is None
+    assert wire_format.choose_encoding("identity") is None
+    assert wire_format.choose_encoding("gzip, deflate") == "gzip"
+    assert wire_format.choose_encoding("GZIP;q=0.5") == "gzip"
+    assert wire_format.choose_encoding("gzip;q=0, br") is None
+    assert wire_format.choose_encoding("*") == wire_format.CONTENT_ENCODINGS[0]
+    assert wire_format.choose_encoding("*, gzip;q=0") == ("zstd" if wire_format.zstandard is not None else None)
+
+
+@pytest.mark.parametrize("encoding", wire_format.CONTENT_ENCODINGS)
+def test_encode_body_round_trip(encoding):
+    payload = json.dumps({"Pipeline": [{"name": "Test-env", "stages": [{"name": "Test-env/Prepare"}] * 100}]})
+    body, headers = wire_format.encode_body(payload, encoding)
+    assert headers == {"Content-Type": wire_format.MLMD_CONTENT_TYPE, "Content-Encoding": encoding}
+    assert len(body) < len(payload) / 10
+    assert wire_format.decompress(body, encoding).decode("utf-8") == payload
+
+
+@pytest.mark.parametrize("encoding", [None] + wire_format.CONTENT_ENCODINGS)
+def test_compress_stream(encoding):
+    lines = [json.dumps({"execution": {"id": i}}) + "\n" for i in range(1000)]
+    data = b"".join(wire_format.compress_stream(iter(lines), encoding))
+    assert wire_format.decompress(data, encoding).decode("utf-8") == "".join(lines)
+
+
+def test_encode_body_small_or_identity():
+    payload = json.dumps({"Pipeline": []})
+    assert wire_format.encode_body(payload, "gzip") == (payload.encode(), {"Content-Type": wire_format.MLMD_CONTENT_TYPE})
+    large = json.dumps({"Pipeline": [{"name": "x" * 2 * wire_format.MIN_COMPRESS_SIZE}]})
+    assert wire_format.encode_body(large, "identity")[0] == large.encode()
+    with pytest.raises(ValueError):
+        wire_format.decompress(b"", "br")
+
+
+def test_push_encoding():
+    # Servers that do not advertise content codings only accept the wrapped json payload.
+    assert push_encoding(_Response({})) is None
+    assert push_encoding(_Response({"Accept-Encoding": "gzip"})) == "gzip"
+    assert push_encoding(_Response({"Accept-Encoding": "br"})) == "identity"
+
+
+@pytest.mark.parametrize("encoding", [None] + wire_format.CONTENT_ENCODINGS)
+def test_decompressor_chunks(encoding):
+    data = json.dumps([{"execution": {"id": i}} for i in range(10000)]).encode("utf-8")
+    body = wire_format.compress(data, encoding) if encoding else data
+    decompressor = wire_format.Decompressor(encoding, max_size=len(data))
+    for start in range(0, len(body), 1000):
+        decompressor.write(body[start:start + 1000])
+    assert decompressor.finish() == data
+
+
+@pytest.mark.parametrize("encoding", [None] + wire_format.CONTENT_ENCODINGS)
+def test_decompress_max_size(encoding):
+    # Zeros compress about a thousand to one, the limit is hit long before the body is decompressed.
+    data = bytes(64 * 1024 * 1024)
+    body = wire_format.compress(data, encoding) if encoding else data
+    with pytest.raises(wire_format.BodyTooLargeError):
+        wire_format.decompress(body, encoding, max_size=1024 * 1024)
+    assert wire_format.decompress(body, encoding, max_size=len(data)) == data
+
+
+def test_decompress_invalid_gzip():
+    body = wire_format.compress(b"x" * 10000, "gzip")
+    with pytest.raises(EOFError):
+        wire_format.decompress(body[:-20], "gzip")
+    with pytest.raises(OSError):
+        wire_format.decompress(b"not gzip data", "gzip")
+    # Concatenated gzip members are one body, like with gzip.decompress.
+    assert wire_format.decompress(body + body, "gzip") == b"x" * 20000
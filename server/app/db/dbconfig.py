@@ -1,5 +1,6 @@
 import os
 from dotenv import load_dotenv
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import NullPool  # For connection pooling (optional)
 from server.app.db.dbmodels import metadata
@@ -48,3 +49,6 @@ async def get_db():
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(metadata.create_all)
+        # create_all does not add columns to existing tables
+        for column in ("sync_cursor_time", "sync_cursor_id"):
+            await conn.execute(text(f"ALTER TABLE registered_servers ADD COLUMN IF NOT EXISTS {column} BIGINT"))
@@ -195,6 +195,9 @@ registered_servers = Table(
     Column("server_name", String(255), nullable=False),
     Column("host_info", String(255), unique=True, nullable=False), 
     Column("last_sync_time", BigInteger, nullable=True, default=None),
+    # (last update time, execution id) of the last execution of the peer applied by /sync, see CmfQuery.get_json_page
+    Column("sync_cursor_time", BigInteger, nullable=True, default=None),
+    Column("sync_cursor_id", BigInteger, nullable=True, default=None),
 
     # Constraints
     UniqueConstraint("server_name", name="uq_registered_servers_server_name"),
@@ -246,4 +249,20 @@ sync_logs = Table(
     Index("idx_sync_logs_schedule_id", "schedule_id"),
     Index("idx_sync_logs_run_time_utc", "run_time_utc"),
     Index("idx_sync_logs_sync_type", "sync_type")
-)
\ No newline at end of file
+)
+
+# Acknowledged chunks of chunked metadata pushes, a retried push resumes after them
+push_chunks = Table(
+    "push_chunks", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True, nullable=False),
+    Column("push_id", String(64), nullable=False),
+    Column("chunk_index", Integer, nullable=False),
+    Column("chunk_key", String(64), nullable=False),  # sha256 of the chunk payload, the idempotency key
+    Column("pipeline_name", String(255), nullable=False),
+    Column("status", String(64), nullable=False),  # update_mlmd status: success, exists
+    Column("acked_at", BigInteger, nullable=False),
+
+    UniqueConstraint("push_id", "chunk_index", name="uq_push_chunks_push_id_chunk_index"),
+    Index("idx_push_chunks_push_id", "push_id"),
+    Index("idx_push_chunks_acked_at", "acked_at")
+)
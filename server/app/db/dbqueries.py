@@ -1,7 +1,8 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
 from server.app.db.dbconfig import get_db
-from sqlalchemy import select, func, text, String, Double, bindparam, case, distinct, insert, update
+from sqlalchemy import select, func, text, String, Double, bindparam, case, distinct, insert, update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from server.app.db.dbmodels import (
     artifact, 
     artifactproperty, 
@@ -15,7 +16,8 @@ from server.app.db.dbmodels import (
     event,
     registered_servers,
     scheduled_syncs,
-    sync_logs
+    sync_logs,
+    push_chunks
 )
 
 
@@ -74,7 +76,9 @@ async def get_sync_status(db: AsyncSession, server_name: str, server_url: str):
     """
     Get the sync status from the database.
     """
-    query = select(registered_servers.c.last_sync_time).where(
+    query = select(
+        registered_servers.c.last_sync_time, registered_servers.c.sync_cursor_time, registered_servers.c.sync_cursor_id
+    ).where(
         (registered_servers.c.server_name == server_name) & 
         (registered_servers.c.host_info == server_url)
     )
@@ -92,6 +96,16 @@ async def update_sync_status(db: AsyncSession, current_utc_time: int, server_nam
     await db.commit()  # Commit the transaction
 
 
+async def update_sync_cursor(db: AsyncSession, cursor_time: int, cursor_id: int, server_name: str, server_url: str):
+    """Advance the sync cursor of a server identified by name and URL after a page of its metadata was merged."""
+    query = update(registered_servers).where(
+        (registered_servers.c.server_name == server_name) & 
+        (registered_servers.c.host_info == server_url)
+    ).values(sync_cursor_time=cursor_time, sync_cursor_id=cursor_id)
+    await db.execute(query)
+    await db.commit()
+
+
 # Deprecated legacy query (unused by current stage-based UI/API flow).
 # Kept for reference to support possible rollback to /artifacts/{pipeline_name}/{artifact_type}.
 # async def fetch_artifacts(
@@ -886,6 +900,13 @@ async def list_schedules(db: AsyncSession, server_id: int | None = None):
     return result.mappings().all()
 
 
+async def get_schedule(db: AsyncSession, schedule_id: int):
+    """Return one schedule row by id, or None."""
+    query = select(scheduled_syncs).where(scheduled_syncs.c.id == schedule_id)
+    result = await db.execute(query)
+    return result.mappings().first()
+
+
 async def due_schedules(db: AsyncSession, now_utc_ms: int):
     """Return active schedules whose next run time is at or before now."""
     query = select(scheduled_syncs).where(
@@ -990,10 +1011,45 @@ async def delete_schedule(db: AsyncSession, schedule_id: int):
 
 async def get_sync_status(db: AsyncSession, server_name: str, server_url: str):
     """Return last sync timestamp checkpoint for a server."""
-    query = select(registered_servers.c.last_sync_time).where(
+    query = select(
+        registered_servers.c.last_sync_time, registered_servers.c.sync_cursor_time, registered_servers.c.sync_cursor_id
+    ).where(
         (registered_servers.c.server_name == server_name) & 
         (registered_servers.c.host_info == server_url)
     )
     result = await db.execute(query)
     return result.mappings().all()
 
+
+# -------- Chunked Metadata Push Queries --------
+
+async def get_push_chunks(db: AsyncSession, push_id: str):
+    """Return acknowledged chunks of a push ordered by chunk index."""
+    query = select(
+        push_chunks.c.chunk_index, push_chunks.c.chunk_key, push_chunks.c.status
+    ).where(push_chunks.c.push_id == push_id).order_by(push_chunks.c.chunk_index)
+    result = await db.execute(query)
+    return result.mappings().all()
+
+
+async def ack_push_chunk(
+    db: AsyncSession, push_id: str, chunk_index: int, chunk_key: str, pipeline_name: str, status: str, acked_at: int
+):
+    """Record a merged chunk, a chunk acknowledged concurrently by a retry is kept as is."""
+    query = pg_insert(push_chunks).values(
+        push_id=push_id,
+        chunk_index=chunk_index,
+        chunk_key=chunk_key,
+        pipeline_name=pipeline_name,
+        status=status,
+        acked_at=acked_at,
+    ).on_conflict_do_nothing(constraint="uq_push_chunks_push_id_chunk_index")
+    await db.execute(query)
+    await db.commit()
+
+
+async def delete_push_chunks_before(db: AsyncSession, acked_before: int):
+    """Delete acknowledgements older than the given timestamp."""
+    query = delete(push_chunks).where(push_chunks.c.acked_at < acked_before)
+    await db.execute(query)
+    await db.commit()
@@ -1,5 +1,8 @@
-import io
 import os
+import json
+import hashlib
+import tempfile
+import time
 import zipfile
 import httpx
 import pandas as pd
@@ -7,17 +10,33 @@ import typing as t
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from fastapi import HTTPException
-from jsonpath_ng.ext import parse
 from cmflib.cmfquery import CmfQuery
+from cmflib.cmf_federation import iter_ndjson_pipelines, merge_pipeline
+from cmflib.store.store_pool import StorePool
+from cmflib.server_interface.wire_format import NDJSON_CONTENT_TYPE
 from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
+from server.app.utils import file_sha256
 from server.app.db.dbqueries import (
     create_schedule,
     update_schedule_fields,
     log_sync_run,
     get_registered_server_by_name_url,
+    update_sync_cursor,
 )
 
+# Executions per page of a paged sync with a registered server, see server_mlmd_pull_pages
+SYNC_PAGE_SIZE = 500
+# Milliseconds before the stored cursor that a paged sync pulls again, executions committed late can be behind it
+SYNC_SLACK_MS = 10000
+
+
+def check_sync_deadline(deadline: t.Optional[float]) -> None:
+    """Stop a sync between two merges once `deadline` (time.monotonic() seconds) has passed."""
+    if deadline is not None and time.monotonic() > deadline:
+        raise HTTPException(status_code=504, detail="Sync did not finish before its deadline.")
+
+
 #Converts sync functions to async
 async def async_api(function_to_async, query: CmfQuery, *argv):
     return await run_in_threadpool(function_to_async, query, *argv)
@@ -236,86 +255,273 @@ def executions_list(query: CmfQuery, pipeline_name, dict_of_exe_ids):
     return list_of_exec_uuid
 
 
-async def server_mlmd_pull(server_url, last_sync_time):
+def server_mlmd_pull(
+    query: CmfQuery,
+    server_url: str,
+    last_sync_time: t.Optional[int],
+    workers: int = 1,
+    deadline: t.Optional[float] = None,
+    store_pool: t.Optional[StorePool] = None,
+    updated_artifacts: t.Optional[t.Set[int]] = None,
+):
     """
-    Fetch mlmd data from a specified server.
+    Pull mlmd data from a specified server and merge it into the store of this server.
+
+    Servers that support it stream the data as newline delimited records, which are merged in batches while they
+    arrive, so memory use does not depend on the amount of data. Other servers send one JSON document.
 
     Args:
+        query (CmfQuery): The CmfQuery object of this server.
         server_url (str): The full URL of the target server.
         last_sync_time (int): The last sync time in milliseconds since epoch.
+        workers (int): Number of threads merging stages that share no artifacts.
+        deadline (float): time.monotonic() after which no further batch is merged, None for no limit.
+        store_pool (StorePool): Connections of the merge threads, see `parse_json_to_mlmd`.
+        updated_artifacts (set): Collects ids of existing artifacts the merges updated, see `parse_json_to_mlmd`.
 
     Returns:
-        dict: The mlmd data fetched from the specified server.
+        tuple: The merge status ("success", "exists", "version_update", "merge_failed" or None if there was nothing to
+        sync), the names of the pulled pipelines and the names of the Environment files used by the pulled executions.
 
     Raises:
-        HTTPException: If the server is not reachable or an error occurs during the request.
+        HTTPException: If the server is not reachable, an error occurs during the request or the deadline passed.
     """
+    statuses = set()
+    pipeline_names: t.List[str] = []
+    environment_names: t.Set[str] = set()
     try:
-        # Step 1: Send a request to the target server to fetch mlmd data
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            try:
-                response = await client.post(f"{server_url}/api/mlmd_pull", json={'last_sync_time': last_sync_time})
-
+        with httpx.Client(timeout=300.0) as client:
+            headers = {"Accept": f"{NDJSON_CONTENT_TYPE}, application/json;q=0.9, */*;q=0.8"}
+            with client.stream(
+                "POST", f"{server_url}/api/mlmd_pull", json={'last_sync_time': last_sync_time}, headers=headers
+            ) as response:
                 if response.status_code != 200:
                     raise HTTPException(status_code=500, detail="Target server did not respond successfully")
+                if response.headers.get("content-type", "").startswith(NDJSON_CONTENT_TYPE):
+                    pipelines = iter_ndjson_pipelines(response.iter_lines())
+                else:
+                    pipelines = json.loads(response.read()).get("Pipeline", [])
+                for pipeline in pipelines:
+                    check_sync_deadline(deadline)
+                    if pipeline.get("name") not in pipeline_names:
+                        pipeline_names.append(pipeline.get("name"))
+                    environment_names |= environment_file_names(pipeline)
+                    # merging a batch filters out executions that already exist
+                    status = merge_pipeline(
+                        query, pipeline, pipeline.get("name"), "push", None, workers, store_pool, updated_artifacts
+                    )
+                    if status in ("version_update", "merge_failed"):
+                        return status, pipeline_names, environment_names
+                    statuses.add(status)
+    except httpx.RequestError:
+        raise HTTPException(status_code=500, detail="Target server is not reachable")
+    if not pipeline_names:
+        return None, pipeline_names, environment_names
+    return ("success" if "success" in statuses else "exists"), pipeline_names, environment_names
+
+
+async def server_mlmd_pull_pages(
+    query: CmfQuery,
+    db: AsyncSession,
+    server_name: str,
+    server_url: str,
+    cursor: t.Optional[t.Tuple[int, int]],
+    workers: int = 1,
+    page_size: int = SYNC_PAGE_SIZE,
+    deadline: t.Optional[float] = None,
+    store_pool: t.Optional[StorePool] = None,
+    updated_artifacts: t.Optional[t.Set[int]] = None,
+):
+    """
+    Pull the executions changed on a specified server page by page and merge them into the store of this server.
 
-                json_payload = response.json()
-                python_env_store_path = "/cmf-server/data/env"
+    Pages are requested from /mlmd_pull/page after a (last update time, execution id) cursor (see
+    `CmfQuery.get_json_page`). Once the executions of a page were merged, the Environment files they use are downloaded
+    and the cursor of the server in registered_servers is advanced to the last execution of the page. An interrupted
+    sync resumes with the first page that was not applied completely, merging skips executions that already exist.
+    Every sync starts `SYNC_SLACK_MS` before the cursor, so that executions committed on the target server after a
+    newer execution was pulled are not skipped. Only one page is held in memory at a time.
 
-                if last_sync_time:
-                    # Extract the Environment file names from the JSON payload
-                    data = json_payload
-                    jsonpath_expr = parse('$..events[?(@.artifact.type == "Environment")].artifact.name')
-                    environment_names = {match.value.split(":")[0].split("/")[-1] for match in jsonpath_expr.find(data)}
+    Args:
+        query (CmfQuery): The CmfQuery object of this server.
+        db (AsyncSession): The database session used to store the cursor.
+        server_name (str): The name of the target server.
+        server_url (str): The full URL of the target server.
+        cursor (tuple): The cursor of the last merged execution, None to pull all executions.
+        workers (int): Number of threads merging stages that share no artifacts.
+        page_size (int): Maximum number of executions per page.
+        deadline (float): time.monotonic() after which no further page is pulled, None for no limit. Pages merged
+            before the deadline are kept, the next sync continues after them.
+        store_pool (StorePool): Connections of the merge threads, see `parse_json_to_mlmd`.
+        updated_artifacts (set): Collects ids of existing artifacts the merges updated, see `parse_json_to_mlmd`.
 
-                    # Check if the list is empty or not
-                    if len(environment_names) == 0: 
-                        print("No Environment files are found inside json payload.")
-                        return json_payload
+    Returns:
+        tuple: The merge status ("success", "version_update", "merge_failed" or None if nothing was merged) and the names of the
+        pipelines that executions were merged into, None if the target server does not support paged pulls.
 
-                    list_of_files = list(environment_names)
-                    python_env_zip = await client.get(f"{server_url}/api/download-python-env", params=list_of_files)
-                else:
-                    python_env_zip = await client.get(f"{server_url}/api/download-python-env", params=None)
-
-                if python_env_zip.status_code == 200:
-                    try:
-                        # Create the directory if it doesn't exist
-                        os.makedirs(python_env_store_path, exist_ok=True)
-
-                        # Unzip the zip file content
-                        with zipfile.ZipFile(io.BytesIO(python_env_zip.content)) as zf:
-                            # Extract all files to a temporary directory
-                            temp_dir = os.path.join(python_env_store_path, "temp_extracted")
-                            os.makedirs(temp_dir, exist_ok=True)
-                            zf.extractall(temp_dir)
-
-                            # Move all extracted files to the target directory
-                            for root, dirs, files in os.walk(temp_dir):
-                                for file in files:
-                                    src_file = os.path.join(root, file)
-                                    dest_file = os.path.join(python_env_store_path, file)
-                                    try:
-                                        os.rename(src_file, dest_file)
-                                        print(f"Moved {src_file} to {dest_file}")
-                                    except Exception as e:
-                                        print(f"Failed to move {src_file} to {dest_file}: {e}")
-
-                            # Clean up the temporary directory
-                            os.rmdir(temp_dir)
-                        # print("Storing at:", os.path.abspath(python_env_store_path))
-                        # print("Files in target directory:", os.listdir(python_env_store_path))
-                        print("All files stored successfully.")
-                    except Exception as e:
-                        print(f"Error during file extraction or storage: {e}")
-                else:
-                    print(f"Failed to download ZIP file. Status code: {python_env_zip.status_code}")
+    Raises:
+        HTTPException: If the server is not reachable, an error occurs during the request or the deadline passed.
+    """
+    pipeline_names: t.List[str] = []
+    first_page = True
+    if cursor is not None:
+        # executions pulled again are filtered out by the merge
+        cursor = (max(cursor[0] - SYNC_SLACK_MS, 0), 0)
+    async with httpx.AsyncClient(timeout=300.0) as client:
+        while True:
+            check_sync_deadline(deadline)
+            request = {"limit": page_size}
+            if cursor is not None:
+                request.update(after_time=cursor[0], after_id=cursor[1])
+            try:
+                response = await client.post(f"{server_url}/api/mlmd_pull/page", json=request)
             except httpx.RequestError:
                 raise HTTPException(status_code=500, detail="Target server is not reachable")
-        return json_payload
+            if first_page and response.status_code in (404, 405):
+                return None
+            if response.status_code != 200:
+                raise HTTPException(status_code=500, detail="Target server did not respond successfully")
+            first_page = False
+            page = response.json()
+            environment_names: t.Set[str] = set()
+            for pipeline in page["Pipeline"]:
+                environment_names |= environment_file_names(pipeline)
+                # merging a page filters out executions that already exist
+                status = await async_api(
+                    merge_pipeline, query, pipeline, pipeline["name"], "push", None, workers, store_pool,
+                    updated_artifacts,
+                )
+                if status in ("version_update", "merge_failed"):
+                    # the cursor stays before the page, the next sync pulls it again
+                    return status, pipeline_names
+                if status == "success" and pipeline["name"] not in pipeline_names:
+                    pipeline_names.append(pipeline["name"])
+            if environment_names:
+                await server_python_env_pull(server_url, environment_names)
+            # the cursor is advanced only after the page was applied
+            if page["next"] is not None:
+                cursor = (page["next"]["time"], page["next"]["id"])
+                await update_sync_cursor(db, cursor[0], cursor[1], server_name, server_url)
+            if not page["more"]:
+                break
+    # executions pulled again within the slack window do not count as changes
+    if not pipeline_names:
+        return None, pipeline_names
+    return "success", pipeline_names
+
+
+def environment_file_names(pipeline: dict) -> t.Set[str]:
+    """Return the names of the Environment files used by the executions of a pipeline of the MLMD payload."""
+    return {
+        event["artifact"]["name"].split(":")[0].split("/")[-1]
+        for stage in pipeline.get("stages", [])
+        for execution in stage.get("executions", [])
+        for event in execution.get("events", [])
+        if event["artifact"]["type"] == "Environment"
+    }
+
+
+async def server_python_env_pull(server_url, environment_names: t.Optional[t.Set[str]] = None):
+    """
+    Download Environment files from a specified server into this server.
+
+    Files are content addressed: the target server sends the sha256 hashes of its files and only files that do not
+    exist here with the same content are downloaded, as a streamed ZIP file written to a temporary file. Servers that
+    do not send hashes are asked for the files by name, files named by their md5 hash that exist here are skipped.
+
+    Args:
+        server_url (str): The full URL of the target server.
+        environment_names (set): Names of the files to download, None to download all files.
+    """
+    python_env_store_path = "/cmf-server/data/env"
+    if environment_names is not None and len(environment_names) == 0:
+        print("No Environment files are found inside json payload.")
+        return
+    file_names = sorted(environment_names) if environment_names is not None else None
+    async with httpx.AsyncClient(timeout=300.0) as client:
+        try:
+            response = await client.post(f"{server_url}/api/python-env/manifest", json={"file_names": file_names})
+            if response.status_code == 200:
+                expected = {
+                    name: digest
+                    for name, digest in response.json()["files"].items()
+                    if await run_in_threadpool(file_sha256, os.path.join(python_env_store_path, name)) != digest
+                }
+                if not expected:
+                    print("Environment files are up to date.")
+                    return
+                request = client.build_request(
+                    "POST", f"{server_url}/api/download-python-env", json={"sha256": sorted(set(expected.values()))}
+                )
+            else:
+                expected = None
+                if file_names is not None:
+                    file_names = [
+                        name for name in file_names if not os.path.exists(os.path.join(python_env_store_path, name))
+                    ]
+                    if not file_names:
+                        print("Environment files are up to date.")
+                        return
+                request = client.build_request(
+                    "GET", f"{server_url}/api/download-python-env",
+                    params={"list_of_files": file_names} if file_names else None,
+                )
+            response = await client.send(request, stream=True)
+            try:
+                if response.status_code != 200 or response.headers.get("content-type") != "application/zip":
+                    print(f"Failed to download ZIP file. Status code: {response.status_code}")
+                    return
+                with tempfile.TemporaryFile() as zip_file:
+                    async for chunk in response.aiter_bytes():
+                        zip_file.write(chunk)
+                    await run_in_threadpool(store_python_env_files, zip_file, python_env_store_path, expected)
+            finally:
+                await response.aclose()
+        except httpx.RequestError:
+            print("Failed to download ZIP file. Target server is not reachable.")
+
+
+def store_python_env_files(zip_file, python_env_store_path: str, expected: t.Optional[t.Dict[str, str]] = None):
+    """
+    Store the Environment files of a downloaded ZIP file.
 
+    Every file is written to a temporary file next to its destination and renamed once it is complete, so an
+    interrupted sync never leaves partial files behind.
+
+    Args:
+        zip_file: Seekable file object with the ZIP file.
+        python_env_store_path (str): The directory of the Environment files.
+        expected (dict): sha256 hash of every file name, files with another content are skipped. None to store all
+            files.
+    """
+    try:
+        os.makedirs(python_env_store_path, exist_ok=True)
+        with zipfile.ZipFile(zip_file) as zf:
+            for member in zf.infolist():
+                name = os.path.basename(member.filename)
+                if member.is_dir() or not name:
+                    continue
+                dest_file = os.path.join(python_env_store_path, name)
+                fd, tmp_file = tempfile.mkstemp(dir=python_env_store_path, suffix=".tmp")
+                digest = hashlib.sha256()
+                try:
+                    with os.fdopen(fd, "wb") as dst, zf.open(member) as src:
+                        for block in iter(lambda: src.read(1024 * 1024), b""):
+                            digest.update(block)
+                            dst.write(block)
+                    if expected is not None and expected.get(name) != digest.hexdigest():
+                        print(f"Skipped {name}, its content does not match the hash sent by the target server.")
+                        os.remove(tmp_file)
+                        continue
+                    os.replace(tmp_file, dest_file)
+                    print(f"Stored {dest_file}")
+                except Exception as e:
+                    print(f"Failed to store {dest_file}: {e}")
+                    if os.path.exists(tmp_file):
+                        os.remove(tmp_file)
+        print("All files stored successfully.")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch mlmd data: {e}")
+        print(f"Error during file extraction or storage: {e}")
 
 
 async def log_sync_attempt(
@@ -1,19 +1,29 @@
 # cmf-server api's
-import io
+import gzip
 import time
-import zipfile
-from fastapi import FastAPI, Request, HTTPException, Query, UploadFile, File, Depends
+from fastapi import FastAPI, Request, Response, HTTPException, Query, UploadFile, File, Depends
+from fastapi.exceptions import RequestValidationError
 from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from contextlib import asynccontextmanager
 import pandas as pd
 from typing import List, Dict, Any, Optional
 from cmflib.cmfquery import CmfQuery
+from cmflib.store.postgres import PostgresStore
+from cmflib.store.store_pool import StorePool
+from cmflib.utils.helper_functions import get_postgres_config
 import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
-from collections import defaultdict
-from server.app.utils import extract_hostname, get_fqdn
+from server.app.utils import (
+    extract_hostname,
+    get_fqdn,
+    check_readable,
+    env_files_with_sha256,
+    env_manifest,
+    iter_zip,
+)
 from server.app.get_data import (
     get_mlmd_from_server,
     get_artifact_types,
@@ -23,10 +33,13 @@ from server.app.get_data import (
     get_model_data,
     executions_list,
     server_mlmd_pull,
+    server_mlmd_pull_pages,
+    server_python_env_pull,
     log_sync_attempt,
     compute_next_run_from_recurrence,
     compute_initial_next_run_utc,
 )
+from server.app.schedule_timer import ScheduleTimer
 from server.app.query_execution_lineage_d3tree import query_execution_lineage_d3tree
 from server.app.query_artifact_lineage_d3tree import query_artifact_lineage_d3tree
 from server.app.query_visualization_artifact_execution import query_visualization_artifact_execution
@@ -42,7 +55,7 @@ from server.app.db.dbqueries import (
     update_sync_status,
     create_schedule,
     list_schedules,
-    due_schedules,
+    get_schedule,
     update_next_run,
     log_sync_run,
     list_sync_logs,
@@ -50,6 +63,9 @@ from server.app.db.dbqueries import (
     get_registered_server_by_id,
     update_schedule_fields,
     delete_schedule,
+    get_push_chunks,
+    ack_push_chunk,
+    delete_push_chunks_before,
 )
 from pathlib import Path
 import os
@@ -57,9 +73,14 @@ import json
 import typing as t
 from server.app.schemas.dataframe import (
     MLMDPushRequest,
+    MLMDPushChunkRequest,
+    MLMDPushMissingRequest,
     ServerRegistrationRequest, 
     AcknowledgeRequest,
     MLMDPullRequest,
+    MLMDPullPageRequest,
+    PythonEnvManifestRequest,
+    PythonEnvDownloadRequest,
     ScheduleCreateRequest,
     ArtifactByStageRequest,
     ExecutionByStageRequest,
@@ -69,19 +90,64 @@ import socket
 import dotenv
 from jsonpath_ng.ext import parse
 from cmflib.cmf_federation import update_mlmd
+from cmflib.export_cache import ExportCache
+from cmflib.server_interface.server_interface import chunk_key
+from cmflib.server_interface.wire_format import (
+    MLMD_CONTENT_TYPE,
+    NDJSON_CONTENT_TYPE,
+    CONTENT_ENCODINGS,
+    MIN_COMPRESS_SIZE,
+    compress,
+    compress_stream,
+    choose_encoding,
+    Decompressor,
+    BodyTooLargeError,
+)
+from pydantic import ValidationError
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
 dotenv.load_dotenv()
 
 # server_store_path = "/cmf-server/data/postgres_data"
-query = CmfQuery(is_server=True)
+# run_in_threadpool runs up to 40 requests at once (anyio default), each thread gets its own MLMD connection
+query = CmfQuery(is_server=True, pool_size=int(os.getenv("CMF_STORE_POOL_SIZE", "40")))
+# pipeline/stage listings are served from memory until the MLMD tables change
+query.enable_cache()
+# threads merging independent stages of one push, pushes of different executions are merged concurrently
+MERGE_WORKERS = int(os.getenv("CMF_MERGE_WORKERS", "4"))
+# MLMD connections shared by the threads of all concurrent merges, threads wait for a free connection when all are used
+merge_pool = StorePool(
+    PostgresStore(get_postgres_config()).connect, max_size=int(os.getenv("CMF_MERGE_POOL_SIZE", "8")), timeout=600.0
+)
+# metadata push bodies larger than this after decompression are rejected with 413
+MAX_PUSH_BODY_SIZE = int(os.getenv("CMF_MAX_PUSH_BODY_MB", "1024")) * 1024 * 1024
+# acknowledgements of chunked pushes are kept this long so that interrupted pushes can resume
+PUSH_ACK_TTL_MS = 7 * 24 * 60 * 60 * 1000
+# scheduled syncs running at once, syncs of one server run one after another
+SCHEDULE_WORKERS = int(os.getenv("CMF_SCHEDULE_WORKERS", "4"))
+# scheduled syncs still running after this time (seconds) stop before their next page or batch and are logged as failed
+SCHEDULED_SYNC_TIMEOUT = float(os.getenv("CMF_SCHEDULED_SYNC_TIMEOUT", "3600"))
+# active schedules are loaded from the database again after this time (seconds)
+SCHEDULE_RECOVERY_INTERVAL = float(os.getenv("CMF_SCHEDULE_RECOVERY_INTERVAL", "600"))
+# schedules whose run could not be recorded are retried after this time (seconds)
+SCHEDULE_RETRY_DELAY = 30
+schedule_timer = ScheduleTimer()
+schedule_slots = asyncio.Semaphore(SCHEDULE_WORKERS)
+# locks of the servers with running or waiting schedules and the number of those schedules, the lock of a server
+# is dropped once none of its schedules needs it (e.g., the server was deleted)
+schedule_server_locks: t.Dict[int, t.List[t.Any]] = {}
+# running schedule tasks by schedule id
+schedule_tasks: t.Dict[int, asyncio.Task] = {}
+# gzip-compressed pipeline exports of /mlmd_pull, invalidated by merges, optionally kept on disk
+export_cache = ExportCache(
+    max_bytes=int(os.getenv("CMF_EXPORT_CACHE_SIZE_MB", "256")) * 1024 * 1024,
+    directory=os.getenv("CMF_EXPORT_CACHE_DIR") or None,
+)
 
 #global variables
 dict_of_art_ids = {}
 dict_of_exe_ids = {}
-pipeline_locks = {}
-lock_counts: defaultdict[str, int] = defaultdict(int)
 #lifespan used to prevent multiple loading and save time for visualization.
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -109,6 +175,8 @@ async def lifespan(app: FastAPI):
     task = getattr(app.state, "scheduler_task", None)
     if task:
         task.cancel()
+    for task in list(schedule_tasks.values()):
+        task.cancel()
     dict_of_art_ids.clear()
     dict_of_exe_ids.clear()
 
@@ -141,124 +209,202 @@ print("Local addresses= ", LOCAL_ADDRESSES)
 async def schedule_runner():
     """Input: none
     Output: none (runs continuously)
-    Description: Background loop that executes due schedules using 3-stage server validation.
-    Step 1: Query all due schedules using current UTC epoch milliseconds.
-    Step 2: Check if server record exists in DB (registration check).
-            - If NOT registered: permanent config issue -> deactivate ALL schedule types.
-    Step 3: Check if the registered server is currently reachable (liveness check).
-            - If NOT alive: transient outage:
-                one-time  -> deactivate (missed its window, cannot retry)
-                periodic  -> log failure, compute next run, keep active for retry
-    Step 4: Server is registered AND alive -> perform sync, log result, advance schedule.
-    Step 5: Sleep 30 seconds and repeat.
-    Example: periodic schedule with unreachable server logs failure and reschedules."""
+    Description: Background loop that dispatches due schedules to concurrent tasks (see run_schedule).
+    Step 1: Load all active schedules into schedule_timer on startup and every
+            SCHEDULE_RECOVERY_INTERVAL seconds (recovers schedules missed during a restart).
+    Step 2: Start a task for every due schedule that is not running yet. At most SCHEDULE_WORKERS
+            schedules run at once and schedules of the same server run one after another, so one
+            slow server does not delay the syncs of the other servers.
+    Step 3: Sleep until the next schedule is due, the next recovery pass or until a schedule is
+            created or deleted, and repeat.
+    Example: a schedule due in 5 minutes starts 5 minutes later without polling the database."""
+    recovered_at = None
     while True:
+        now_ms = int(time.time() * 1000)
         try:
-            async with async_session() as db:
-                now_ms = int(time.time() * 1000)
-                schedules = await due_schedules(db, now_ms)
-                for sch in schedules:
-                    sync_type = "schedule_once" if sch.get("one_time") else "periodic"
-
-                    # Stage 1: Registration check
-                    # Checks whether the server record still exists in the registered_servers
-                    # table. A missing record is a permanent configuration issue (server was
-                    # deleted/deregistered), not a temporary outage. Deactivate all schedule
-                    # types so we do not keep polling a server that no longer exists.
-                    server = await get_registered_server_by_id(db, sch["server_id"])
-                    if not server:
-                        await log_sync_run(
-                            db, sch["id"], now_ms, "failed",
-                            "Server record not found in registered servers. Schedule deactivated.",
-                            sync_type,
-                        )
-                        await update_schedule_fields(db, schedule_id=sch["id"], active=False, status="failed")
-                        continue
-
-                    # Stage 2: Liveness check
-                    # Server is registered. Now check if it is currently reachable by sending
-                    # a lightweight ping to /api/acknowledge (5-second timeout).
-                    # This distinguishes transient network/outage failures from config errors.
-                    try:
-                        async with httpx.AsyncClient(timeout=5.0) as client:
-                            response = await client.post(
-                                f"{server['host_info']}/api/acknowledge",
-                                json={"server_name": server["server_name"], "server_url": server["host_info"]}
-                            )
-                        server_alive = response.status_code == 200
-                    except Exception:
-                        server_alive = False
-                    if not server_alive:
-                        if sch.get("one_time"):
-                            # One-time sync missed its scheduled window during outage.
-                            # It will not retry automatically -> deactivate.
-                            await log_sync_run(
-                                db, sch["id"], now_ms, "failed",
-                                "Server is not reachable. One-time sync deactivated.",
-                                sync_type,
-                            )
-                            await update_schedule_fields(db, schedule_id=sch["id"], active=False, status="failed")
-                        else:
-                            # Periodic sync: transient outage, keep schedule alive and
-                            # advance next_run_time_utc so it retries at the next interval.
-                            await log_sync_run(
-                                db, sch["id"], now_ms, "failed",
-                                "Server is not reachable. Will retry at next scheduled run.",
-                                sync_type,
-                            )
-                            next_ms = await compute_next_run_from_recurrence(
-                                sch["next_run_time_utc"],
-                                sch["timezone"],
-                                sch["recurrence_mode"],
-                                interval_unit=sch.get("interval_unit"),
-                                interval_value=sch.get("interval_value"),
-                                daily_time=sch.get("daily_time"),
-                                weekly_day=sch.get("weekly_day"),
-                                weekly_time=sch.get("weekly_time"),
-                            )
-                            await update_next_run(db, sch["id"], next_ms)
-                            await update_schedule_fields(db, schedule_id=sch["id"], status="active")
-                        continue
-
-                    # Stage 3: Server is registered and alive -> perform sync
-                    req = ServerRegistrationRequest(server_name=server["server_name"], server_url=server["host_info"])
-                    status_msg = ""
-                    status = "failed"
-                    await update_schedule_fields(db, schedule_id=sch["id"], status="running")
-                    try:
-                        result = await sync_metadata(request=req, db=db, skip_logging=True)
-                        status = result.get("status", "unknown")
-                        status_msg = result.get("message", "")
-                    except HTTPException as he:
-                        status = "failed"
-                        status_msg = he.detail if isinstance(he.detail, str) else str(he.detail)
-                    except Exception as e:
-                        status = "failed"
-                        status_msg = f"Unexpected error: {e}"
-
-                    await log_sync_run(db, sch["id"], now_ms, status, status_msg, sync_type)
-                    if sch.get("one_time"):
-                        # One-time schedules always deactivate after their single attempt.
-                        await update_schedule_fields(db, schedule_id=sch["id"], active=False, status="completed")
-                    else:
-                        # Periodic: advance to next run time and keep active.
-                        next_ms = await compute_next_run_from_recurrence(
-                            sch["next_run_time_utc"],
-                            sch["timezone"],
-                            sch["recurrence_mode"],
-                            interval_unit=sch.get("interval_unit"),
-                            interval_value=sch.get("interval_value"),
-                            daily_time=sch.get("daily_time"),
-                            weekly_day=sch.get("weekly_day"),
-                            weekly_time=sch.get("weekly_time"),
-                        )
-                        await update_next_run(db, sch["id"], next_ms)
-                        await update_schedule_fields(db, schedule_id=sch["id"], status="active")
+            if recovered_at is None or now_ms - recovered_at >= SCHEDULE_RECOVERY_INTERVAL * 1000:
+                async with async_session() as db:
+                    schedule_timer.load(await list_schedules(db))
+                recovered_at = now_ms
+            for schedule_id in schedule_timer.pop_due(now_ms):
+                if schedule_id in schedule_tasks:
+                    # The running task arms the schedule again once it finished.
+                    continue
+                task = asyncio.create_task(dispatch_schedule(schedule_id, now_ms))
+                schedule_tasks[schedule_id] = task
+                task.add_done_callback(lambda _, schedule_id=schedule_id: schedule_tasks.pop(schedule_id, None))
+            wake_at = recovered_at + SCHEDULE_RECOVERY_INTERVAL * 1000
+            next_run = schedule_timer.next_run_time()
+            if next_run is not None:
+                wake_at = min(wake_at, next_run)
+            timeout = (wake_at - now_ms) / 1000
         except Exception as e:
             # Prevent scheduler from crashing; log to stdout
             print(f"Scheduler error: {e}")
+            timeout = 30
+
+        await schedule_timer.wait(timeout)
+
+
+@asynccontextmanager
+async def schedule_server_lock(server_id):
+    """Input: id of a registered server
+    Output: async context manager
+    Description: Holds the lock of the server so that its schedules run one after another. The lock is
+    removed from schedule_server_locks when the last schedule waiting for it has released it."""
+    entry = schedule_server_locks.setdefault(server_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del schedule_server_locks[server_id]
+
+
+async def dispatch_schedule(schedule_id, now_ms):
+    """Input: id of a due schedule, run time in UTC epoch milliseconds
+    Output: none
+    Description: Runs one due schedule once the lock of its server and a worker slot are free,
+    with its own DB session (sessions must not be shared between concurrent tasks), then arms
+    the schedule again with its next run time. Schedules whose next run time was not advanced
+    (e.g., database errors) are retried after SCHEDULE_RETRY_DELAY seconds."""
+    sch = None
+    try:
+        async with async_session() as db:
+            sch = await get_schedule(db, schedule_id)
+        if not sch or not sch["active"]:
+            return
+        if sch["next_run_time_utc"] > now_ms:
+            # The schedule was moved to a later time after it was armed.
+            schedule_timer.arm(schedule_id, sch["next_run_time_utc"])
+            return
+        # Schedules waiting for their server do not take a worker slot.
+        async with schedule_server_lock(sch["server_id"]), schedule_slots:
+            async with async_session() as db:
+                await run_schedule(db, dict(sch), now_ms)
+        async with async_session() as db:
+            sch = await get_schedule(db, schedule_id)
+    except Exception as e:
+        # Prevent one schedule from affecting the others; log to stdout
+        print(f"Scheduler error in schedule {schedule_id}: {e}")
+    if sch and sch["active"]:
+        retry_at = int(time.time() * 1000) + int(SCHEDULE_RETRY_DELAY * 1000)
+        schedule_timer.arm(schedule_id, max(sch["next_run_time_utc"], retry_at))
+
+
+async def run_schedule(db, sch, now_ms):
+    """Input: DB session, due schedule row, run time in UTC epoch milliseconds
+    Output: none
+    Description: Executes one due schedule using 3-stage server validation.
+    Step 1: Check if server record exists in DB (registration check).
+            - If NOT registered: permanent config issue -> deactivate ALL schedule types.
+    Step 2: Check if the registered server is currently reachable (liveness check).
+            - If NOT alive: transient outage:
+                one-time  -> deactivate (missed its window, cannot retry)
+                periodic  -> log failure, compute next run, keep active for retry
+    Step 3: Server is registered AND alive -> perform sync (stopped between pages after
+            SCHEDULED_SYNC_TIMEOUT seconds), log result, advance schedule.
+    Example: periodic schedule with unreachable server logs failure and reschedules."""
+    sync_type = "schedule_once" if sch.get("one_time") else "periodic"
+
+    # Stage 1: Registration check
+    # Checks whether the server record still exists in the registered_servers
+    # table. A missing record is a permanent configuration issue (server was
+    # deleted/deregistered), not a temporary outage. Deactivate all schedule
+    # types so we do not keep polling a server that no longer exists.
+    server = await get_registered_server_by_id(db, sch["server_id"])
+    if not server:
+        await log_sync_run(
+            db, sch["id"], now_ms, "failed",
+            "Server record not found in registered servers. Schedule deactivated.",
+            sync_type,
+        )
+        await update_schedule_fields(db, schedule_id=sch["id"], active=False, status="failed")
+        return
+
+    # Stage 2: Liveness check
+    # Server is registered. Now check if it is currently reachable by sending
+    # a lightweight ping to /api/acknowledge (5-second timeout).
+    # This distinguishes transient network/outage failures from config errors.
+    try:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            response = await client.post(
+                f"{server['host_info']}/api/acknowledge",
+                json={"server_name": server["server_name"], "server_url": server["host_info"]}
+            )
+        server_alive = response.status_code == 200
+    except Exception:
+        server_alive = False
+    if not server_alive:
+        if sch.get("one_time"):
+            # One-time sync missed its scheduled window during outage.
+            # It will not retry automatically -> deactivate.
+            await log_sync_run(
+                db, sch["id"], now_ms, "failed",
+                "Server is not reachable. One-time sync deactivated.",
+                sync_type,
+            )
+            await update_schedule_fields(db, schedule_id=sch["id"], active=False, status="failed")
+        else:
+            # Periodic sync: transient outage, keep schedule alive and
+            # advance next_run_time_utc so it retries at the next interval.
+            await log_sync_run(
+                db, sch["id"], now_ms, "failed",
+                "Server is not reachable. Will retry at next scheduled run.",
+                sync_type,
+            )
+            next_ms = await compute_next_run_from_recurrence(
+                sch["next_run_time_utc"],
+                sch["timezone"],
+                sch["recurrence_mode"],
+                interval_unit=sch.get("interval_unit"),
+                interval_value=sch.get("interval_value"),
+                daily_time=sch.get("daily_time"),
+                weekly_day=sch.get("weekly_day"),
+                weekly_time=sch.get("weekly_time"),
+            )
+            await update_next_run(db, sch["id"], next_ms)
+            await update_schedule_fields(db, schedule_id=sch["id"], status="active")
+        return
+
+    # Stage 3: Server is registered and alive -> perform sync
+    req = ServerRegistrationRequest(server_name=server["server_name"], server_url=server["host_info"])
+    status_msg = ""
+    status = "failed"
+    await update_schedule_fields(db, schedule_id=sch["id"], status="running")
+    try:
+        # The sync checks the deadline between merges instead of being cancelled, so the server lock is held until
+        # the thread merging the current page has finished. Pages merged before the deadline are kept.
+        result = await sync_with_server(req, db, skip_logging=True, deadline=time.monotonic() + SCHEDULED_SYNC_TIMEOUT)
+        status = result.get("status", "unknown")
+        status_msg = result.get("message", "")
+    except HTTPException as he:
+        status = "failed"
+        status_msg = he.detail if isinstance(he.detail, str) else str(he.detail)
+    except Exception as e:
+        status = "failed"
+        status_msg = f"Unexpected error: {e}"
 
-        await asyncio.sleep(30)
+    await log_sync_run(db, sch["id"], now_ms, status, status_msg, sync_type)
+    if sch.get("one_time"):
+        # One-time schedules always deactivate after their single attempt.
+        await update_schedule_fields(db, schedule_id=sch["id"], active=False, status="completed")
+    else:
+        # Periodic: advance to next run time and keep active.
+        next_ms = await compute_next_run_from_recurrence(
+            sch["next_run_time_utc"],
+            sch["timezone"],
+            sch["recurrence_mode"],
+            interval_unit=sch.get("interval_unit"),
+            interval_value=sch.get("interval_value"),
+            daily_time=sch.get("daily_time"),
+            weekly_day=sch.get("weekly_day"),
+            weekly_time=sch.get("weekly_time"),
+        )
+        await update_next_run(db, sch["id"], next_ms)
+        await update_schedule_fields(db, schedule_id=sch["id"], status="active")
 
 
 @app.get("/")
@@ -266,42 +412,139 @@ async def read_root(request: Request):
     return {"cmf-server"}
 
 
+# dependency reading a metadata push request, either a json document with the json payload as a string or
+# the (compressed) pipeline document as the body with the other fields as query parameters
+def push_request(model):
+    async def read(request: Request):
+        if request.headers.get("content-type", "").split(";")[0].strip() != MLMD_CONTENT_TYPE:
+            try:
+                data = await request.json()
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Request body is not valid JSON.")
+        else:
+            try:
+                # the body is decompressed while it is received, at most MAX_PUSH_BODY_SIZE bytes are held
+                # decompression runs in the threadpool, it does not block other requests
+                decompressor = Decompressor(request.headers.get("content-encoding"), MAX_PUSH_BODY_SIZE)
+                async for chunk in request.stream():
+                    await run_in_threadpool(decompressor.write, chunk)
+                body = await run_in_threadpool(decompressor.finish)
+            except ValueError as e:
+                raise HTTPException(status_code=415, detail=str(e))
+            except BodyTooLargeError as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            except (OSError, EOFError) as e:
+                raise HTTPException(status_code=400, detail=f"Request body can not be decompressed: {e}")
+            data = dict(request.query_params, json_payload=body.decode("utf-8"))
+        try:
+            return model.model_validate(data)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+    return read
+
+
+# advertises the content codings accepted for metadata push bodies (RFC 7694)
+def accept_push_encodings(response: Response):
+    response.headers["Accept-Encoding"] = ", ".join(CONTENT_ENCODINGS)
+
+
+# response with the given content, compressed if the client accepts one of the supported content codings
+def compressed_response(content: str, request: Request, response_class=HTMLResponse):
+    data = content.encode("utf-8")
+    encoding = choose_encoding(request.headers.get("accept-encoding")) if len(data) >= MIN_COMPRESS_SIZE else None
+    if encoding is None:
+        return response_class(data, headers={"Vary": "Accept-Encoding"})
+    return response_class(compress(data, encoding), headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"})
+
+
 # api to post mlmd file to cmf-server
 @app.post("/mlmd_push")
-async def mlmd_push(info: MLMDPushRequest):
+async def mlmd_push(info: MLMDPushRequest = Depends(push_request(MLMDPushRequest))):
     print("mlmd push started")
     print("......................")
     status = "unknown_error"
     req_info = info.model_dump()  # Serializing the input data into a dictionary using model_dump()
     pipeline_name = req_info.get("pipeline_name", "")
-    if pipeline_name not in pipeline_locks:    # create lock object for pipeline if it doesn't exists in lock
-        pipeline_locks[pipeline_name] = asyncio.Lock()
-    pipeline_lock = pipeline_locks[pipeline_name]   
-    lock_counts[pipeline_name] += 1 # increment lock count by 1 if pipeline going to enter inside lock section
-    async with pipeline_lock:
-        try:
-            status = await async_api(update_mlmd, query, req_info["json_payload"], pipeline_name, "push", req_info["exec_uuid"])
-            if status == "invalid_json_payload":
-                # Invalid JSON payload, return 400 Bad Request
-                raise HTTPException(status_code=400, detail="Invalid JSON payload. The pipeline name is missing.")           
-            if status == "version_update":
-                # Raise an HTTPException with status code 422
-                raise HTTPException(status_code=422, detail="version_update")
-            if status != "exists":
-                # async function
-                await update_global_exe_dict(pipeline_name)
-                await update_global_art_dict(pipeline_name)
-        finally:
-            lock_counts[pipeline_name] -= 1  # Decrement the reference count after lock released
-            if lock_counts[pipeline_name] == 0:   #if lock_counts of pipeline is zero means lock is release from it
-                del pipeline_locks[pipeline_name]  # Remove the lock if it's no longer needed
-                del lock_counts[pipeline_name]
+    # update_mlmd only serializes pushes of the same executions, other pushes to the pipeline are merged concurrently
+    updated_artifacts: t.Set[int] = set()
+    status = await async_api(update_mlmd, query, req_info["json_payload"], pipeline_name, "push", req_info["exec_uuid"], MERGE_WORKERS, merge_pool, updated_artifacts)
+    if status == "invalid_json_payload":
+        # Invalid JSON payload, return 400 Bad Request
+        raise HTTPException(status_code=400, detail="Invalid JSON payload. The pipeline name is missing.")           
+    if status == "version_update":
+        # Raise an HTTPException with status code 422
+        raise HTTPException(status_code=422, detail="version_update")
+    if status == "merge_failed":
+        # not a 5xx, pushing the same metadata again fails the same way
+        raise HTTPException(status_code=422, detail="merge_failed")
+    if status != "exists":
+        await invalidate_exports([pipeline_name], updated_artifacts)
+        # async function
+        await update_global_exe_dict(pipeline_name)
+        await update_global_art_dict(pipeline_name)
     return {"status": status}
 
 
+# api to negotiate a metadata push, returns the given execution uuids that the server does not have
+# the client then pushes only those executions instead of the whole pipeline
+@app.post("/mlmd_push/missing")
+async def mlmd_push_missing(info: MLMDPushMissingRequest, response: Response):
+    accept_push_encodings(response)
+    # get_execution_uuids only reads executions changed since its previous call
+    known = await async_api(query.get_execution_uuids, info.pipeline_name)
+    missing = [uuid for uuid in dict.fromkeys(info.execution_uuids) if uuid not in known]
+    return {"missing": missing, "known_uuids": len(known)}
+
+
+# api to push one chunk (batch of executions) of a chunked metadata push
+# every chunk is merged and acknowledged on its own, a retried chunk that was already acknowledged is not merged again
+@app.post("/mlmd_push/chunk")
+async def mlmd_push_chunk(
+    info: MLMDPushChunkRequest = Depends(push_request(MLMDPushChunkRequest)), db: AsyncSession = Depends(get_db)
+):
+    # hashing the canonical JSON of a whole chunk is too slow for the event loop
+    if await run_in_threadpool(chunk_key, info.json_payload) != info.chunk_key:
+        raise HTTPException(status_code=400, detail="chunk_key is not the sha256 of the canonical JSON payload.")
+    acked = {row["chunk_index"]: dict(row) for row in await get_push_chunks(db, info.push_id)}
+    ack = acked.get(info.chunk_index)
+    if ack is not None and ack["chunk_key"] == info.chunk_key:
+        status = ack["status"]
+    else:
+        # update_mlmd skips executions that exist, so merging a chunk again is safe, only slower
+        updated_artifacts: t.Set[int] = set()
+        status = await async_api(update_mlmd, query, info.json_payload, info.pipeline_name, "push", info.exec_uuid, MERGE_WORKERS, merge_pool, updated_artifacts)
+        if status == "invalid_json_payload":
+            raise HTTPException(status_code=400, detail="Invalid JSON payload. The pipeline name is missing.")
+        if status == "version_update":
+            raise HTTPException(status_code=422, detail="version_update")
+        if status == "merge_failed":
+            raise HTTPException(status_code=422, detail="merge_failed")
+        if status == "success":
+            await invalidate_exports([info.pipeline_name], updated_artifacts)
+        if status in ("success", "exists") and ack is None:
+            await ack_push_chunk(
+                db, info.push_id, info.chunk_index, info.chunk_key, info.pipeline_name, status, int(time.time() * 1000)
+            )
+            acked[info.chunk_index] = {"chunk_index": info.chunk_index, "chunk_key": info.chunk_key, "status": status}
+    if info.last_chunk:
+        if any(row["status"] == "success" for row in acked.values()):
+            await update_global_exe_dict(info.pipeline_name)
+            await update_global_art_dict(info.pipeline_name)
+        await delete_push_chunks_before(db, int(time.time() * 1000) - PUSH_ACK_TTL_MS)
+    return {"status": status, "push_id": info.push_id, "chunk_index": info.chunk_index}
+
+
+# api to get the acknowledged chunks of a chunked metadata push, used to resume an interrupted push
+@app.get("/mlmd_push/{push_id}")
+async def mlmd_push_status(push_id: str, response: Response, db: AsyncSession = Depends(get_db)):
+    accept_push_encodings(response)
+    chunks = await get_push_chunks(db, push_id)
+    return {"push_id": push_id, "chunks": [dict(row) for row in chunks]}
+
+
 # api to get mlmd file from cmf-server
 @app.post("/mlmd_pull", response_class=HTMLResponse)
-async def mlmd_pull(info: MLMDPullRequest):
+async def mlmd_pull(info: MLMDPullRequest, request: Request):
     pipeline_name = info.pipeline_name
     exec_uuid = info.exec_uuid
     last_sync_time = info.last_sync_time
@@ -309,17 +552,78 @@ async def mlmd_pull(info: MLMDPullRequest):
     print("......................")
     # checks if mlmd file exists on server
     await check_mlmd_file_exists()
+    stream = NDJSON_CONTENT_TYPE in request.headers.get("accept", "")
     if pipeline_name:
         # checks if pipeline exists
         await check_pipeline_exists(pipeline_name)
-        #json_payload values can be json data, none or no_exec_id.
-        json_payload= await async_api(get_mlmd_from_server, query, pipeline_name, exec_uuid, last_sync_time, dict_of_exe_ids)
-    else:
-        json_payload = await async_api(get_mlmd_from_server, query, None, None, last_sync_time)
-
+        # exports of a pipeline are never incremental, they are cached until the pipeline changes
+        return await mlmd_pull_pipeline(pipeline_name, exec_uuid, stream, request)
+    if stream:
+        return await mlmd_pull_stream(last_sync_time, request)
+    json_payload = await async_api(get_mlmd_from_server, query, None, None, last_sync_time)
+    # peers pulling with /sync and clients (httpx, requests) accept and transparently decode gzip responses
+    return compressed_response(json_payload, request)
+
+
+# serves the export of a pipeline from export_cache, with an ETag so that clients having it get a 304
+# exports not in the cache are computed (as a document or streamed as newline delimited records) and cached
+async def mlmd_pull_pipeline(pipeline_name, exec_uuid, stream, request: Request):
+    version = await async_api(query.get_pipeline_version, pipeline_name)
+    media_type = NDJSON_CONTENT_TYPE if stream else "text/html; charset=utf-8"
+    key = (pipeline_name, exec_uuid, version, media_type)
+    # cached exports are gzip-compressed
+    accepts_gzip = choose_encoding(request.headers.get("accept-encoding"), ["gzip"]) is not None
+    # the gzip-compressed and the identity body are different representations, each gets its own entity tag
+    etag = export_cache.etag(key)
+    headers = {"ETag": etag[:-1] + '-gzip"' if accepts_gzip else etag, "Vary": "Accept, Accept-Encoding"}
+    if accepts_gzip:
+        headers["Content-Encoding"] = "gzip"
+    # If-None-Match uses the weak comparison, a weak tag matches the strong tag of the same representation
+    if headers["ETag"] in [tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers={"ETag": headers["ETag"], "Vary": headers["Vary"]})
+    if stream and exec_uuid and exec_uuid not in await async_api(query.get_execution_uuids, pipeline_name):
+        return HTMLResponse("no_exec_uuid")
+
+    blob = await run_in_threadpool(export_cache.get, key)
+    if blob is not None:
+        return Response(blob if accepts_gzip else gzip.decompress(blob), media_type=media_type, headers=headers)
+
+    generation = export_cache.generation(pipeline_name)
+    if stream:
+        records = query.iter_ndjson(pipeline_name, exec_uuid)
+        if not accepts_gzip:
+            return StreamingResponse(compress_stream(records, None), media_type=media_type, headers=headers)
+        # the stream is cached once it was sent completely
+        chunks = export_cache.tee(key, generation, compress_stream(records, "gzip"))
+        return StreamingResponse(chunks, media_type=media_type, headers=headers)
+    #json_payload values can be json data, none or no_exec_id.
+    json_payload = await async_api(get_mlmd_from_server, query, pipeline_name, exec_uuid, None, dict_of_exe_ids)
     if json_payload == None:
         raise HTTPException(status_code=406, detail=f"Pipeline {pipeline_name} not found.")
-    return json_payload
+    blob = await run_in_threadpool(gzip.compress, json_payload.encode("utf-8"), 6)
+    await run_in_threadpool(export_cache.put, key, generation, blob)
+    return Response(blob if accepts_gzip else json_payload, media_type=media_type, headers=headers)
+
+
+# streams the metadata of /mlmd_pull as newline delimited records (see CmfQuery.iter_ndjson)
+# the document is never built in memory and the receiver merges the records while they arrive
+async def mlmd_pull_stream(last_sync_time, request: Request):
+    records = query.iter_ndjson(None, None, int(last_sync_time) if last_sync_time else None)
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    # the iterator of a StreamingResponse runs in the threadpool, it does not block the event loop
+    return StreamingResponse(compress_stream(records, encoding), media_type=NDJSON_CONTENT_TYPE, headers=headers)
+
+
+# api to get the executions changed after a (last update time, id) cursor, one page at a time
+# /sync of peers pages through all changes and resumes an interrupted sync from the last merged page
+@app.post("/mlmd_pull/page", response_class=HTMLResponse)
+async def mlmd_pull_page(info: MLMDPullPageRequest, request: Request):
+    await check_mlmd_file_exists()
+    json_payload = await async_api(query.get_json_page, info.after_time, info.after_id, info.limit)
+    return compressed_response(json_payload, request)
 
 
 # Deprecated legacy endpoint (unused by current grid UI).
@@ -777,6 +1081,12 @@ async def acknowledge(request: AcknowledgeRequest):
 
 @app.post("/sync")
 async def sync_metadata(request: ServerRegistrationRequest, db: AsyncSession = Depends(get_db), skip_logging: bool = False):
+    return await sync_with_server(request, db, skip_logging)
+
+
+async def sync_with_server(
+    request: ServerRegistrationRequest, db: AsyncSession, skip_logging: bool = False, deadline: t.Optional[float] = None
+):
     """
     Synchronize metadata for a registered server.
 
@@ -786,6 +1096,8 @@ async def sync_metadata(request: ServerRegistrationRequest, db: AsyncSession = D
             When the background scheduler calls this function, it creates its own 
             schedule and log entries, so we skip the immediate sync logging to avoid 
             duplicate records. Set to False for manual/API-triggered syncs.
+        deadline (float): time.monotonic() after which the sync stops before its next page or batch, None for no
+            limit (see `check_sync_deadline`).
 
     Returns:
         dict: A response containing the sync status and last sync time.
@@ -807,23 +1119,32 @@ async def sync_metadata(request: ServerRegistrationRequest, db: AsyncSession = D
             raise HTTPException(status_code=404, detail="Server not found in the registered servers list")
 
         last_sync_time = row[0]['last_sync_time']
+        # Executions are pulled after the cursor of the last merged one, servers synced before cursors were stored
+        # continue after the last sync time
+        if row[0]['sync_cursor_time'] is not None:
+            cursor = (row[0]['sync_cursor_time'], row[0]['sync_cursor_id'])
+        else:
+            cursor = (last_sync_time, 0) if last_sync_time else None
 
-        # Pull MLMD data from the target server using the /mlmd_pull endpoint
-        json_payload = await server_mlmd_pull(server_url, last_sync_time)
-
-        json_data = {
-            "exec_uuid": None,
-            "json_payload": json.dumps(json_payload),
-            "pipeline_name": None
-        }
-
-        # Ensure the pipeline name in req_info matches the one in the JSON payload
-        # to maintain data integrity
-        pipelines = json_payload.get("Pipeline", [])
-        len_pipelines = len(pipelines)
-        pipeline_names = []
+        # Pull MLMD data from the target server page by page using the /mlmd_pull/page endpoint
+        updated_artifacts: t.Set[int] = set()
+        pulled = await server_mlmd_pull_pages(
+            query, db, server_name, server_url, cursor, MERGE_WORKERS, deadline=deadline, store_pool=merge_pool,
+            updated_artifacts=updated_artifacts,
+        )
+        if pulled is not None:
+            status, pipeline_names = pulled
+        else:
+            # Servers without paged pulls send all changes after last_sync_time, merged while they are streamed
+            status, pipeline_names, environment_names = await async_api(
+                server_mlmd_pull, query, server_url, last_sync_time, MERGE_WORKERS, deadline, merge_pool,
+                updated_artifacts,
+            )
+            if status not in (None, "version_update", "merge_failed"):
+                # Environment files of the pulled executions, all files on the first sync
+                await server_python_env_pull(server_url, environment_names if last_sync_time else None)
 
-        if not pipelines:
+        if status is None:
             await log_sync_attempt("success", "Nothing to sync", db, server_name, server_url, current_utc_epoch_time, skip_logging)
             return {
                 "message": "Nothing to sync",
@@ -831,25 +1152,20 @@ async def sync_metadata(request: ServerRegistrationRequest, db: AsyncSession = D
                 "last_sync_time": current_utc_epoch_time
             }
 
-        # in case of push check pipeline name exists inside mlmd_data
-        pipeline_names = [pipeline.get("name") for pipeline in pipelines]
-
-        # Push the JSON payload to the host server
-        status = await async_api(update_mlmd, query, json_data["json_payload"], None, "push", None)
-        if status == "invalid_json_payload":
-            # Invalid JSON payload, return 400 Bad Request
-            await log_sync_attempt("failed", "Invalid JSON payload. The pipeline name is missing.", db, server_name, server_url, current_utc_epoch_time, skip_logging)
-            raise HTTPException(status_code=400, detail="Invalid JSON payload. The pipeline name is missing.")           
         if status == "version_update":
             # Raise an HTTPException with status code 422
             await log_sync_attempt("failed", "Version update required", db, server_name, server_url, current_utc_epoch_time, skip_logging)
             raise HTTPException(status_code=422, detail="version_update")
+        if status == "merge_failed":
+            await log_sync_attempt("failed", "Merging the pulled metadata failed", db, server_name, server_url, current_utc_epoch_time, skip_logging)
+            raise HTTPException(status_code=422, detail="merge_failed")
         message = "Nothing to sync."
         if status != "exists":
             if not last_sync_time:
                 message = f"Host server is syncing with the selected server '{server_name}' at address '{server_url}' for the first time."
             else:
                 message = f"Host server is being synced with the selected server '{server_name}' at address '{server_url}'."
+            await invalidate_exports(pipeline_names, updated_artifacts)
             for pipeline_name in pipeline_names:
                 await update_global_exe_dict(pipeline_name)
                 await update_global_art_dict(pipeline_name)
@@ -887,6 +1203,8 @@ async def server_list(db: AsyncSession = Depends(get_db)):
 def download_python_env(request: Request, list_of_files: Optional[list[str]] = Query(None)):
     """
     API endpoint to compress and download the entire folder as a ZIP file.
+
+    The archive is streamed while it is compressed, it is never held in memory.
     """
     try:
         DIRECTORY = "/cmf-server/data/env/"  # Directory to be compressed
@@ -900,7 +1218,7 @@ def download_python_env(request: Request, list_of_files: Optional[list[str]] = Q
         # else include all files in the directory
         if list_of_files:
             for file_name in list_of_files:
-                file_path = os.path.join(DIRECTORY, file_name)
+                file_path = os.path.join(DIRECTORY, os.path.basename(file_name))
                 if os.path.exists(file_path):
                     files_to_zip.append((file_path, file_name))
                 else:
@@ -914,16 +1232,11 @@ def download_python_env(request: Request, list_of_files: Optional[list[str]] = Q
                     arcname = os.path.relpath(file_path, DIRECTORY)
                     files_to_zip.append((file_path, arcname))
 
+        # Errors once the archive is streamed would cut a 200 response short, check the files first
+        check_readable(files_to_zip)
         # Create and send the ZIP file 
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-            for file_path, arcname in files_to_zip:
-                zip_file.write(file_path, arcname)
-        
-        zip_buffer.seek(0)
-
         return StreamingResponse(
-            zip_buffer,
+            iter_zip(files_to_zip),
             media_type="application/zip",
             headers={
                 "Content-Disposition": f"attachment; filename={'python_env_files.zip' if list_of_files else 'python_env_folder.zip'}"
@@ -933,6 +1246,28 @@ def download_python_env(request: Request, list_of_files: Optional[list[str]] = Q
         return {"error": str(e)}
 
 
+# api to get the sha256 content hashes of environment files, peers download only the files they miss
+@app.post("/python-env/manifest")
+def python_env_manifest(info: PythonEnvManifestRequest):
+    return {"files": env_manifest("/cmf-server/data/env/", info.file_names)}
+
+
+# api to download the environment files with the given sha256 content hashes as a streamed ZIP file
+@app.post("/download-python-env")
+def download_python_env_blobs(info: PythonEnvDownloadRequest):
+    # the files are selected (and hashed) before the response starts, so that read errors are reported as errors
+    try:
+        files_to_zip = env_files_with_sha256("/cmf-server/data/env/", info.sha256)
+        check_readable(files_to_zip)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Environment files can not be read: {e}")
+    return StreamingResponse(
+        iter_zip(files_to_zip),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=python_env_files.zip"},
+    )
+
+
 # ---- Scheduling APIs ----
 @app.post("/schedule-sync")
 async def schedule_sync(request: ScheduleCreateRequest, db: AsyncSession = Depends(get_db)):
@@ -1011,6 +1346,7 @@ async def schedule_sync(request: ScheduleCreateRequest, db: AsyncSession = Depen
             weekly_day=weekly_day,
             weekly_time=weekly_time,
         )
+        schedule_timer.arm(created["id"], next_ms)
         return {"message": "Schedule created", "schedule_id": created["id"], "next_run_time_utc": next_ms}
     except HTTPException as e:
         raise e
@@ -1080,7 +1416,18 @@ async def delete_schedule_route(schedule_id: int, db: AsyncSession = Depends(get
     Returns:
         dict: Deactivation status message.
     """
-    return await delete_schedule(db, schedule_id)
+    result = await delete_schedule(db, schedule_id)
+    schedule_timer.disarm(schedule_id)
+    return result
+
+
+# drops the cached exports of the merged pipelines and of other pipelines using existing artifacts the merge updated
+async def invalidate_exports(pipeline_names, updated_artifacts):
+    pipeline_names = set(pipeline_names)
+    if updated_artifacts:
+        pipeline_names |= await async_api(query.get_pipelines_of_artifacts, updated_artifacts)
+    for pipeline_name in pipeline_names:
+        export_cache.invalidate(pipeline_name)
 
 
 async def update_global_art_dict(pipeline_name):
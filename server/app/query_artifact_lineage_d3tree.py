@@ -6,6 +6,7 @@ from server.app.utils import modify_arti_name
 def query_artifact_lineage_d3tree(query: CmfQuery, pipeline_name: str, dict_of_art_ids: Dict) -> List[List[Dict[str, Any]]]:
     id_name = {}
     child_parent_artifact_id: Dict[int, List[int]] = {}
+    graph = query.get_lineage_graph()    # parent lookups below are array lookups on the lineage snapshot
     for type_, df in dict_of_art_ids[pipeline_name].items():
         # Skip excluded artifact types entirely
         if type_ in EXCLUDED_ARTIFACT_TYPES:
@@ -14,11 +15,9 @@ def query_artifact_lineage_d3tree(query: CmfQuery, pipeline_name: str, dict_of_a
             #creating a dictionary of id and artifact name {id:artifact name}
             artifact_id = row['id']  # This will be an integer
             id_name[artifact_id] = modify_arti_name(row["name"], type_)
-            one_hop_parent_artifacts = query.get_one_hop_parent_artifacts_with_id(artifact_id)  # get immediate artifacts with automatic filtering for lineage visualization
-            child_parent_artifact_id[artifact_id] = []      # assign empty dict for artifact with no parent artifact
-            if not one_hop_parent_artifacts.empty:        # if artifact have parent artifacts
-                parents_list = list(one_hop_parent_artifacts["id"])
-                child_parent_artifact_id[artifact_id] = parents_list
+            # get immediate parent artifacts, excluded types are filtered out for lineage visualization
+            # artifact with no parent artifact gets an empty list
+            child_parent_artifact_id[artifact_id] = graph.get_parent_artifacts(artifact_id, EXCLUDED_ARTIFACT_TYPES)
     data_organized: List[List[Dict[str, Any]]] = topological_sort(child_parent_artifact_id, id_name)
     return data_organized
 
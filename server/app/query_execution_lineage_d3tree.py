@@ -37,7 +37,8 @@ def query_execution_lineage_d3tree(query: CmfQuery, pipeline_name: str, dict_of_
         return {"error": f"uuid '{uuid}' does not match any execution in pipeline '{pipeline_name}'"}
     parents_set = set()
     queue = UniqueQueue()
-    parents = query.get_one_hop_parent_execution_ids(execution_id[0], pipeline_id) #list of parent execution ids
+    graph = query.get_lineage_graph()    # parent lookups below are array lookups on the lineage snapshot
+    parents = graph.get_parent_executions(execution_id[0], pipeline_id) #list of parent execution ids
     dict_parents = {}
     if parents == None:
         parents = []
@@ -50,7 +51,7 @@ def query_execution_lineage_d3tree(query: CmfQuery, pipeline_name: str, dict_of_
 
     while len(queue) > 0:
         exe_id = queue.dequeue()
-        parents = query.get_one_hop_parent_execution_ids(exe_id, pipeline_id)
+        parents = graph.get_parent_executions(exe_id, pipeline_id)
         if parents == None:
             parents = [] 
         unique_parents = list(set(parents))
@@ -1,5 +1,6 @@
 from cmflib.cmfquery import CmfQuery, EXCLUDED_ARTIFACT_TYPES
 from collections import deque, defaultdict
+import pandas as pd
 import warnings
 
 warnings.filterwarnings("ignore")
@@ -15,15 +16,27 @@ def query_visualization_artifact_execution(query: CmfQuery, pipeline_name: str,
     for _, df_row in df.iterrows():
         arti_exe_dict["e_"+str(df_row['id'])] = "execution_name_"+df_row['Context_Type']+":"+df_row['Execution_uuid'][:4]  
 
+    # Fetching executions for all artifacts of the pipeline in one batched call, grouped by artifact id.
+    # When the same artifact is shared between two pipelines (e.g., Test-env1 and Test-env2),
+    # get_all_executions_for_artifact_ids returns executions from both pipelines, not just the current one
+    artifact_ids = [
+        int(art_id)
+        for type_, df in dict_art_id[pipeline_name].items() if type_ not in EXCLUDED_ARTIFACT_TYPES
+        for art_id in df['id']
+    ]
+    executions_by_artifact = {}
+    if artifact_ids:
+        all_data = query.get_all_executions_for_artifact_ids(artifact_ids)
+        if not all_data.empty:
+            executions_by_artifact = {art_id: group for art_id, group in all_data.groupby('artifact_id')}
+
     for type_, df in dict_art_id[pipeline_name].items():
         # Skip excluded artifact types entirely
         if type_ in EXCLUDED_ARTIFACT_TYPES:
             continue
         for _, df_row in df.iterrows():
-            # Fetching executions based on artifact id with automatic filtering for lineage visualization
-            # When the same artifact is shared between two pipelines (e.g., Test-env1 and Test-env2),
-            # get_all_executions_for_artifact_id returns executions from both pipelines, not just the current one
-            data = query.get_all_executions_for_artifact_id(df_row['id'])
+            # Executions linked to this artifact with automatic filtering for lineage visualization
+            data = executions_by_artifact.get(df_row['id'], pd.DataFrame())
             
             # Mapping artifact id with artifact name
             # Here appending artifact id with "artifact_name_" which will helpful in gui side to differentiate artifact and execution names
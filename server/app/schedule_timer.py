@@ -0,0 +1,70 @@
+import asyncio
+import heapq
+import typing as t
+
+
+class ScheduleTimer:
+    """In-process priority queue of the next run times of active schedules.
+
+    The scheduler sleeps until the earliest next run time (see `wait`) instead of polling the
+    scheduled_syncs table. Schedules are (re-)armed when they are created or after they ran and
+    disarmed when they are deleted, both wake the scheduler so that it can sleep for a new time.
+    `load` replaces all entries with the rows of the database, which recovers schedules after a
+    restart and picks up changes made outside of this process.
+
+    Changed and disarmed schedules leave stale heap entries behind, they are skipped when they
+    reach the top of the heap.
+    """
+
+    def __init__(self) -> None:
+        self._heap: t.List[t.Tuple[int, int]] = []
+        self._next_runs: t.Dict[int, int] = {}
+        self._changed = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._next_runs)
+
+    def arm(self, schedule_id: int, next_run_time_utc: int) -> None:
+        """Run the given schedule at `next_run_time_utc` (epoch milliseconds) instead of its previous time."""
+        if self._next_runs.get(schedule_id) == next_run_time_utc:
+            return
+        self._next_runs[schedule_id] = next_run_time_utc
+        heapq.heappush(self._heap, (next_run_time_utc, schedule_id))
+        self._changed.set()
+
+    def disarm(self, schedule_id: int) -> None:
+        """Stop running the given schedule."""
+        if self._next_runs.pop(schedule_id, None) is not None:
+            self._changed.set()
+
+    def load(self, schedules: t.Iterable[t.Mapping[str, t.Any]]) -> None:
+        """Replace all entries with the given active schedule rows (id, next_run_time_utc)."""
+        self._next_runs = {row["id"]: row["next_run_time_utc"] for row in schedules}
+        self._heap = [(next_run, schedule_id) for schedule_id, next_run in self._next_runs.items()]
+        heapq.heapify(self._heap)
+        self._changed.set()
+
+    def next_run_time(self) -> t.Optional[int]:
+        """Return the earliest next run time, None if no schedule is armed."""
+        while self._heap and self._next_runs.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now_utc_ms: int) -> t.List[int]:
+        """Disarm and return the ids of the schedules due at `now_utc_ms`, earliest first."""
+        due = []
+        while True:
+            next_run = self.next_run_time()
+            if next_run is None or next_run > now_utc_ms:
+                return due
+            _, schedule_id = heapq.heappop(self._heap)
+            del self._next_runs[schedule_id]
+            due.append(schedule_id)
+
+    async def wait(self, timeout: float) -> None:
+        """Sleep for `timeout` seconds or until a schedule is armed, disarmed or loaded."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), max(timeout, 0))
+        except asyncio.TimeoutError:
+            pass
+        self._changed.clear()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, model_validator
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 import json
 
@@ -27,6 +27,20 @@ class MLMDPushRequest(BaseModel):
         return values
 
 
+# Pydantic model for the request body of one chunk of a chunked MLMD push.
+class MLMDPushChunkRequest(MLMDPushRequest):
+    push_id: str = Field(..., min_length=1, max_length=64, description="Id shared by all chunks of one push")
+    chunk_index: int = Field(..., ge=0, description="Position of the chunk in the push")
+    last_chunk: bool = Field(False, description="Whether this is the last chunk of the push")
+    chunk_key: str = Field(..., min_length=64, max_length=64, description="sha256 of the canonical (sorted keys) json_payload, the idempotency key")
+
+
+# Pydantic model for the request body of the MLMD push negotiation, which returns the executions the server misses.
+class MLMDPushMissingRequest(BaseModel):
+    pipeline_name: str = Field(..., min_length=1, description="Name of the pipeline")
+    execution_uuids: List[str] = Field(default_factory=list, description="Execution uuids the client wants to push")
+
+
 # Base query parameters for pagination, sorting, and filtering.
 class BaseRequest(BaseModel):
     active_page: int = Field(1, gt=0, description="Page number")  # Page must be > 0
@@ -74,7 +88,24 @@ class MLMDPullRequest(BaseModel):
     pipeline_name:Optional[str] = Field(None, description="Name of the pipeline")
     exec_uuid: Optional[str] = Field(None, description="Execution UUID")
     last_sync_time: Optional[int] = Field(None, description="Epoch time in seconds")
-    
+
+
+# Pydantic model for the request body of a page of the metadata changed after a cursor, used by /sync of peers.
+class MLMDPullPageRequest(BaseModel):
+    after_time: Optional[int] = Field(None, description="Last update time of the cursor, None for the first page")
+    after_id: int = Field(0, ge=0, description="Execution id of the cursor")
+    limit: int = Field(500, gt=0, le=5000, description="Maximum number of executions in the page")
+
+
+# Pydantic model for the request body of the content hashes of environment files, None for all files.
+class PythonEnvManifestRequest(BaseModel):
+    file_names: Optional[List[str]] = Field(None, description="Names of the environment files")
+
+
+# Pydantic model for the request body of a download of the environment files with the given content hashes.
+class PythonEnvDownloadRequest(BaseModel):
+    sha256: List[str] = Field(default_factory=list, description="sha256 content hashes of the environment files")
+
 
 class ScheduleCreateRequest(BaseModel):
     server_id: int = Field(..., description="Registered server id")
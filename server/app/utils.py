@@ -1,4 +1,9 @@
+import io
+import os
 import socket
+import hashlib
+import zipfile
+import typing as t
 from urllib.parse import urlparse
 
 
@@ -99,3 +104,111 @@ def get_fqdn(name: str) -> str:
         return fqdn
     except Exception:
         return "127.0.0.1"
+
+
+# sha256 of files by path, with the size and modification time they were computed for
+_sha256_cache: t.Dict[str, t.Tuple[int, int, str]] = {}
+
+
+def file_sha256(path: str) -> t.Optional[str]:
+    """Return the sha256 hex digest of a file's content, None if the file does not exist.
+
+    Digests are cached until the size or modification time of the file changes, so
+    repeated syncs do not read unchanged files again."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    cached = _sha256_cache.get(path)
+    if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    _sha256_cache[path] = (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def env_manifest(directory: str, file_names: t.Optional[t.Iterable[str]] = None) -> t.Dict[str, str]:
+    """Return the sha256 hex digests of the given files of a directory by name, of all its files if
+    `file_names` is None.
+
+    Names are reduced to their base name, so only files directly in the directory are read.
+    Missing files and subdirectories are left out."""
+    if file_names is not None:
+        file_names = [os.path.basename(file_name) for file_name in file_names]
+    else:
+        file_names = os.listdir(directory) if os.path.isdir(directory) else []
+    files = {}
+    for file_name in file_names:
+        file_path = os.path.join(directory, file_name)
+        if file_name and os.path.isfile(file_path):
+            digest = file_sha256(file_path)
+            if digest is not None:
+                files[file_name] = digest
+    return files
+
+
+def env_files_with_sha256(directory: str, wanted: t.Iterable[str]) -> t.List[t.Tuple[str, str]]:
+    """Return the (file path, archive name) pairs of the files of a directory whose sha256 hex digest is in
+    `wanted`, sorted by name."""
+    wanted = set(wanted)
+    file_names = os.listdir(directory) if os.path.isdir(directory) else []
+    return [
+        (os.path.join(directory, file_name), file_name)
+        for file_name in sorted(file_names)
+        if os.path.isfile(os.path.join(directory, file_name))
+        and file_sha256(os.path.join(directory, file_name)) in wanted
+    ]
+
+
+def check_readable(files: t.Iterable[t.Tuple[str, str]]) -> None:
+    """Raise OSError unless every (file path, archive name) pair names a readable file.
+
+    Called before a ZIP archive of the files is streamed, an error while the archive is
+    sent can only cut the response short."""
+    for file_path, _ in files:
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f"File {os.path.basename(file_path)} does not exist")
+        with open(file_path, "rb"):
+            pass
+
+
+class _ZipStream(io.RawIOBase):
+    """Unseekable file object collecting the output of a ZipFile until it is sent."""
+
+    def __init__(self):
+        self._chunks: t.List[bytes] = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(files: t.Iterable[t.Tuple[str, str]], chunk_size: int = 1024 * 1024) -> t.Iterator[bytes]:
+    """Yield a ZIP archive of the given (file path, archive name) pairs chunk by chunk.
+
+    Files are compressed while the archive is sent, at most one chunk of a file is held
+    in memory."""
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for file_path, arcname in files:
+            with open(file_path, "rb") as src, zip_file.open(arcname, "w") as dst:
+                for block in iter(lambda: src.read(chunk_size), b""):
+                    dst.write(block)
+                    data = stream.pop()
+                    if data:
+                        yield data
+    # the central directory is written when the archive is closed
+    data = stream.pop()
+    if data:
+        yield data
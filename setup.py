@@ -18,6 +18,8 @@ setup(
                             "tabulate", "click", "minio", "paramiko==3.4.1", "scikit_learn", "scitokens", "cryptography", \
                             "ray==2.34.0","readchar", "protobuf>=4.25,<5", "boto3==1.41.0" ],  # add any additional packages that
         # needs to be installed along with your package. Eg: 'caer'
+        # result_format="polars" of the CmfQuery methods and CmfQuery.sql
+        extras_require={"polars": ["polars"], "sql": ["duckdb"]},
 
         keywords=['python', 'first package'],
         classifiers= [
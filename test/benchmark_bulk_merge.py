@@ -0,0 +1,122 @@
+###
+# Copyright (2024) Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+"""Compare the per-event and the bulk merge of parse_json_to_mlmd on a synthetic pipeline.
+
+Usage:
+    python test/benchmark_bulk_merge.py --executions 10000 --stages 4
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import cmflib.cmf
+from cmflib.cmf import Cmf
+from cmflib.cmf_merger import parse_json_to_mlmd
+from cmflib.store.sqllite_store import SqlliteStore
+
+INPUT, OUTPUT = 3, 4
+
+
+def make_pipeline(executions: int, stages: int) -> dict:
+    """Pipeline where every execution reads the output of the previous stage and writes a dataset and a model."""
+    git = {"git_repo": "https://github.com/example/repo.git", "Commit": "commit 0123abcd"}
+    per_stage = executions // stages
+    pipeline = {"name": "benchmark", "stages": []}
+    for s in range(stages):
+        stage_name = f"benchmark/stage_{s}"
+        stage = {"name": stage_name, "custom_properties": {}, "executions": []}
+        for i in range(per_stage):
+            events = [
+                (INPUT, "Environment", "python_env.txt", "env-md5", dict(git, url="/env")),
+                (INPUT, "Dataset", f"data/{s - 1}_{i}.csv" if s else "data/raw.csv",
+                 f"{s - 1}-{i}-md5" if s else "raw-md5", dict(git, url="/data")),
+                (OUTPUT, "Dataset", f"data/{s}_{i}.csv", f"{s}-{i}-md5", dict(git, url="/data")),
+                (OUTPUT, "Model", f"models/{s}_{i}.pkl", f"model-{s}-{i}-md5",
+                 {"model_framework": "SKlearn", "model_type": "RandomForest", "url": "/models"}),
+                (OUTPUT, "Metrics", f"metrics_{s}_{i}:metrics-{s}-{i}:{i}", f"metrics-{s}-{i}", {}),
+            ]
+            stage["executions"].append({
+                "name": "",
+                "properties": {
+                    "Context_Type": stage_name,
+                    "Execution": f"python src/stage_{s}.py --index {i}",
+                    "Execution_uuid": f"uuid-{s}-{i}",
+                    "Git_Repo": git["git_repo"],
+                    "Git_Start_Commit": "0123abcd",
+                    "Git_End_Commit": "",
+                },
+                "custom_properties": {"index": i},
+                "events": [
+                    {
+                        "type": event_type,
+                        "artifact": {
+                            "type": type_name,
+                            "name": f"{name}:{uri}" if type_name != "Metrics" else name,
+                            "uri": uri,
+                            "properties": properties,
+                            "custom_properties": {"seed": i},
+                        },
+                    }
+                    for event_type, type_name, name, uri, properties in events
+                ],
+            })
+        pipeline["stages"].append(stage)
+    return pipeline
+
+
+def counts(filepath: str) -> dict:
+    store = SqlliteStore({"filename": filepath}).connect()
+    executions = store.get_executions()
+    return {
+        "executions": len(executions),
+        "artifacts": len(store.get_artifacts()),
+        "events": len(store.get_events_by_execution_ids([e.id for e in executions])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--executions", type=int, default=10000)
+    parser.add_argument("--stages", type=int, default=4)
+    parser.add_argument("--skip-per-event", action="store_true", help="Only run the bulk merge.")
+    args = parser.parse_args()
+
+    # The merge opens the SQLite store with Cmf, which expects a git repository with a remote for local stores.
+    Cmf._Cmf__prechecks = staticmethod(lambda: None)
+    cmflib.cmf.git_checkout_new_branch = lambda branch_name: None
+    os.environ.pop("NEO4J_URI", None)
+
+    payload = json.dumps(make_pipeline(args.executions, args.stages))
+    modes = [("bulk", True)] if args.skip_per_event else [("per-event", False), ("bulk", True)]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for mode, bulk in modes:
+            filepath = os.path.join(tmp_dir, f"mlmd_{mode}")
+            start = time.perf_counter()
+            parse_json_to_mlmd(payload, filepath, "pull", None, bulk=bulk)
+            elapsed = time.perf_counter() - start
+            results[mode] = counts(filepath)
+            print(f"{mode:>9}: {elapsed:8.2f} s  {results[mode]}")
+    if len(results) == 2 and results["per-event"] != results["bulk"]:
+        raise SystemExit("The merges produced different stores.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+###
+# Copyright (2024) Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+import hashlib
+import io
+import os
+import zipfile
+
+from server.app.get_data import store_python_env_files
+from server.app.utils import env_files_with_sha256, env_manifest, file_sha256, iter_zip
+
+
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_iter_zip_round_trip(tmp_path):
+    contents = {"env_a.txt": b"numpy==1.26\n" * 1000, "env_b.txt": b"", "env_c.txt": os.urandom(5000)}
+    files = [(_write(tmp_path / name, data), name) for name, data in contents.items()]
+    archive = b"".join(iter_zip(files, chunk_size=1024))
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        assert {name: zf.read(name) for name in zf.namelist()} == contents
+
+
+def test_store_python_env_files_skips_hash_mismatch(tmp_path):
+    store = tmp_path / "env"
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("good.txt", b"good")
+        zf.writestr("bad.txt", b"tampered")
+    expected = {"good.txt": _sha256(b"good"), "bad.txt": _sha256(b"original")}
+    store_python_env_files(buffer, str(store), expected)
+    assert sorted(os.listdir(store)) == ["good.txt"]
+    assert (store / "good.txt").read_bytes() == b"good"
+
+
+def test_store_python_env_files_leaves_no_partial_file(tmp_path):
+    store = tmp_path / "env"
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zf:
+        zf.writestr("ok.txt", b"ok")
+        zf.writestr("broken.txt", b"x" * 100)
+    # corrupt the stored data of the second member, reading it fails the CRC check
+    data = buffer.getvalue()
+    offset = data.index(b"x" * 100)
+    broken = io.BytesIO(data[:offset] + b"y" * 100 + data[offset + 100:])
+    store_python_env_files(broken, str(store))
+    assert sorted(os.listdir(store)) == ["ok.txt"]
+
+
+def test_file_sha256_cache_invalidated_on_mtime_change(tmp_path):
+    path = _write(tmp_path / "env.txt", b"first")
+    stat = os.stat(path)
+    assert file_sha256(path) == _sha256(b"first")
+
+    # same size and modification time, the cached digest is returned without reading the file
+    _write(path, b"other")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert file_sha256(path) == _sha256(b"first")
+
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert file_sha256(path) == _sha256(b"other")
+    assert file_sha256(str(tmp_path / "missing.txt")) is None
+
+
+def test_env_manifest_uses_base_names(tmp_path):
+    directory = tmp_path / "env"
+    directory.mkdir()
+    (directory / "sub").mkdir()
+    _write(directory / "env.txt", b"env")
+    _write(directory / "sub" / "nested.txt", b"nested")
+    _write(tmp_path / "secret.txt", b"secret")
+
+    requested = ["../secret.txt", "sub/env.txt", "/etc/env.txt", "missing.txt", "sub", ""]
+    assert env_manifest(str(directory), requested) == {"env.txt": _sha256(b"env")}
+    assert env_manifest(str(directory)) == {"env.txt": _sha256(b"env")}
+    assert env_manifest(str(tmp_path / "missing")) == {}
+
+
+def test_env_files_with_sha256(tmp_path):
+    paths = {name: _write(tmp_path / name, name.encode()) for name in ("b.txt", "a.txt", "c.txt")}
+    selected = env_files_with_sha256(str(tmp_path), [_sha256(b"c.txt"), _sha256(b"a.txt"), _sha256(b"unknown")])
+    assert selected == [(paths["a.txt"], "a.txt"), (paths["c.txt"], "c.txt")]
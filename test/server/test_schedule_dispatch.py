@@ -0,0 +1,121 @@
+###
+# Copyright (2024) Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+import asyncio
+from contextlib import asynccontextmanager
+from unittest import mock
+
+import pytest
+from starlette.staticfiles import StaticFiles
+
+from server.app.get_data import check_sync_deadline
+from server.app.schedule_timer import ScheduleTimer
+
+
+@pytest.fixture
+def main(monkeypatch):
+    # The module opens the MLMD store and the static files directory of the server when it is imported.
+    with mock.patch("cmflib.cmfquery.CmfQuery"), mock.patch.object(StaticFiles, "__init__", lambda self, **kw: None):
+        import server.app.main as main
+
+    @asynccontextmanager
+    async def session():
+        yield None
+
+    async def get_schedule(db, schedule_id):
+        return {"id": schedule_id, "server_id": schedule_id % 10, "active": True, "next_run_time_utc": 0}
+
+    monkeypatch.setattr(main, "async_session", session)
+    monkeypatch.setattr(main, "get_schedule", get_schedule)
+    monkeypatch.setattr(main, "schedule_timer", ScheduleTimer())
+    return main
+
+
+def run_schedules(main, monkeypatch, schedule_ids):
+    running = []
+    most = {"all": 0, "server": 0}
+
+    async def run_schedule(db, sch, now_ms):
+        running.append(sch["server_id"])
+        most["all"] = max(most["all"], len(running))
+        most["server"] = max(most["server"], running.count(sch["server_id"]))
+        await asyncio.sleep(0.01)
+        running.remove(sch["server_id"])
+
+    async def run():
+        monkeypatch.setattr(main, "schedule_slots", asyncio.Semaphore(main.SCHEDULE_WORKERS))
+        await asyncio.gather(*(main.dispatch_schedule(schedule_id, 0) for schedule_id in schedule_ids))
+
+    monkeypatch.setattr(main, "run_schedule", run_schedule)
+    asyncio.run(run())
+    return most
+
+
+def test_schedules_share_worker_slots(main, monkeypatch):
+    # Schedule i syncs with server i % 10.
+    most = run_schedules(main, monkeypatch, range(1, main.SCHEDULE_WORKERS + 4))
+    assert most == {"all": main.SCHEDULE_WORKERS, "server": 1}
+    assert main.schedule_server_locks == {}
+    # Finished schedules are armed again.
+    assert len(main.schedule_timer) == main.SCHEDULE_WORKERS + 3
+
+
+def test_schedules_of_one_server_run_one_after_another(main, monkeypatch):
+    most = run_schedules(main, monkeypatch, [11, 21, 31, 12])
+    assert most == {"all": 2, "server": 1}
+    # The locks of servers without waiting schedules (e.g., deleted servers) are dropped.
+    assert main.schedule_server_locks == {}
+
+
+def test_schedule_past_deadline_is_logged_as_failed(main, monkeypatch):
+    logged = []
+
+    class Client:
+        def __init__(self, timeout):
+            pass
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *args):
+            pass
+
+        async def post(self, url, json):
+            return mock.Mock(status_code=200)
+
+    async def get_registered_server_by_id(db, server_id):
+        return {"server_name": "other", "host_info": "http://other:8080"}
+
+    async def sync_with_server(req, db, skip_logging, deadline):
+        # The pulled pages would be merged here, the sync stops before the first one.
+        check_sync_deadline(deadline)
+        await asyncio.Event().wait()
+
+    async def log_sync_run(db, schedule_id, now_ms, status, message, sync_type):
+        logged.append((status, message, sync_type))
+
+    async def update_schedule_fields(db, schedule_id, **fields):
+        pass
+
+    monkeypatch.setattr(main.httpx, "AsyncClient", Client)
+    monkeypatch.setattr(main, "get_registered_server_by_id", get_registered_server_by_id)
+    monkeypatch.setattr(main, "sync_with_server", sync_with_server)
+    monkeypatch.setattr(main, "log_sync_run", log_sync_run)
+    monkeypatch.setattr(main, "update_schedule_fields", update_schedule_fields)
+    monkeypatch.setattr(main, "SCHEDULED_SYNC_TIMEOUT", -1)
+    sch = {"id": 1, "server_id": 1, "one_time": True, "next_run_time_utc": 0}
+    asyncio.run(asyncio.wait_for(main.run_schedule(None, sch, 0), timeout=5))
+    assert logged == [("failed", "Sync did not finish before its deadline.", "schedule_once")]
@@ -0,0 +1,77 @@
+###
+# Copyright (2024) Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+import asyncio
+import time
+
+from server.app.schedule_timer import ScheduleTimer
+
+
+def test_pop_due_in_run_time_order():
+    timer = ScheduleTimer()
+    timer.arm(1, 300)
+    timer.arm(2, 100)
+    timer.arm(3, 200)
+    assert len(timer) == 3
+    assert timer.next_run_time() == 100
+
+    assert timer.pop_due(50) == []
+    assert timer.pop_due(250) == [2, 3]
+    assert len(timer) == 1
+    assert timer.next_run_time() == 300
+    assert timer.pop_due(1000) == [1]
+    assert timer.next_run_time() is None
+
+
+def test_rearm_and_disarm():
+    timer = ScheduleTimer()
+    timer.arm(1, 100)
+    timer.arm(2, 200)
+    # The entry of the earlier time is stale and skipped.
+    timer.arm(1, 500)
+    assert timer.next_run_time() == 200
+    timer.disarm(2)
+    timer.disarm(3)
+    assert timer.next_run_time() == 500
+    assert timer.pop_due(400) == []
+    assert timer.pop_due(500) == [1]
+
+    timer.arm(4, 100)
+    timer.load([{"id": 5, "next_run_time_utc": 300}, {"id": 6, "next_run_time_utc": 250}])
+    assert len(timer) == 2
+    assert timer.pop_due(1000) == [6, 5]
+
+
+def test_wait_wakes_up_when_armed():
+    async def run():
+        timer = ScheduleTimer()
+        # Nothing changes, the wait times out.
+        start = time.monotonic()
+        await timer.wait(0.05)
+        assert time.monotonic() - start >= 0.05
+
+        async def arm_later():
+            await asyncio.sleep(0.05)
+            timer.arm(1, 100)
+
+        start = time.monotonic()
+        arming = asyncio.create_task(arm_later())
+        await timer.wait(10)
+        await arming
+        assert time.monotonic() - start < 5
+        assert timer.next_run_time() == 100
+
+    asyncio.run(run())